@@ -1,19 +1,129 @@
+import atexit
 import dataclasses
+import json
 import logging
 import os
+import threading
+import time
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 
-from hubitat_lock_manager import controller
+from hubitat_lock_manager import controller, metrics, smart_lock
+from hubitat_lock_manager.browser_profile import DEFAULT_PROFILE
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.driver_pool import DriverPoolConfig
+from hubitat_lock_manager.jobs import JobManager
+from hubitat_lock_manager.positions import PositionAllocator
 
+BACKEND = os.getenv("HUBITAT_BACKEND", controller.WEBDRIVER_BACKEND)
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", DEFAULT_PROFILE)
 COMMAND_EXECUTOR = os.getenv("SELENIUM_HUB_URL", "")
 HUB_IP = os.getenv("HUB_IP", "192.168.86.37")
+MAKER_API_APP_ID = os.getenv("MAKER_API_APP_ID", "")
+MAKER_API_ACCESS_TOKEN = os.getenv("MAKER_API_ACCESS_TOKEN", "")
+DRIVER_POOL_CONFIG = DriverPoolConfig(
+    min_size=int(os.getenv("DRIVER_POOL_MIN_SIZE", "0")),
+    max_size=int(os.getenv("DRIVER_POOL_MAX_SIZE", "2")),
+    max_age_seconds=float(os.getenv("DRIVER_POOL_MAX_AGE_SECONDS", "600")),
+    max_uses=int(os.getenv("DRIVER_POOL_MAX_USES", "50")),
+    keepalive_interval_seconds=float(os.getenv("DRIVER_POOL_KEEPALIVE_SECONDS", "60")),
+    max_standby=int(os.getenv("DRIVER_POOL_MAX_STANDBY", "1")),
+    demand_window_seconds=float(os.getenv("DRIVER_POOL_DEMAND_WINDOW_SECONDS", "300")),
+)
+CODE_CACHE_TTL_SECONDS = float(os.getenv("CODE_CACHE_TTL_SECONDS", "30"))
+CODE_CACHE_MAX_SIZE = int(os.getenv("CODE_CACHE_MAX_SIZE", "256"))
+DEVICE_REFRESH_INTERVAL_SECONDS = float(os.getenv("DEVICE_REFRESH_INTERVAL_SECONDS", "300"))
+POSITION_LEASE_SECONDS = float(os.getenv("POSITION_LEASE_SECONDS", "120"))
+WRITE_CONFIRMATION_CONFIG = smart_lock.WriteConfirmationConfig(
+    timeout_seconds=float(os.getenv("WRITE_CONFIRMATION_TIMEOUT_SECONDS", "30")),
+    max_delay_seconds=float(os.getenv("WRITE_CONFIRMATION_MAX_DELAY_SECONDS", "4")),
+)
 
 app = Flask(__name__)
-smart_lock_controller = controller.create_smart_lock_controller(
-    HUB_IP,
-    COMMAND_EXECUTOR,
+controller_lock = threading.Lock()
+smart_lock_controller = None
+job_manager = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "3600")),
+    max_retained=int(os.getenv("JOB_MAX_RETAINED", "500")),
 )
+atexit.register(job_manager.shutdown)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        metrics.HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code,
+        )
+    return response
+
+
+def accepted_job_response(kind: str, run):
+    """
+    Run a write in the background and answer with where to poll for it.
+    """
+    job_id = job_manager.submit(kind, run)
+    status_url = f"/jobs/{job_id}"
+    response = jsonify({"job_id": job_id, "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+
+def device_operation_response(results, stream: bool):
+    """
+    Return per-device results either streamed as newline-delimited JSON while
+    devices finish, or collected into one JSON list.
+    """
+    if stream:
+        lines = (json.dumps(dataclasses.asdict(result)) + "\n" for result in results)
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+    results = list(results)
+    status = 200 if all(result.success for result in results) else 207
+    return jsonify([dataclasses.asdict(result) for result in results]), status
+
+
+def get_smart_lock_controller() -> controller.SmartLockController:
+    """
+    Create the controller on first use, so the server accepts connections
+    without waiting on the hub or a browser.
+    """
+    global smart_lock_controller
+    with controller_lock:
+        if smart_lock_controller is None:
+            start = time.perf_counter()
+            smart_lock_controller = controller.create_smart_lock_controller(
+                HUB_IP,
+                COMMAND_EXECUTOR,
+                pool_config=DRIVER_POOL_CONFIG,
+                code_cache=TtlLruCache(CODE_CACHE_TTL_SECONDS, CODE_CACHE_MAX_SIZE),
+                write_confirmation=WRITE_CONFIRMATION_CONFIG,
+                max_concurrency=int(
+                    os.getenv("MAX_CONCURRENCY", str(DRIVER_POOL_CONFIG.max_size))
+                ),
+                backend=BACKEND,
+                maker_api_app_id=MAKER_API_APP_ID,
+                maker_api_access_token=MAKER_API_ACCESS_TOKEN,
+                device_refresh_interval_seconds=DEVICE_REFRESH_INTERVAL_SECONDS,
+                position_allocator=PositionAllocator(
+                    lease_seconds=POSITION_LEASE_SECONDS,
+                    refresh_interval_seconds=CODE_CACHE_TTL_SECONDS,
+                ),
+                browser_profile=BROWSER_PROFILE,
+            )
+            atexit.register(smart_lock_controller.close)
+            metrics.STARTUP_SECONDS.set(time.perf_counter() - start, phase="controller")
+    return smart_lock_controller
 
 
 @app.route("/create_key_code", methods=["POST"])
@@ -24,29 +134,155 @@ def create_key_code():
         username=data["username"],
         device_id=data.get("device_id", -1),
     )
+    if data.get("async"):
+        if params.has_device_id:
+            return accepted_job_response(
+                "create_key_code",
+                lambda: [
+                    get_smart_lock_controller().create_key_code_on_one_device(
+                        params.username, params.code, params.device_id
+                    )
+                ],
+            )
+
+        return accepted_job_response(
+            "create_key_code",
+            lambda: get_smart_lock_controller().create_key_code_on_all_devices_concurrently(
+                params.username, params.code, data.get("concurrency")
+            ),
+        )
+
     try:
-        results = list(smart_lock_controller.create_key_code(params))
+        # Fan out across all devices in parallel when a concurrency limit is given
+        if not params.has_device_id and "concurrency" in data:
+            results = get_smart_lock_controller().create_key_code_on_all_devices_concurrently(
+                params.username, params.code, data["concurrency"]
+            )
+            return device_operation_response(results, data.get("stream", False))
+
+        results = list(get_smart_lock_controller().create_key_code(params))
         return jsonify([dataclasses.asdict(result) for result in results]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+@app.route("/bulk_key_codes", methods=["POST"])
+def bulk_key_codes():
+    data = request.json
+    try:
+        operations = [
+            controller.BulkKeyCodeOperation(
+                action=operation["action"],
+                username=operation["username"],
+                device_id=operation["device_id"],
+                code=operation.get("code", ""),
+            )
+            for operation in data["operations"]
+        ]
+    except (KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid operation: {str(e)}"}), 400
+
+    if data.get("async"):
+        # Each device's results show up on the job as soon as that device is done
+        return accepted_job_response(
+            "bulk_key_codes",
+            lambda: get_smart_lock_controller().apply_bulk_operations_as_completed(
+                operations, data.get("concurrency")
+            ),
+        )
+
+    try:
+        results = get_smart_lock_controller().apply_bulk_operations(
+            operations, data.get("concurrency")
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = 200 if all(result.success for result in results) else 207
+    return jsonify({"results": [dataclasses.asdict(result) for result in results]}), status
+
+
 @app.route("/delete_key_code", methods=["DELETE"])
 def delete_key_code():
     data = request.json
     username = data["username"]
-    device_id = data["device_id"]
+    device_id = data.get("device_id", -1)
+    # Removing a user from every lock has to be asked for, a forgotten device_id must not do it
+    if device_id == -1 and not (data.get("all_devices") or "concurrency" in data):
+        error = "device_id is required unless all_devices or concurrency is given"
+        return jsonify({"error": error}), 400
+
+    if data.get("async"):
+        if device_id == -1:
+            return accepted_job_response(
+                "delete_key_code",
+                lambda: get_smart_lock_controller().delete_key_code_on_all_devices_concurrently(
+                    username, data.get("concurrency")
+                ),
+            )
+
+        return accepted_job_response(
+            "delete_key_code",
+            lambda: [get_smart_lock_controller().delete_key_code(username, device_id)],
+        )
+
+    try:
+        if device_id == -1:
+            results = get_smart_lock_controller().delete_key_code_on_all_devices_concurrently(
+                username, data.get("concurrency")
+            )
+            return device_operation_response(results, data.get("stream", False))
+
+        result = get_smart_lock_controller().delete_key_code(username, device_id)
+        return jsonify(dataclasses.asdict(result)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/check_code", methods=["GET"])
+def check_code():
+    code = request.args.get("code", "")
+    if not code:
+        return jsonify({"error": "code is required"}), 400
+
+    try:
+        result = get_smart_lock_controller().find_key_codes_by_code(
+            code, request.args.get("concurrency", type=int)
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"in_use": bool(result.locations), **dataclasses.asdict(result)}), 200
+
+
+@app.route("/find_key_codes", methods=["GET"])
+def find_key_codes():
+    username = request.args.get("username", "")
+    if not username:
+        return jsonify({"error": "username is required"}), 400
+
     try:
-        result = smart_lock_controller.delete_key_code(username, device_id)
+        result = get_smart_lock_controller().find_key_codes_for_user(
+            username, request.args.get("concurrency", type=int)
+        )
         return jsonify(dataclasses.asdict(result)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(dataclasses.asdict(job)), 200
+
+
 @app.route("/list_devices", methods=["GET"])
 def list_devices():
     try:
-        result = smart_lock_controller.list_devices()
+        result = get_smart_lock_controller().list_devices()
         return jsonify(dataclasses.asdict(result)), 200
     except ValueError as e:
         logging.error(f"ValueError: {str(e)}")
@@ -59,6 +295,34 @@ def list_devices():
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/refresh_devices", methods=["POST"])
+def refresh_devices():
+    try:
+        result = get_smart_lock_controller().refresh_devices()
+        return jsonify(dataclasses.asdict(result)), 200
+    except Exception as e:
+        logging.error(f"Unhandled Exception: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route("/key_codes", methods=["GET"])
+def key_codes():
+    try:
+        result = get_smart_lock_controller().list_all_key_codes(
+            request.args.get("concurrency", type=int)
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = 200 if all(device.success for device in result.devices) else 207
+    return jsonify(dataclasses.asdict(result)), status
+
+
 @app.route("/list_key_codes", methods=["GET"])
 def list_key_codes():
     device_id = request.args.get("device_id", type=int)
@@ -66,7 +330,7 @@ def list_key_codes():
         raise ValueError("device_id is required")
 
     try:
-        result = smart_lock_controller.list_key_codes(device_id)
+        result = get_smart_lock_controller().list_key_codes(device_id)
         return jsonify(dataclasses.asdict(result)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
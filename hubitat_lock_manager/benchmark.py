@@ -0,0 +1,337 @@
+import argparse
+import json
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from hubitat_lock_manager import hub_http, maker_api, smart_lock
+from hubitat_lock_manager.browser_profile import (
+    BROWSER_PROFILES,
+    DEFAULT_PROFILE,
+    BrowserProfile,
+    get_browser_profile,
+)
+from hubitat_lock_manager.controller import (
+    BACKENDS,
+    HUB_HTTP_BACKEND,
+    MAKER_API_BACKEND,
+    WEBDRIVER_BACKEND,
+)
+from hubitat_lock_manager.driver_pool import DriverPoolConfig
+from hubitat_lock_manager.fake_hub import FakeHub
+
+OPERATIONS = (
+    "list_devices",
+    "list_key_codes",
+    "get_next_position",
+    "create_key_code",
+    "update_key_code",
+    "delete_key_code",
+)
+
+
+@dataclass(frozen=True)
+class CountingWebdriverConfig(smart_lock.WebdriverConfig):
+    """
+    A webdriver config that records every browser it launches.
+    """
+
+    launches: List[float] = field(default_factory=list, compare=False, repr=False)
+
+    def create_driver(self):
+        self.launches.append(time.monotonic())
+        return super().create_driver()
+
+
+@dataclass(frozen=True)
+class BenchmarkBackend:
+    name: str
+    smart_lock_config: smart_lock.SmartLockConfig
+    browser_launches: Callable[[], int] = lambda: 0
+
+
+@dataclass(frozen=True)
+class OperationStats:
+    backend: str
+    operation: str
+    latencies: List[float]
+    page_loads: int
+    api_requests: int
+    browser_launches: int
+    asset_loads: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    def per_operation(self, total: int) -> float:
+        return total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        return percentile(self.latencies, fraction)
+
+
+def create_hub_http_backend(
+    hub: FakeHub,
+    write_confirmation: Optional[smart_lock.WriteConfirmationConfig] = None,
+    hub_ip: Optional[str] = None,
+) -> BenchmarkBackend:
+    config = hub_http.HubHttpConfig(hub_ip or hub.hub_ip, write_confirmation=write_confirmation)
+    return BenchmarkBackend(
+        HUB_HTTP_BACKEND, hub_http.create_hub_http_smart_lock_config(config)
+    )
+
+
+def create_maker_api_backend(
+    hub: FakeHub,
+    write_confirmation: Optional[smart_lock.WriteConfirmationConfig] = None,
+    hub_ip: Optional[str] = None,
+) -> BenchmarkBackend:
+    config = maker_api.MakerApiConfig(
+        hub_ip or hub.hub_ip,
+        hub.app_id,
+        hub.access_token,
+        write_confirmation=write_confirmation,
+    )
+    return BenchmarkBackend(
+        MAKER_API_BACKEND, maker_api.create_maker_api_smart_lock_config(config)
+    )
+
+
+def create_webdriver_backend(
+    hub: FakeHub,
+    command_executor: str,
+    pool_config: Optional[DriverPoolConfig] = None,
+    write_confirmation: Optional[smart_lock.WriteConfirmationConfig] = None,
+    hub_ip: Optional[str] = None,
+    browser_profile: BrowserProfile = BROWSER_PROFILES[DEFAULT_PROFILE],
+) -> BenchmarkBackend:
+    config = CountingWebdriverConfig(
+        hub_ip or hub.hub_ip,
+        command_executor,
+        write_confirmation=write_confirmation,
+        browser_profile=browser_profile,
+    )
+    if pool_config is not None:
+        config = smart_lock.create_pooled_webdriver_config(config, pool_config)
+
+    # Name the profile when it is not the default, so profiles can be compared in one report
+    name = WEBDRIVER_BACKEND
+    if browser_profile.name != DEFAULT_PROFILE:
+        name = f"{WEBDRIVER_BACKEND}/{browser_profile.name}"
+
+    return BenchmarkBackend(
+        name,
+        smart_lock.create_webdriver_smart_lock_config(config),
+        lambda: len(config.launches),
+    )
+
+
+def format_report(stats: List[OperationStats]) -> str:
+    header = (
+        f"{'backend':<14} {'operation':<18} {'n':>4} {'p50 ms':>9} {'p90 ms':>9} "
+        f"{'p99 ms':>9} {'max ms':>9} {'pages/op':>9} {'assets/op':>10} {'api/op':>7} "
+        f"{'launches/op':>12}"
+    )
+    lines = [header, "-" * len(header)]
+    for entry in stats:
+        lines.append(
+            f"{entry.backend:<14} {entry.operation:<18} {entry.count:>4} "
+            f"{entry.percentile(0.5) * 1000:>9.1f} {entry.percentile(0.9) * 1000:>9.1f} "
+            f"{entry.percentile(0.99) * 1000:>9.1f} {entry.percentile(1.0) * 1000:>9.1f} "
+            f"{entry.per_operation(entry.page_loads):>9.2f} "
+            f"{entry.per_operation(entry.asset_loads):>10.2f} "
+            f"{entry.per_operation(entry.api_requests):>7.2f} "
+            f"{entry.per_operation(entry.browser_launches):>12.2f}"
+        )
+    return "\n".join(lines)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    # Nearest-rank percentile, so every reported value is a real sample
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_benchmark(
+    hub: FakeHub, backend: BenchmarkBackend, device_id: int, iterations: int = 10
+) -> List[OperationStats]:
+    """
+    Run every ``SmartLock`` operation ``iterations`` times against ``hub`` and
+    return latency samples plus page loads, Maker API requests, browser
+    launches and page asset loads per operation. Each write reaches the lock
+    before the next operation starts, so every operation sees the state the
+    previous one left, whether or not the backend confirms its writes.
+    """
+    config = backend.smart_lock_config
+    lock = config.smart_lock_factory.create_smart_lock(
+        smart_lock.CreateSmartLockParams(device_id, config)
+    )
+    samples: Dict[str, List[float]] = {operation: [] for operation in OPERATIONS}
+    totals: Dict[str, List[int]] = {operation: [0, 0, 0, 0] for operation in OPERATIONS}
+
+    def counts() -> tuple:
+        return (
+            len(hub.page_loads),
+            len(hub.requests),
+            backend.browser_launches(),
+            len(hub.asset_loads),
+        )
+
+    def measure(operation: str, call: Callable[[], object]) -> None:
+        before = counts()
+        start = time.perf_counter()
+        call()
+        samples[operation].append(time.perf_counter() - start)
+        after = counts()
+        for index, (old, new) in enumerate(zip(before, after)):
+            totals[operation][index] += new - old
+
+        # Untimed, an unconfirmed write may still be on its way to the lock
+        hub.wait_for_commands()
+
+    for iteration in range(iterations):
+        username = f"benchmark-{iteration}"
+        measure("list_devices", config.smart_lock_factory.list_smart_locks)
+        measure("list_key_codes", lock.list_key_codes)
+        measure("get_next_position", lock.get_next_position)
+        measure(
+            "create_key_code",
+            lambda: lock.create_key_code(
+                smart_lock.CreateKeyCodeParams(str(20000000 + iteration), username)
+            ),
+        )
+        measure(
+            "update_key_code",
+            lambda: lock.update_key_code(
+                smart_lock.UpdateKeyCodeParams(str(30000000 + iteration), username)
+            ),
+        )
+        measure(
+            "delete_key_code",
+            lambda: lock.delete_key_code(smart_lock.DeleteKeyCodeParams(username)),
+        )
+
+    return [
+        OperationStats(backend.name, operation, samples[operation], *totals[operation])
+        for operation in OPERATIONS
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark lock operations against a local fake Hubitat hub."
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=BACKENDS,
+        help="Backend to benchmark, can be repeated (default: maker_api)",
+    )
+    parser.add_argument("--iterations", type=int, default=10, help="Runs of each operation")
+    parser.add_argument(
+        "--page-latency", type=float, default=0.05, help="Seconds added to every hub request"
+    )
+    parser.add_argument(
+        "--zwave-latency",
+        type=float,
+        default=0.5,
+        help="Seconds before a command reaches the lock",
+    )
+    parser.add_argument(
+        "--confirm-writes",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Poll the hub until each write is visible, timing the wait as part of the write",
+    )
+    parser.add_argument(
+        "--command-executor", type=str, default="", help="Selenium URL for the webdriver backend"
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=0, help="Pooled browsers for the webdriver backend"
+    )
+    parser.add_argument(
+        "--browser-profile",
+        action="append",
+        choices=list(BROWSER_PROFILES),
+        help="Chrome profile for the webdriver backend, can be repeated (default: default)",
+    )
+    parser.add_argument(
+        "--page-assets",
+        action="store_true",
+        help="Serve hub pages with a script, stylesheet, image and font to load",
+    )
+    parser.add_argument(
+        "--bind-host", type=str, default="127.0.0.1", help="Address the fake hub listens on"
+    )
+    parser.add_argument(
+        "--hub-host",
+        type=str,
+        default="",
+        help="Address browsers use to reach the fake hub, e.g. from a Selenium container",
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+
+    args = parser.parse_args()
+
+    write_confirmation = (
+        smart_lock.WriteConfirmationConfig(
+            timeout_seconds=args.zwave_latency + 10, initial_delay_seconds=0.05
+        )
+        if args.confirm_writes
+        else None
+    )
+    pool_config = (
+        DriverPoolConfig(min_size=1, max_size=args.pool_size) if args.pool_size else None
+    )
+
+    stats = []
+    with FakeHub(
+        devices={1: "Benchmark Lock"},
+        latency_seconds=args.page_latency,
+        host=args.bind_host,
+        zwave_latency_seconds=args.zwave_latency,
+        page_assets=args.page_assets,
+    ) as hub:
+        hub_ip = f"{args.hub_host}:{hub.port}" if args.hub_host else None
+        # The webdriver backend runs once per browser profile
+        runs = [
+            (name, profile)
+            for name in args.backend or [MAKER_API_BACKEND]
+            for profile in (
+                args.browser_profile or [DEFAULT_PROFILE] if name == WEBDRIVER_BACKEND else [None]
+            )
+        ]
+        for name, profile in runs:
+            if name == WEBDRIVER_BACKEND:
+                backend = create_webdriver_backend(
+                    hub,
+                    args.command_executor,
+                    pool_config,
+                    write_confirmation,
+                    hub_ip,
+                    get_browser_profile(profile),
+                )
+            elif name == HUB_HTTP_BACKEND:
+                backend = create_hub_http_backend(hub, write_confirmation, hub_ip)
+            else:
+                backend = create_maker_api_backend(hub, write_confirmation, hub_ip)
+
+            try:
+                stats.extend(run_benchmark(hub, backend, 1, args.iterations))
+            finally:
+                backend.smart_lock_config.close()
+
+    if args.json:
+        print(json.dumps([asdict(entry) for entry in stats], indent=2))
+    else:
+        print(format_report(stats))
+
+
+if __name__ == "__main__":
+    main()
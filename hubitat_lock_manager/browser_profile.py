@@ -0,0 +1,229 @@
+import logging
+import os
+import stat
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from hubitat_lock_manager.chromedriver import CACHE_DIRECTORY, is_private
+
+try:
+    import fcntl
+except ImportError:  # Windows, where slots are only exclusive within one process
+    fcntl = None
+
+DEFAULT_PROFILE = "default"
+LEAN_PROFILE = "lean"
+
+IMAGE_URL_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp")
+FONT_URL_PATTERNS = ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot")
+
+# Keep the browser to few processes and little memory; it only ever shows hub pages
+LEAN_ARGUMENTS = (
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-gpu",
+    "--mute-audio",
+    "--no-first-run",
+    "--renderer-process-limit=2",
+    "--disable-features=site-per-process,Translate,MediaRouter",
+    "--js-flags=--max-old-space-size=128",
+    "--disk-cache-size=67108864",
+)
+
+
+@dataclass(frozen=True)
+class BrowserProfile:
+    name: str
+    # "eager" returns from a navigation once the DOM is parsed, "normal" waits for every asset
+    page_load_strategy: str = "normal"
+    # The window is maximized when no size is given
+    window_size: Optional[Tuple[int, int]] = None
+    block_images: bool = False
+    # Requests matching these are failed by the browser, e.g. "*.woff2"
+    blocked_url_patterns: Tuple[str, ...] = ()
+    # Persistent profiles with their disk cache live here, one per concurrent browser.
+    # Only used for a local Chrome, a remote grid node keeps its own profiles
+    profile_root: str = ""
+    arguments: Tuple[str, ...] = ()
+
+
+class ProfileDirectories:
+    """
+    Hands out persistent Chrome profile directories under one root. Chrome
+    refuses a profile another running browser holds, so each browser gets a
+    directory no other live browser uses, and a replacement reuses it along
+    with the assets its predecessor cached. A slot is held with a lock file,
+    so other processes sharing the root move on to the next free slot.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        # Slot to the descriptor of its lock file, closing it frees the slot
+        self._in_use: Dict[int, int] = {}
+        self._drivers: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Take the lowest free slot. Returns ``(None, None)`` when the root is
+        not private to this user, so the browser runs without a profile.
+        """
+        if not self._prepare_root():
+            return None, None
+
+        with self._lock:
+            slot = 0
+            while slot in self._in_use or not self._lock_slot(slot):
+                slot += 1
+
+        directory = os.path.join(self.root, f"profile-{slot}")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        return slot, directory
+
+    def bind(self, driver: Any, slot: int) -> None:
+        with self._lock:
+            self._drivers[id(driver)] = slot
+
+    def release(self, slot: int) -> None:
+        with self._lock:
+            self._unlock_slot(slot)
+
+    def release_driver(self, driver: Any) -> None:
+        with self._lock:
+            slot = self._drivers.pop(id(driver), None)
+            if slot is not None:
+                self._unlock_slot(slot)
+
+    def _lock_slot(self, slot: int) -> bool:
+        fd = os.open(os.path.join(self.root, f"profile-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process runs a browser on this profile
+                os.close(fd)
+                return False
+
+        self._in_use[slot] = fd
+        return True
+
+    def _prepare_root(self) -> bool:
+        # The profiles hold the hub session's cookies, so nobody else may read or plant them
+        try:
+            os.makedirs(self.root, mode=0o700, exist_ok=True)
+            root_stat = os.stat(self.root)
+        except OSError as e:
+            logging.error(f"Creating Chrome profile root {self.root} failed: {str(e)}")
+            return False
+
+        if not stat.S_ISDIR(root_stat.st_mode) or not is_private(root_stat):
+            logging.error(f"Ignoring Chrome profile root {self.root}, it is not private")
+            return False
+        return True
+
+    def _unlock_slot(self, slot: int) -> None:
+        fd = self._in_use.pop(slot, None)
+        if fd is not None:
+            os.close(fd)
+
+
+_profile_directories: Dict[str, ProfileDirectories] = {}
+_profile_directories_lock = threading.Lock()
+
+
+def apply_browser_profile(
+    options, profile: BrowserProfile, profile_directory: Optional[str] = None
+) -> None:
+    options.page_load_strategy = profile.page_load_strategy
+
+    if profile.window_size is None:
+        options.add_argument("start-maximized")  # Start the browser maximized
+    else:
+        width, height = profile.window_size
+        options.add_argument(f"--window-size={width},{height}")
+
+    if profile.block_images:
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+
+    if profile_directory:
+        options.add_argument(f"--user-data-dir={profile_directory}")
+
+    for argument in profile.arguments:
+        options.add_argument(argument)
+
+
+def block_urls(driver, profile: BrowserProfile) -> None:
+    """
+    Make the browser fail requests matching the profile's patterns, over the
+    DevTools protocol. A local Chrome supports it directly and a remote Chrome
+    through the grid's CDP endpoint; where neither works the page loads
+    everything and only the image setting applies.
+    """
+    if not profile.blocked_url_patterns:
+        return
+
+    commands = [
+        ("Network.enable", {}),
+        ("Network.setBlockedURLs", {"urls": list(profile.blocked_url_patterns)}),
+    ]
+    try:
+        for cmd, params in commands:
+            if hasattr(driver, "execute_cdp_cmd"):
+                driver.execute_cdp_cmd(cmd, params)
+            else:
+                # webdriver.Remote has no helper, but a Chrome grid serves the same endpoint
+                driver.execute("executeCdpCommand", {"cmd": cmd, "params": params})
+    except Exception as e:
+        logging.error(f"Blocking URLs is not supported by this WebDriver: {str(e)}")
+
+
+def get_browser_profile(name: str) -> BrowserProfile:
+    if name not in BROWSER_PROFILES:
+        raise ValueError(
+            f"Unknown browser profile {name}, expected one of {list(BROWSER_PROFILES)}"
+        )
+    return BROWSER_PROFILES[name]
+
+
+def get_profile_directories(root: str) -> ProfileDirectories:
+    # Every config using a root shares its allocator, so no two browsers get the same directory
+    with _profile_directories_lock:
+        if root not in _profile_directories:
+            _profile_directories[root] = ProfileDirectories(root)
+        return _profile_directories[root]
+
+
+def release_profile_directory(driver) -> None:
+    with _profile_directories_lock:
+        allocators = list(_profile_directories.values())
+
+    for allocator in allocators:
+        allocator.release_driver(driver)
+
+
+BROWSER_PROFILES = {
+    DEFAULT_PROFILE: BrowserProfile(DEFAULT_PROFILE),
+    LEAN_PROFILE: BrowserProfile(
+        LEAN_PROFILE,
+        page_load_strategy="eager",
+        window_size=(800, 600),
+        block_images=True,
+        # The hub's own scripts differ between firmware versions, so any that are not
+        # needed for the device pages are listed in BROWSER_BLOCKED_URL_PATTERNS
+        blocked_url_patterns=IMAGE_URL_PATTERNS
+        + FONT_URL_PATTERNS
+        + tuple(
+            pattern.strip()
+            for pattern in os.getenv("BROWSER_BLOCKED_URL_PATTERNS", "").split(",")
+            if pattern.strip()
+        ),
+        profile_root=os.getenv("BROWSER_PROFILE_ROOT", os.path.join(CACHE_DIRECTORY, "chrome")),
+        arguments=LEAN_ARGUMENTS,
+    ),
+}
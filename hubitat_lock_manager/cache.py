@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CacheEntry(Generic[T]):
+    value: T
+    stored_at: float
+
+
+class TtlLruCache(Generic[T]):
+    """
+    A thread-safe cache whose entries expire after ``ttl_seconds`` and which
+    evicts the least recently used entry once it holds ``max_size`` of them.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 30.0,
+        max_size: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry[T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def age(self, entry: CacheEntry[T]) -> float:
+        return self._clock() - entry.stored_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry[T]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if self.age(entry) >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def put(self, key: Hashable, value: T) -> None:
+        with self._lock:
+            self._entries[key] = CacheEntry(value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def update(self, key: Hashable, update: Callable[[T], T]) -> None:
+        """
+        Replace a fresh entry with ``update(value)``, keeping its original age.
+        Missing or expired entries are left alone.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.age(entry) >= self.ttl_seconds:
+                return
+
+            self._entries[key] = CacheEntry(update(entry.value), entry.stored_at)
+            self._entries.move_to_end(key)
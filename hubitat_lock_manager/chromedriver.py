@@ -0,0 +1,102 @@
+import logging
+import os
+import stat
+import tempfile
+import threading
+from typing import Optional
+
+# State kept between processes lives in the user's own cache directory, not the shared temp one
+CACHE_DIRECTORY = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "hubitat_lock_manager",
+)
+# Where the resolved chromedriver path is remembered between processes
+PATH_CACHE_FILE = os.getenv(
+    "CHROMEDRIVER_PATH_CACHE", os.path.join(CACHE_DIRECTORY, "chromedriver_path")
+)
+
+_lock = threading.Lock()
+_resolved_path: Optional[str] = None
+
+
+def forget_chromedriver_path() -> None:
+    """
+    Drop the remembered path, such as after a Chrome upgrade left the cached
+    driver behind, so the next call resolves it again.
+    """
+    global _resolved_path
+    with _lock:
+        _resolved_path = None
+        try:
+            os.remove(PATH_CACHE_FILE)
+        except FileNotFoundError:
+            pass
+
+
+def install_chromedriver() -> str:
+    # webdriver-manager checks versions over the network, so only import and run it on a miss
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    write_cached_path(PATH_CACHE_FILE, path)
+    return path
+
+
+def is_private(file_stat: os.stat_result) -> bool:
+    # Owned by this user and writable by nobody else
+    if hasattr(os, "getuid") and file_stat.st_uid != os.getuid():
+        return False
+    return not file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def is_trusted_file(file_stat: os.stat_result) -> bool:
+    # Only a private file may decide what gets executed
+    return stat.S_ISREG(file_stat.st_mode) and is_private(file_stat)
+
+
+def read_cached_path(cache_file: str) -> Optional[str]:
+    try:
+        with open(cache_file) as f:
+            if not is_trusted_file(os.fstat(f.fileno())):
+                logging.error(f"Ignoring chromedriver path cache {cache_file}, it is not private")
+                return None
+            path = f.read().strip()
+    except OSError:
+        return None
+
+    # The driver may have been cleaned up since it was cached
+    return path if path and os.path.isfile(path) and os.access(path, os.X_OK) else None
+
+
+def resolve_chromedriver_path() -> str:
+    """
+    Return the chromedriver executable, asking webdriver-manager at most once
+    per process. ``CHROMEDRIVER_PATH`` takes precedence, then the path cached
+    on disk by an earlier process.
+    """
+    global _resolved_path
+    with _lock:
+        if _resolved_path is None:
+            _resolved_path = (
+                os.getenv("CHROMEDRIVER_PATH")
+                or read_cached_path(PATH_CACHE_FILE)
+                or install_chromedriver()
+            )
+        return _resolved_path
+
+
+def write_cached_path(cache_file: str, path: str) -> None:
+    temp_path = None
+    try:
+        # Write and rename so a concurrent reader never sees a partial path
+        directory = os.path.dirname(cache_file) or "."
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".chromedriver-")
+        with os.fdopen(fd, "w") as f:
+            f.write(path)
+        os.replace(temp_path, cache_file)
+    except OSError as e:
+        # Caching is an optimization, the resolved path is still used by this process
+        logging.error(f"Caching the chromedriver path in {cache_file} failed: {str(e)}")
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
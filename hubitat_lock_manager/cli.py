@@ -1,23 +1,147 @@
 import argparse
+import cmd
 import dataclasses
+import json
+import os
 import pprint
+import shlex
+import sys
+import time
+from typing import Iterable, TextIO
 
-from hubitat_lock_manager import controller
+from hubitat_lock_manager import controller, reconcile
+from hubitat_lock_manager.browser_profile import BROWSER_PROFILES, DEFAULT_PROFILE
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.driver_pool import DriverPoolConfig
+
+ACTIONS = ["create", "delete", "get", "list", "list_devices", "sync", "update"]
+
+
+class CommandError(Exception):
+    pass
+
+
+class CommandParser(argparse.ArgumentParser):
+    # Report bad commands to the batch or shell loop instead of exiting
+    def error(self, message):
+        raise CommandError(message)
+
+
+class LockManagerShell(cmd.Cmd):
+    intro = "Hubitat lock manager shell. Type help for commands, exit to quit."
+    prompt = "hlm> "
+
+    def __init__(self, smart_lock_controller: controller.SmartLockController, **kwargs):
+        super().__init__(**kwargs)
+        self.smart_lock_controller = smart_lock_controller
+
+    def default(self, line):
+        run_command_line(self.smart_lock_controller, line)
+
+    def do_exit(self, _):
+        return True
+
+    def do_EOF(self, _):
+        print()
+        return True
+
+    def do_help(self, _):
+        print(create_command_parser().format_help())
+
+    def emptyline(self):
+        # Never repeat the last command, it may have been a write
+        pass
+
+    do_quit = do_exit
+
+
+def add_command_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--device-id", default=-1, type=int, help="Device ID")
+    parser.add_argument("--username", help="Username for the key code")
+    parser.add_argument("--code", help="8-digit code")
+    parser.add_argument(
+        "--all-devices",
+        action="store_true",
+        help="Let create and delete act on every lock when no device ID is given",
+    )
+    parser.add_argument(
+        "--desired-state",
+        help="CSV or JSON file with username, device_id and code for every key code, used by sync",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the sync plan and its hub operations without applying it",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Let sync delete every code on devices that have no rows in the desired state",
+    )
+
+
+def create_command_parser() -> argparse.ArgumentParser:
+    parser = CommandParser(prog="", add_help=False, description="Commands: " + ", ".join(ACTIONS))
+    parser.add_argument("action", choices=ACTIONS, help="Action to perform")
+    add_command_arguments(parser)
+    return parser
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="SmartLockController CLI")
     parser.add_argument("--hub-ip", required=True, help="Hub IP address")
-    parser.add_argument("--device-id", default=-1, type=int, help="Device ID")
+    parser.add_argument(
+        "--backend",
+        default=os.getenv("HUBITAT_BACKEND", controller.WEBDRIVER_BACKEND),
+        choices=controller.BACKENDS,
+        help="How to talk to the hub",
+    )
+    parser.add_argument(
+        "--maker-api-app-id",
+        default=os.getenv("MAKER_API_APP_ID", ""),
+        help="Maker API app id, required for the maker_api backend",
+    )
+    parser.add_argument(
+        "--maker-api-access-token",
+        default=os.getenv("MAKER_API_ACCESS_TOKEN", ""),
+        help="Maker API access token, required for the maker_api backend",
+    )
+    parser.add_argument(
+        "--command-executor",
+        default=os.getenv("SELENIUM_HUB_URL", ""),
+        help="Remote Selenium URL, a local Chrome is used when empty",
+    )
+    parser.add_argument(
+        "--browser-profile",
+        default=os.getenv("BROWSER_PROFILE", DEFAULT_PROFILE),
+        choices=list(BROWSER_PROFILES),
+        help="Chrome settings for the webdriver backend, lean skips images and fonts",
+    )
     parser.add_argument(
         "--action",
-        required=True,
-        choices=["create", "delete", "get", "list", "list_devices", "update"],
-        help="Action to perform",
+        choices=ACTIONS,
+        help="Action to perform, required unless --batch or --shell is given",
+    )
+    add_command_arguments(parser)
+    parser.add_argument(
+        "--concurrency",
+        default=1,
+        type=int,
+        help="Devices processed in parallel when acting on all devices",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Run one command per line from FILE, or from stdin when FILE is -",
+    )
+    mode.add_argument(
+        "--shell", action="store_true", help="Read commands interactively"
     )
-    parser.add_argument("--username", help="Username for the key code")
-    parser.add_argument("--code", help="8-digit code")
     args = parser.parse_args()
+
+    if not args.action and not args.batch and not args.shell:
+        parser.error("one of --action, --batch or --shell is required")
     return args
 
 
@@ -25,12 +149,16 @@ def jsonify_result(result):
     return json.dumps(dataclasses.asdict(result))
 
 
-def main():
-    args = parse_args()
+def require_all_devices(args) -> None:
+    # A forgotten --device-id must not change every lock, least of all in a batch
+    if not args.all_devices:
+        raise ValueError(
+            f"A device ID is required to {args.action} a key code, "
+            "pass --all-devices to use every lock"
+        )
 
-    if not args.hub_ip:
-        raise ValueError("Hub IP is required")
 
+def run_action(smart_lock_controller: controller.SmartLockController, args) -> None:
     if args.action == "create":
         if not args.username or not args.code:
             pprint.pprint(
@@ -38,62 +166,157 @@ def main():
             )
             return
 
+        if args.device_id == -1:
+            require_all_devices(args)
+            # Print each device's outcome as soon as it finishes
+            for result in smart_lock_controller.create_key_code_on_all_devices_concurrently(
+                args.username, args.code
+            ):
+                pprint.pprint(f"Create key code result: {jsonify_result(result)}")
+            return
+
         create_key_code_params = controller.CreateKeyCodeParams(
             code=args.code, username=args.username, device_id=args.device_id
         )
-        [result] = controller.create_smart_lock_controller(args.hub_ip).create_key_code(
-            params=create_key_code_params
-        )
-        pprint.pprint(f"Create key code result: {result}")
+        [result] = smart_lock_controller.create_key_code(params=create_key_code_params)
+        pprint.pprint(f"Create key code result: {jsonify_result(result)}")
 
-    elif args.action == "delete         ":
+    elif args.action == "delete":
         if not args.username:
             pprint.pprint("Username is required for deleting a key code.")
             return
 
-        if args.device_id:
-            result = controller.create_smart_lock_controller(
-                args.hub_ip
-            ).delete_key_code(args.username, args.device_id)
-        else:
-            result = list(
-                controller.create_smart_lock_controller(
-                    args.hub_ip
-                ).delete_key_code_on_all_devices(args.username)
-            )
+        if args.device_id == -1:
+            require_all_devices(args)
+            for result in smart_lock_controller.delete_key_code_on_all_devices_concurrently(
+                args.username
+            ):
+                pprint.pprint(f"Delete key code result: {jsonify_result(result)}")
+            return
+
+        result = smart_lock_controller.delete_key_code(args.username, args.device_id)
         pprint.pprint(f"Delete key code result: {jsonify_result(result)}")
 
     elif args.action == "get":
         if not args.username:
             pprint.pprint("Username is required for getting a key code.")
             return
-        result = controller.create_smart_lock_controller(args.hub_ip).get_key_code(
+        result = smart_lock_controller.get_key_code(
             args.username, args.device_id
         )
         pprint.pprint(f"Get key code result: {jsonify_result(result)}")
 
     elif args.action == "list":
-        result = controller.create_smart_lock_controller(args.hub_ip).list_key_codes(
-            args.device_id
-        )
+        result = smart_lock_controller.list_key_codes(args.device_id)
         pprint.pprint(f"List key codes result: {dataclasses.asdict(result)}")
 
     elif args.action == "list_devices":
-        result = controller.create_smart_lock_controller(args.hub_ip).list_devices()
+        result = smart_lock_controller.list_devices()
         pprint.pprint(f"List devices result: {jsonify_result(result)}")
 
+    elif args.action == "sync":
+        if not args.desired_state:
+            pprint.pprint("A desired state file is required for syncing key codes.")
+            return
+
+        desired = reconcile.load_desired_state(args.desired_state)
+        plan = reconcile.create_sync_plan(smart_lock_controller, desired, prune=args.prune)
+        print(reconcile.format_plan(plan))
+        if args.dry_run:
+            return
+
+        for result in reconcile.apply_sync_plan(smart_lock_controller, plan):
+            pprint.pprint(f"Sync result: {jsonify_result(result)}")
+
     elif args.action == "update":
         if not args.username or not args.code:
             pprint.pprint(
                 "Both username and code are required for updating a key code."
             )
             return
-        result = controller.create_smart_lock_controller(args.hub_ip).update_key_code(
+        result = smart_lock_controller.update_key_code(
             args.device_id, args.username, args.code
         )
         pprint.pprint(f"Update key code result: {jsonify_result(result)}")
 
 
+def run_batch(
+    smart_lock_controller: controller.SmartLockController, lines: Iterable[str]
+) -> int:
+    """
+    Run one command per line, skipping blank lines and # comments.
+    :return: The number of commands that failed.
+    """
+    failures = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        print(f"> {line}")
+        if not run_command_line(smart_lock_controller, line):
+            failures += 1
+    return failures
+
+
+def run_command_line(smart_lock_controller: controller.SmartLockController, line: str) -> bool:
+    """
+    Parse and run one command such as ``create --username bob --code 12345678``,
+    printing how long it took. Failures are printed rather than raised.
+    :return: Whether the command succeeded.
+    """
+    start = time.perf_counter()
+    try:
+        args = create_command_parser().parse_args(shlex.split(line))
+        run_action(smart_lock_controller, args)
+        succeeded = True
+    except (CommandError, ValueError) as e:
+        print(f"Error: {e}")
+        succeeded = False
+    except Exception as e:
+        print(f"Error: {type(e).__name__}: {e}")
+        succeeded = False
+
+    print(f"({time.perf_counter() - start:.2f}s)")
+    return succeeded
+
+
+def main():
+    args = parse_args()
+
+    if not args.hub_ip:
+        raise ValueError("Hub IP is required")
+
+    # Many commands share the controller, so keep browsers, codes and devices between them
+    long_lived = bool(args.batch or args.shell)
+    smart_lock_controller = controller.create_smart_lock_controller(
+        args.hub_ip,
+        args.command_executor,
+        pool_config=DriverPoolConfig(max_size=max(1, args.concurrency)) if long_lived else None,
+        code_cache=TtlLruCache() if long_lived else None,
+        max_concurrency=args.concurrency,
+        backend=args.backend,
+        maker_api_app_id=args.maker_api_app_id,
+        maker_api_access_token=args.maker_api_access_token,
+        device_refresh_interval_seconds=300.0 if long_lived else None,
+        browser_profile=args.browser_profile,
+    )
+
+    try:
+        if args.shell:
+            LockManagerShell(smart_lock_controller).cmdloop()
+        elif args.batch:
+            batch_file: TextIO = sys.stdin if args.batch == "-" else open(args.batch)
+            with batch_file:
+                failures = run_batch(smart_lock_controller, batch_file)
+            if failures:
+                sys.exit(1)
+        else:
+            run_action(smart_lock_controller, args)
+    finally:
+        smart_lock_controller.close()
+
+
 if __name__ == "__main__":
     # Usage:
     # python -m hubitat_lock_manager.cli --hub-ip
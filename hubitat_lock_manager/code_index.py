@@ -0,0 +1,134 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from hubitat_lock_manager import smart_lock
+
+Location = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class KeyCodeLocation:
+    device_id: int
+    position: int
+    username: str
+
+
+class KeyCodeIndex:
+    """
+    Maps usernames and codes to the devices and positions holding them, so
+    fleet-wide lookups never scan code lists. Each device is indexed from a
+    snapshot of its codes and kept current from the writes made through the
+    controller; a device is due for a new snapshot after ``max_age_seconds``
+    or once it is invalidated.
+    """
+
+    def __init__(
+        self, max_age_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._codes: Dict[int, Dict[int, smart_lock.LockCode]] = {}
+        self._indexed_at: Dict[int, float] = {}
+        self._by_username: Dict[str, Set[Location]] = {}
+        self._by_code: Dict[str, Set[Location]] = {}
+        self._lock = threading.Lock()
+
+    def find_code(self, code: str) -> List[KeyCodeLocation]:
+        with self._lock:
+            return self._locations(self._by_code.get(str(code), ()))
+
+    def find_user(self, username: str) -> List[KeyCodeLocation]:
+        with self._lock:
+            return self._locations(self._by_username.get(username, ()))
+
+    def get_device_code(
+        self, device_id: int, username: str, code: str = ""
+    ) -> Optional[smart_lock.LockCode]:
+        with self._lock:
+            locations = self._by_username.get(username, set()) | self._by_code.get(code, set())
+            positions = [
+                position
+                for location_device_id, position in locations
+                if location_device_id == device_id
+            ]
+            # A name can sit at several positions, always answer with the same one
+            return self._codes[device_id][min(positions)] if positions else None
+
+    def index_device(self, device_id: int, result: smart_lock.ListKeyCodesResult) -> None:
+        with self._lock:
+            self._clear_device(device_id)
+            for lock_code in result.codes:
+                self._add(device_id, lock_code)
+            self._indexed_at[device_id] = self._clock()
+
+    def invalidate(self, device_id: int) -> None:
+        with self._lock:
+            if device_id in self._indexed_at:
+                self._indexed_at[device_id] = -math.inf
+
+    def is_stale(self, device_id: int) -> bool:
+        with self._lock:
+            indexed_at = self._indexed_at.get(device_id)
+        return indexed_at is None or self._clock() - indexed_at >= self.max_age_seconds
+
+    def remove_user(self, device_id: int, username: str) -> None:
+        with self._lock:
+            for location in list(self._by_username.get(username, ())):
+                if location[0] == device_id:
+                    self._remove(device_id, location[1])
+
+    def retain_devices(self, device_ids: Iterable[int]) -> None:
+        """
+        Forget devices that are no longer on the hub.
+        """
+        device_ids = set(device_ids)
+        with self._lock:
+            for device_id in set(self._codes) | set(self._indexed_at):
+                if device_id not in device_ids:
+                    self._clear_device(device_id)
+                    self._indexed_at.pop(device_id, None)
+
+    def set_code(self, device_id: int, lock_code: smart_lock.LockCode) -> None:
+        with self._lock:
+            # A user holds one slot per device, so a rewrite may have moved them
+            for location in list(self._by_username.get(lock_code.name, ())):
+                if location[0] == device_id:
+                    self._remove(device_id, location[1])
+            self._remove(device_id, lock_code.position)
+            self._add(device_id, lock_code)
+
+    def _add(self, device_id: int, lock_code: smart_lock.LockCode) -> None:
+        location = (device_id, lock_code.position)
+        self._codes.setdefault(device_id, {})[lock_code.position] = lock_code
+        self._by_username.setdefault(lock_code.name, set()).add(location)
+        self._by_code.setdefault(str(lock_code.code), set()).add(location)
+
+    def _clear_device(self, device_id: int) -> None:
+        for position in list(self._codes.get(device_id, ())):
+            self._remove(device_id, position)
+        self._codes.pop(device_id, None)
+
+    def _locations(self, locations: Iterable[Location]) -> List[KeyCodeLocation]:
+        return [
+            KeyCodeLocation(device_id, position, self._codes[device_id][position].name)
+            for device_id, position in sorted(locations)
+        ]
+
+    def _remove(self, device_id: int, position: int) -> None:
+        lock_code = self._codes.get(device_id, {}).pop(position, None)
+        if lock_code is None:
+            return
+
+        location = (device_id, position)
+        for index, key in (
+            (self._by_username, lock_code.name),
+            (self._by_code, str(lock_code.code)),
+        ):
+            locations = index.get(key)
+            if locations is not None:
+                locations.discard(location)
+                if not locations:
+                    del index[key]
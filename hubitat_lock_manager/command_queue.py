@@ -0,0 +1,164 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from hubitat_lock_manager import metrics, smart_lock
+
+ApplyOperations = Callable[
+    [int, List[smart_lock.KeyCodeOperation]], List[smart_lock.KeyCodeOperationResult]
+]
+
+
+@dataclass(frozen=True)
+class QueuedOperation:
+    operation: smart_lock.KeyCodeOperation
+    future: Future
+
+
+class DeviceCommandQueue:
+    """
+    Serializes key code writes per device while different devices run in
+    parallel on up to ``max_workers`` threads. Whatever is queued for a device
+    when its turn comes is coalesced and applied in a single device visit.
+    """
+
+    def __init__(
+        self,
+        apply_operations: ApplyOperations,
+        max_workers: int = 1,
+        max_batch_size: int = 50,
+    ):
+        self.max_batch_size = max_batch_size
+        self._apply_operations = apply_operations
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="lock-queue"
+        )
+        self._pending: Dict[int, List[QueuedOperation]] = {}
+        self._active: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def run(self, device_id: int, operation: smart_lock.KeyCodeOperation) -> Any:
+        """
+        Queue one operation, wait for it and return its result, raising the
+        exception it failed with.
+        """
+        (future,) = self.submit(device_id, [operation])
+        result = future.result()
+        if result.exception is not None:
+            raise result.exception
+        return result.result
+
+    def submit(
+        self, device_id: int, operations: Iterable[smart_lock.KeyCodeOperation]
+    ) -> List[Future]:
+        """
+        Queue operations for a device. They are queued together, so they are
+        applied in the same device visit.
+        :return: One future per operation resolving to its ``KeyCodeOperationResult``.
+        """
+        device_id = int(device_id)
+        queued = [QueuedOperation(operation, Future()) for operation in operations]
+
+        with self._lock:
+            pending = self._pending.setdefault(device_id, [])
+            pending.extend(queued)
+            metrics.LOCK_COMMAND_QUEUE_DEPTH.set(len(pending), device_id=device_id)
+            start = device_id not in self._active
+            self._active.add(device_id)
+
+        # At most one worker drains a device, which keeps its writes in order
+        if start:
+            self._executor.submit(self._drain, device_id)
+        return [entry.future for entry in queued]
+
+    def _drain(self, device_id: int) -> None:
+        while True:
+            with self._lock:
+                pending = self._pending.get(device_id, [])
+                batch = pending[: self.max_batch_size]
+                del pending[: self.max_batch_size]
+                metrics.LOCK_COMMAND_QUEUE_DEPTH.set(len(pending), device_id=device_id)
+                if not batch:
+                    self._pending.pop(device_id, None)
+                    self._active.discard(device_id)
+                    return
+
+            self._run_batch(device_id, batch)
+
+    def _run_batch(self, device_id: int, batch: List[QueuedOperation]) -> None:
+        # Drop operations whose callers gave up while they were queued
+        batch = [entry for entry in batch if entry.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        merged = coalesce_operations([entry.operation for entry in batch])
+        metrics.LOCK_COMMANDS_COALESCED.inc(len(batch) - len(merged))
+        try:
+            results = self._apply_operations(device_id, [operation for operation, _ in merged])
+        except Exception as e:
+            # The device could not be visited at all, so none of the batch ran
+            for entry in batch:
+                entry.future.set_exception(e)
+            return
+
+        for (_, indices), result in zip(merged, results):
+            for index in indices:
+                entry = batch[index]
+                entry.future.set_result(adapt_result(entry.operation, result))
+
+
+def adapt_result(
+    operation: smart_lock.KeyCodeOperation, result: smart_lock.KeyCodeOperationResult
+) -> smart_lock.KeyCodeOperationResult:
+    """
+    Report the result of a coalesced operation to each operation it replaced.
+    """
+    return replace(result, operation=operation)
+
+
+def coalesce_operations(
+    operations: List[smart_lock.KeyCodeOperation],
+) -> List[Tuple[smart_lock.KeyCodeOperation, List[int]]]:
+    """
+    Merge adjacent operations on the same user into one.
+    :return: The operations to apply, each with the indices of the operations it stands for.
+    """
+    merged: List[Tuple[smart_lock.KeyCodeOperation, List[int]]] = []
+    for index, operation in enumerate(operations):
+        if merged:
+            previous, indices = merged[-1]
+            combined = merge_operations(previous, operation)
+            if combined is not None:
+                merged[-1] = (combined, indices + [index])
+                continue
+
+        merged.append((operation, [index]))
+    return merged
+
+
+def merge_operations(
+    first: smart_lock.KeyCodeOperation, second: smart_lock.KeyCodeOperation
+) -> Optional[smart_lock.KeyCodeOperation]:
+    """
+    Return one operation with the same effect as ``first`` followed by
+    ``second``, or None when they have to run separately.
+    """
+    if first.username != second.username:
+        return None
+
+    # Repeated requests, such as client retries, only need to run once
+    if first == second:
+        return first
+
+    # A delete is never folded into the write after it: if that write failed, the old
+    # code would stay on the lock although its removal was requested
+
+    # Only the last of several updates is visible on the lock
+    if first.action == smart_lock.UPDATE_ACTION and second.action == smart_lock.UPDATE_ACTION:
+        return second
+
+    return None
@@ -1,7 +1,43 @@
 import dataclasses
-from typing import Iterable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from hubitat_lock_manager import smart_lock
+from hubitat_lock_manager import hub_http, inventory, maker_api, metrics, smart_lock
+from hubitat_lock_manager.browser_profile import DEFAULT_PROFILE, get_browser_profile
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.code_index import KeyCodeIndex, KeyCodeLocation
+from hubitat_lock_manager.command_queue import DeviceCommandQueue
+from hubitat_lock_manager.driver_pool import DriverPoolConfig
+from hubitat_lock_manager.positions import PositionAllocator
+
+HUB_HTTP_BACKEND = "hub_http"
+MAKER_API_BACKEND = "maker_api"
+WEBDRIVER_BACKEND = "webdriver"
+BACKENDS = (WEBDRIVER_BACKEND, MAKER_API_BACKEND, HUB_HTTP_BACKEND)
+
+
+@dataclasses.dataclass(frozen=True)
+class BulkKeyCodeOperation:
+    action: str
+    username: str
+    device_id: int
+    code: str = ""
+
+
+@dataclasses.dataclass(frozen=True)
+class BulkKeyCodeOperationResult:
+    index: int
+    device_id: int
+    action: str
+    username: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
 
 
 @dataclasses.dataclass(frozen=True)
@@ -15,9 +51,154 @@ class CreateKeyCodeParams:
         return self.device_id > -1
 
 
+@dataclasses.dataclass(frozen=True)
+class DeviceKeyCodes:
+    device_id: int
+    name: str
+    codes: List[smart_lock.LockCode] = dataclasses.field(default_factory=list)
+    age_seconds: Optional[float] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclasses.dataclass(frozen=True)
+class DeviceOperationResult:
+    device_id: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclasses.dataclass(frozen=True)
+class FleetKeyCodesResult:
+    devices: List[DeviceKeyCodes]
+
+
+@dataclasses.dataclass(frozen=True)
+class KeyCodeLookupResult:
+    locations: List[KeyCodeLocation]
+    failed_devices: List[DeviceOperationResult]
+
+
 @dataclasses.dataclass(frozen=True)
 class SmartLockController:
     lock_provider: "SmartLockProvider"
+    max_concurrency: int = 1
+    command_queue: Optional[DeviceCommandQueue] = None
+    code_index: KeyCodeIndex = dataclasses.field(default_factory=KeyCodeIndex)
+
+    def apply_bulk_operations(
+        self,
+        operations: Iterable[BulkKeyCodeOperation],
+        max_concurrency: Optional[int] = None,
+    ) -> List[BulkKeyCodeOperationResult]:
+        """
+        Apply many create, delete and update operations. Operations are grouped
+        by device, each device's group runs in a single visit and devices run
+        in parallel. With a command queue, each group is queued behind any other
+        writes to its device.
+        :param operations: The operations, applied in order within each device.
+        :param max_concurrency: Devices processed at once, defaults to the controller's limit.
+        :return: One result per operation, in the order the operations were given.
+        """
+        results = self.apply_bulk_operations_as_completed(operations, max_concurrency)
+        return sorted(results, key=lambda result: result.index)
+
+    def apply_bulk_operations_as_completed(
+        self,
+        operations: Iterable[BulkKeyCodeOperation],
+        max_concurrency: Optional[int] = None,
+    ) -> Iterable[BulkKeyCodeOperationResult]:
+        """
+        Apply bulk operations like ``apply_bulk_operations``, yielding each
+        device's results as soon as that device finishes.
+        :param operations: The operations, applied in order within each device.
+        :param max_concurrency: Devices processed at once, defaults to the controller's limit.
+        :return: One result per operation; invalid operations first, then device by device.
+        """
+        operations = list(operations)
+        indices_by_device: Dict[int, List[int]] = {}
+
+        for index, operation in enumerate(operations):
+            try:
+                validate_bulk_operation(operation)
+            except ValueError as e:
+                yield create_bulk_result(index, operation, error=e)
+                continue
+            indices_by_device.setdefault(int(operation.device_id), []).append(index)
+
+        def apply_device_operations(device_id: int):
+            device_operations = [
+                smart_lock.KeyCodeOperation(
+                    operations[index].action,
+                    operations[index].username,
+                    operations[index].code,
+                )
+                for index in indices_by_device[device_id]
+            ]
+            with track_lock_operation("apply_key_code_operations", device_id):
+                if self.command_queue is not None:
+                    futures = self.command_queue.submit(device_id, device_operations)
+                    return [future.result() for future in futures]
+
+                return self.apply_key_code_operations(device_id, device_operations)
+
+        for device_result in self.run_on_devices(
+            indices_by_device, apply_device_operations, max_concurrency
+        ):
+            indices = indices_by_device[device_result.device_id]
+            if not device_result.success:
+                # The device could not be visited at all, so none of its operations ran
+                for index in indices:
+                    yield create_bulk_result(
+                        index,
+                        operations[index],
+                        error=device_result.error,
+                        error_type=device_result.error_type,
+                    )
+                continue
+
+            for index, operation_result in zip(indices, device_result.result):
+                if operation_result.error is not None:
+                    # Reported rather than raised, so track_lock_operation never sees it
+                    metrics.LOCK_OPERATION_ERRORS.inc(
+                        operation=f"{operation_result.operation.action}_key_code",
+                        error_type=operation_result.error_type,
+                    )
+                yield create_bulk_result(
+                    index,
+                    operations[index],
+                    result=operation_result.result,
+                    error=operation_result.error,
+                    error_type=operation_result.error_type,
+                )
+
+    def apply_key_code_operations(
+        self, device_id: int, operations: List[smart_lock.KeyCodeOperation]
+    ) -> List[smart_lock.KeyCodeOperationResult]:
+        """
+        Apply operations to a device in one visit, keeping the code index current.
+        """
+        return apply_and_index_key_code_operations(
+            self.lock_provider, self.code_index, device_id, operations
+        )
+
+    def close(self) -> None:
+        """
+        Release the resources held by the lock backend, such as pooled browsers.
+        """
+        # Let queued writes finish before their browsers go away
+        if self.command_queue is not None:
+            self.command_queue.close()
+        self.lock_provider.smart_lock_config.close()
 
     def create_key_code(
         self, params: CreateKeyCodeParams
@@ -42,11 +223,13 @@ class SmartLockController:
         if not code.isdigit() or len(code) != 8:
             raise ValueError("Code must be 8 digits and numeric")
 
-        existing_key_code = self.get_key_code(username, device_id, code)
-        if not existing_key_code:
-            params = smart_lock.CreateKeyCodeParams(code=code, username=username)
+        with track_lock_operation("create_key_code", device_id):
             device = self.lock_provider.get_smart_lock(device_id)
-            return device.create_key_code(params)
+            existing_codes = index_key_codes(self.code_index, device_id, device.list_key_codes())
+            existing_key_code = find_key_code(existing_codes, username, code)
+            if not existing_key_code:
+                operation = smart_lock.KeyCodeOperation(smart_lock.CREATE_ACTION, username, code)
+                return self.run_key_code_operation(device_id, operation)
 
         if existing_key_code.code != code:
             raise ValueError(f"Key code for {username} already exists")
@@ -60,12 +243,33 @@ class SmartLockController:
         for device in result.devices:
             yield self.create_key_code_on_one_device(username, code, device.id)
 
+    def create_key_code_on_all_devices_concurrently(
+        self, username: str, code: str, max_concurrency: Optional[int] = None
+    ) -> Iterable[DeviceOperationResult]:
+        """
+        Create a key code on every device using a bounded pool of workers.
+        :param username: The user the key code belongs to.
+        :param code: The 8-digit code.
+        :param max_concurrency: Devices processed at once, defaults to the controller's limit.
+        :return: Per-device results in the order the devices finish.
+        """
+        # Validate once up front rather than failing identically on every device
+        if not code.isdigit() or len(code) != 8:
+            raise ValueError("Code must be 8 digits and numeric")
+
+        device_ids = [device.id for device in self.list_devices().devices]
+        return self.run_on_devices(
+            device_ids,
+            lambda device_id: self.create_key_code_on_one_device(username, code, device_id),
+            max_concurrency,
+        )
+
     def delete_key_code(
         self, username: str, device_id: int
     ) -> smart_lock.DeleteKeyCodeResult:
-        device = self.lock_provider.get_smart_lock(device_id)
-        params = smart_lock.DeleteKeyCodeParams(username)
-        return device.delete_key_code(params)
+        with track_lock_operation("delete_key_code", device_id):
+            operation = smart_lock.KeyCodeOperation(smart_lock.DELETE_ACTION, username)
+            return self.run_key_code_operation(device_id, operation)
 
     def delete_key_code_on_all_devices(
         self, username: str
@@ -74,38 +278,329 @@ class SmartLockController:
         for device in result.devices:
             yield self.delete_key_code(username, device.id)
 
+    def delete_key_code_on_all_devices_concurrently(
+        self, username: str, max_concurrency: Optional[int] = None
+    ) -> Iterable[DeviceOperationResult]:
+        """
+        Delete a user's key code from every device using a bounded pool of workers.
+        :param username: The user whose key code is deleted.
+        :param max_concurrency: Devices processed at once, defaults to the controller's limit.
+        :return: Per-device results in the order the devices finish.
+        """
+        device_ids = [device.id for device in self.list_devices().devices]
+        return self.run_on_devices(
+            device_ids,
+            lambda device_id: self.delete_key_code(username, device_id),
+            max_concurrency,
+        )
+
+    def find_key_codes_by_code(
+        self, code: str, max_concurrency: Optional[int] = None
+    ) -> KeyCodeLookupResult:
+        """
+        Find every device and position where a code is in use, such as to
+        check a new code for collisions before handing it out.
+        :param code: The code to look for.
+        :param max_concurrency: Devices read at once when the index needs refreshing.
+        :return: Where the code is set, plus the devices that could not be read.
+        """
+        failed_devices = self.refresh_code_index(max_concurrency)
+        return KeyCodeLookupResult(self.code_index.find_code(code), failed_devices)
+
+    def find_key_codes_for_user(
+        self, username: str, max_concurrency: Optional[int] = None
+    ) -> KeyCodeLookupResult:
+        """
+        Find every device and position holding a code for a user.
+        :param username: The user to look for.
+        :param max_concurrency: Devices read at once when the index needs refreshing.
+        :return: Where the user has a code, plus the devices that could not be read.
+        """
+        failed_devices = self.refresh_code_index(max_concurrency)
+        return KeyCodeLookupResult(self.code_index.find_user(username), failed_devices)
+
     def get_key_code(
         self, username: str, device_id: int, code: str = ""
     ) -> Optional[smart_lock.LockCode]:
-        return next(
-            (
-                lock_code
-                for lock_code in self.list_key_codes(device_id).codes
-                if lock_code.name == username or lock_code.code == code
-            ),
-            None,
-        )
+        device_id = int(device_id)
+        if self.code_index.is_stale(device_id):
+            self.list_key_codes(device_id)
+        return self.code_index.get_device_code(device_id, username, code)
 
     def list_devices(self) -> smart_lock.ListDevicesResult:
-        return self.lock_provider.list_smart_locks()
+        with track_lock_operation("list_devices"):
+            return self.lock_provider.list_smart_locks()
+
+    def list_all_key_codes(self, max_concurrency: Optional[int] = None) -> FleetKeyCodesResult:
+        """
+        Read the key codes of every device in parallel. Devices whose codes are
+        cached are answered from the cache without visiting the lock.
+        :param max_concurrency: Devices read at once, defaults to the controller's limit.
+        :return: One entry per device in device list order, with how old its codes are.
+        """
+        names = {int(device.id): device.name for device in self.list_devices().devices}
+        code_cache = self.lock_provider.smart_lock_config.code_cache
+
+        def read_device(device_id: int) -> DeviceKeyCodes:
+            codes = self.list_key_codes(device_id).codes
+            return DeviceKeyCodes(
+                device_id,
+                names[device_id],
+                list(codes),
+                age_seconds=get_snapshot_age(code_cache, device_id),
+            )
+
+        snapshots: Dict[int, DeviceKeyCodes] = {}
+        for result in self.run_on_devices(names, read_device, max_concurrency):
+            if result.success:
+                snapshots[result.device_id] = result.result
+            else:
+                snapshots[result.device_id] = DeviceKeyCodes(
+                    result.device_id,
+                    names[result.device_id],
+                    error=result.error,
+                    error_type=result.error_type,
+                )
+
+        return FleetKeyCodesResult([snapshots[device_id] for device_id in names])
 
     def list_key_codes(self, device_id: int) -> smart_lock.ListKeyCodesResult:
-        return self.lock_provider.get_smart_lock(device_id).list_key_codes()
+        with track_lock_operation("list_key_codes", device_id):
+            result = self.lock_provider.get_smart_lock(device_id).list_key_codes()
+            return index_key_codes(self.code_index, int(device_id), result)
+
+    def refresh_code_index(
+        self, max_concurrency: Optional[int] = None
+    ) -> List[DeviceOperationResult]:
+        """
+        Read the codes of every device missing from the index or due for a new
+        snapshot, in parallel. Devices already indexed are not visited.
+        :return: The devices that could not be read.
+        """
+        device_ids = [device.id for device in self.list_devices().devices]
+        self.code_index.retain_devices(device_ids)
+        stale_device_ids = [
+            device_id for device_id in device_ids if self.code_index.is_stale(device_id)
+        ]
+        return [
+            result
+            for result in self.run_on_devices(
+                stale_device_ids, self.list_key_codes, max_concurrency
+            )
+            if not result.success
+        ]
+
+    def refresh_devices(self) -> smart_lock.ListDevicesResult:
+        """
+        Reload the device list from the hub, bypassing any cached inventory.
+        """
+        refresh_devices = self.lock_provider.smart_lock_config.refresh_devices
+        if refresh_devices is None:
+            return self.list_devices()
+
+        with track_lock_operation("refresh_devices"):
+            return refresh_devices()
+
+    def run_key_code_operation(
+        self, device_id: int, operation: smart_lock.KeyCodeOperation
+    ) -> Any:
+        """
+        Apply one key code write, through the device's command queue if there is one.
+        """
+        if self.command_queue is not None:
+            return self.command_queue.run(device_id, operation)
+
+        (result,) = self.apply_key_code_operations(device_id, [operation])
+        if result.exception is not None:
+            raise result.exception
+        return result.result
+
+    def run_on_devices(
+        self,
+        device_ids: Iterable[int],
+        operation: Callable[[int], Any],
+        max_concurrency: Optional[int] = None,
+    ) -> Iterable[DeviceOperationResult]:
+        """
+        Run an operation against several devices in parallel, collecting
+        failures per device instead of stopping at the first one.
+        """
+        device_ids = list(device_ids)
+        if not device_ids:
+            return
+
+        max_workers = max(1, min(max_concurrency or self.max_concurrency, len(device_ids)))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {
+            executor.submit(operation, device_id): device_id for device_id in device_ids
+        }
+        try:
+            for future in as_completed(futures):
+                device_id = futures[future]
+                try:
+                    yield DeviceOperationResult(device_id, result=future.result())
+                except Exception as e:
+                    yield DeviceOperationResult(
+                        device_id, error=str(e), error_type=type(e).__name__
+                    )
+        finally:
+            # Stop pending devices if the caller abandons the results early
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def update_key_code(
+        self, device_id: int, username: str, code: str
+    ) -> smart_lock.CreateKeyCodeResult:
+        # Ensure code is 8 digits and numeric
+        if not code.isdigit() or len(code) != 8:
+            raise ValueError("Code must be 8 digits and numeric")
 
-    def update_key_code(self, device_id: int, username: str, code: str):
-        self.delete_key_code(username, device_id)
-        self.create_key_code_on_one_device(username, code, device_id)
+        with track_lock_operation("update_key_code", device_id):
+            operation = smart_lock.KeyCodeOperation(smart_lock.UPDATE_ACTION, username, code)
+            return self.run_key_code_operation(device_id, operation)
+
+
+def apply_and_index_key_code_operations(
+    lock_provider: "SmartLockProvider",
+    code_index: KeyCodeIndex,
+    device_id: int,
+    operations: List[smart_lock.KeyCodeOperation],
+) -> List[smart_lock.KeyCodeOperationResult]:
+    device_id = int(device_id)
+    try:
+        device = lock_provider.get_smart_lock(device_id)
+        results = device.apply_key_code_operations(operations)
+    except Exception:
+        code_index.invalidate(device_id)
+        raise
+
+    # Record the writes in the order they reached the lock
+    for result in results:
+        operation = result.operation
+        if not result.success:
+            # The write may have partly landed, so take a new snapshot on the next lookup
+            code_index.invalidate(device_id)
+        elif operation.action == smart_lock.DELETE_ACTION:
+            code_index.remove_user(device_id, operation.username)
+        else:
+            code_index.set_code(
+                device_id,
+                smart_lock.LockCode(operation.code, operation.username, result.result.position),
+            )
+    return results
+
+
+def create_bulk_result(
+    index: int,
+    operation: BulkKeyCodeOperation,
+    result: Optional[Any] = None,
+    error: Optional[Any] = None,
+    error_type: Optional[str] = None,
+) -> BulkKeyCodeOperationResult:
+    if isinstance(error, Exception):
+        error_type = type(error).__name__
+        error = str(error)
+
+    return BulkKeyCodeOperationResult(
+        index,
+        int(operation.device_id),
+        operation.action,
+        operation.username,
+        result=result,
+        error=error,
+        error_type=error_type,
+    )
+
+
+def find_key_code(
+    result: smart_lock.ListKeyCodesResult, username: str, code: str = ""
+) -> Optional[smart_lock.LockCode]:
+    return next(
+        (
+            lock_code
+            for lock_code in result.codes
+            if lock_code.name == username or lock_code.code == code
+        ),
+        None,
+    )
+
+
+def get_snapshot_age(
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]], device_id: int
+) -> float:
+    # Without a cached entry the codes were just read from the lock
+    entry = code_cache.get_entry(device_id) if code_cache is not None else None
+    return code_cache.age(entry) if entry is not None else 0.0
+
+
+def index_key_codes(
+    code_index: KeyCodeIndex, device_id: int, result: smart_lock.ListKeyCodesResult
+) -> smart_lock.ListKeyCodesResult:
+    # Freeze the codes so indexing never consumes the caller's iterator
+    result = smart_lock.ListKeyCodesResult(codes=list(result.codes))
+    code_index.index_device(device_id, result)
+    return result
+
+
+@contextmanager
+def track_lock_operation(operation: str, device_id: Optional[int] = None):
+    """
+    Time a lock operation, count it as in flight on its device and record
+    the type of any exception it raises.
+    """
+    if device_id is not None:
+        metrics.LOCK_OPERATIONS_IN_FLIGHT.inc(device_id=int(device_id))
+    try:
+        with metrics.LOCK_OPERATION_DURATION.time(operation=operation):
+            yield
+    except Exception as e:
+        metrics.LOCK_OPERATION_ERRORS.inc(operation=operation, error_type=type(e).__name__)
+        raise
+    finally:
+        if device_id is not None:
+            metrics.LOCK_OPERATIONS_IN_FLIGHT.dec(device_id=int(device_id))
+
+
+def validate_bulk_operation(operation: BulkKeyCodeOperation) -> None:
+    if operation.action not in smart_lock.KEY_CODE_ACTIONS:
+        raise ValueError(
+            f"Unknown action {operation.action}, expected one of {smart_lock.KEY_CODE_ACTIONS}"
+        )
+
+    if not operation.username:
+        raise ValueError("Username is required")
+
+    # Ensure code is 8 digits and numeric
+    if operation.action != smart_lock.DELETE_ACTION and (
+        not operation.code.isdigit() or len(operation.code) != 8
+    ):
+        raise ValueError("Code must be 8 digits and numeric")
 
 
 @dataclasses.dataclass(frozen=True)
 class SmartLockControllerFactory:
     smart_lock_factory: smart_lock.Factory
+    max_concurrency: int = 1
+    serialize_writes: bool = False
+    code_index_max_age_seconds: float = 30.0
 
     def create_smart_lock_controller(
         self, config: smart_lock.SmartLockConfig
     ) -> SmartLockController:
         provider = SmartLockProvider(self.smart_lock_factory, config)
-        return SmartLockController(provider)
+        code_index = KeyCodeIndex(self.code_index_max_age_seconds)
+        if not self.serialize_writes:
+            return SmartLockController(provider, self.max_concurrency, code_index=code_index)
+
+        # One device visit at a time per lock, and as many locks at once as the backend allows
+        command_queue = DeviceCommandQueue(
+            lambda device_id, operations: apply_and_index_key_code_operations(
+                provider, code_index, device_id, operations
+            ),
+            max_workers=self.max_concurrency,
+        )
+        return SmartLockController(provider, self.max_concurrency, command_queue, code_index)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -124,14 +619,89 @@ class SmartLockProvider:
         return self.smart_lock_factory.list_smart_locks()
 
 
-def create_smart_lock_controller(hub_ip: str, command_executor: str) -> SmartLockController:
-    # Configure how the code will interact with the Hubitat web interface
-    webdriver_config = smart_lock.WebdriverConfig(hub_ip, command_executor)
+def create_smart_lock_controller(
+    hub_ip: str,
+    command_executor: str,
+    pool_config: Optional[DriverPoolConfig] = None,
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]] = None,
+    write_confirmation: Optional[
+        smart_lock.WriteConfirmationConfig
+    ] = smart_lock.WriteConfirmationConfig(),
+    max_concurrency: Optional[int] = None,
+    backend: str = WEBDRIVER_BACKEND,
+    maker_api_app_id: str = "",
+    maker_api_access_token: str = "",
+    device_refresh_interval_seconds: Optional[float] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+    serialize_writes: bool = True,
+    browser_profile: str = DEFAULT_PROFILE,
+) -> SmartLockController:
+    if backend == MAKER_API_BACKEND:
+        if not maker_api_app_id or not maker_api_access_token:
+            raise ValueError("Maker API app id and access token are required")
 
-    # Create a more specific configuration tailored for using a web browser
-    config = smart_lock.create_webdriver_smart_lock_config(webdriver_config)
+        # Talk to the hub's Maker API over HTTP instead of driving a browser
+        maker_api_config = maker_api.MakerApiConfig(
+            hub_ip,
+            maker_api_app_id,
+            maker_api_access_token,
+            write_confirmation=write_confirmation,
+        )
+        config = maker_api.create_maker_api_smart_lock_config(
+            maker_api_config, code_cache, position_allocator
+        )
+
+        if max_concurrency is None:
+            max_concurrency = 4
+
+    elif backend == HUB_HTTP_BACKEND:
+        # Read and submit the hub's own device pages over HTTP, without a browser
+        hub_http_config = hub_http.HubHttpConfig(hub_ip, write_confirmation=write_confirmation)
+        config = hub_http.create_hub_http_smart_lock_config(
+            hub_http_config, code_cache, position_allocator
+        )
+
+        if max_concurrency is None:
+            max_concurrency = 4
+
+    elif backend == WEBDRIVER_BACKEND:
+        # Configure how the code will interact with the Hubitat web interface
+        webdriver_config = smart_lock.WebdriverConfig(
+            hub_ip,
+            command_executor,
+            write_confirmation=write_confirmation,
+            browser_profile=get_browser_profile(browser_profile),
+        )
+
+        # Reuse browser sessions across operations instead of launching one per call
+        if pool_config is not None:
+            webdriver_config = smart_lock.create_pooled_webdriver_config(
+                webdriver_config, pool_config
+            )
+
+        # Create a more specific configuration tailored for using a web browser
+        config = smart_lock.create_webdriver_smart_lock_config(
+            webdriver_config, code_cache, position_allocator
+        )
+
+        # Never run more devices at once than there are browsers to serve them
+        if max_concurrency is None:
+            max_concurrency = pool_config.max_size if pool_config else 1
+
+    else:
+        raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
+
+    # Serve the device list from memory and refresh it in the background
+    if device_refresh_interval_seconds is not None:
+        config = inventory.create_inventory_smart_lock_config(
+            config, device_refresh_interval_seconds
+        )
 
+    # Re-read codes for fleet lookups as often as the code cache would
     smart_lock_controller_factory = SmartLockControllerFactory(
-        config.smart_lock_factory
+        config.smart_lock_factory,
+        max_concurrency,
+        serialize_writes,
+        code_cache.ttl_seconds if code_cache is not None else 30.0,
     )
     return smart_lock_controller_factory.create_smart_lock_controller(config)
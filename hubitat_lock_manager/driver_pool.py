@@ -0,0 +1,308 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from hubitat_lock_manager import metrics
+
+
+@dataclass(frozen=True)
+class DriverPoolConfig:
+    min_size: int = 0
+    max_size: int = 2
+    max_age_seconds: float = 600.0
+    max_uses: int = 50
+    checkout_timeout_seconds: float = 120.0
+    # Standby drivers are touched and resized this often, 0 disables the background warmer
+    keepalive_interval_seconds: float = 0.0
+    # Upper bound on idle drivers kept warm when recent demand calls for more than min_size
+    max_standby: int = 0
+    # How far back checkouts count towards the standby size
+    demand_window_seconds: float = 300.0
+
+
+class PooledDriver:
+    def __init__(self, driver: Any, created_at: float):
+        self.driver = driver
+        self.created_at = created_at
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    A bounded pool of reusable WebDriver sessions.
+
+    Drivers are created lazily up to ``max_size``, health checked when they are
+    checked out and recycled once they exceed ``max_age_seconds`` or
+    ``max_uses``.
+
+    With a keepalive interval, a background warmer keeps standby drivers idle
+    and ready: each is prepared by ``warm_driver`` when created, touched every
+    interval so remote sessions are not reaped, replaced before it expires and
+    the standby count follows recent demand, see ``standby_target``.
+    """
+
+    def __init__(
+        self,
+        create_driver: Callable[[], Any],
+        config: DriverPoolConfig = DriverPoolConfig(),
+        clock: Callable[[], float] = time.monotonic,
+        quit_driver: Callable[[Any], None] = lambda driver: driver.quit(),
+        warm_driver: Callable[[Any], None] = lambda driver: None,
+    ):
+        if config.max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        if not 0 <= config.min_size <= config.max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self.config = config
+        self._create_driver = create_driver
+        self._quit_driver = quit_driver
+        self._warm_driver = warm_driver
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._idle: List[PooledDriver] = []
+        self._size = 0
+        self._closed = False
+        # When each recent checkout was returned and how long it was held
+        self._usage: Deque[Tuple[float, float]] = deque()
+        self._stop_warmer = threading.Event()
+        self._warmer: Optional[threading.Thread] = None
+
+    @property
+    def idle_count(self) -> int:
+        with self._condition:
+            return len(self._idle)
+
+    @property
+    def size(self) -> int:
+        with self._condition:
+            return self._size
+
+    @contextmanager
+    def borrow(self):
+        entry = self._checkout()
+        started = self._clock()
+        try:
+            yield entry.driver
+        finally:
+            self._record_usage(started)
+            self._checkin(entry)
+
+    def close(self) -> None:
+        self._stop_warmer.set()
+        if self._warmer is not None and self._warmer is not threading.current_thread():
+            self._warmer.join()
+
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for entry in idle:
+            self._quit(entry)
+
+    def maintain(self) -> None:
+        """
+        Touch every idle driver, replace those that died or would expire before
+        the next keepalive and resize the warm standby set to ``standby_target``.
+        """
+        self._touch_idle()
+        target = self.standby_target()
+        metrics.WEBDRIVER_STANDBY_TARGET.set(target)
+        self._trim_idle(target)
+        self._fill(target)
+
+    def standby_target(self) -> int:
+        """
+        The number of idle drivers to keep warm. Total checkout time over the
+        demand window divided by its length is the average number of drivers in
+        use, i.e. the checkout rate times how long each is held. Rounded up and
+        kept between ``min_size`` and ``max_standby``, within ``max_size``.
+        """
+        with self._condition:
+            self._prune_usage()
+            busy_seconds = sum(held for _, held in self._usage)
+            in_use = self._size - len(self._idle)
+
+        demand = math.ceil(busy_seconds / self.config.demand_window_seconds)
+        target = max(self.config.min_size, min(demand, self.config.max_standby))
+        return max(0, min(target, self.config.max_size - in_use))
+
+    def start(self) -> None:
+        """
+        Eagerly create drivers until the pool holds ``min_size`` of them and
+        start the warmer when a keepalive interval is configured.
+        """
+        self._fill(self.config.min_size)
+
+        if self.config.keepalive_interval_seconds > 0 and self._warmer is None:
+            self._warmer = threading.Thread(
+                target=self._run_warmer, name="driver-pool-warmer", daemon=True
+            )
+            self._warmer.start()
+
+    def _checkin(self, entry: PooledDriver, used: bool = True) -> None:
+        if used:
+            entry.uses += 1
+
+        with self._condition:
+            keep = not self._closed and not self._is_expired(entry)
+            if keep:
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+        if not keep:
+            self._quit(entry)
+
+    def _checkout(self) -> PooledDriver:
+        deadline = self._clock() + self.config.checkout_timeout_seconds
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+
+                    if self._size < self.config.max_size:
+                        self._size += 1
+                        entry = None
+                        break
+
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a WebDriver session")
+                    self._condition.wait(remaining)
+
+            if entry is None:
+                return self._new_entry()
+
+            if not self._is_expired(entry) and self._is_healthy(entry):
+                return entry
+
+            self._discard(entry)
+
+    def _fill(self, idle_target: int) -> None:
+        while True:
+            with self._condition:
+                if (
+                    self._closed
+                    or len(self._idle) >= idle_target
+                    or self._size >= self.config.max_size
+                ):
+                    return
+                self._size += 1
+
+            entry = self._new_entry(warm=True)
+            self._checkin(entry, used=False)
+
+    def _discard(self, entry: PooledDriver) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+        self._quit(entry)
+
+    def _is_expired(self, entry: PooledDriver, margin_seconds: float = 0.0) -> bool:
+        if entry.uses >= self.config.max_uses:
+            return True
+
+        age = self._clock() - entry.created_at
+        return age + margin_seconds >= self.config.max_age_seconds
+
+    def _new_entry(self, warm: bool = False) -> PooledDriver:
+        try:
+            driver = self._create_driver()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        if warm:
+            try:
+                self._warm_driver(driver)
+            except Exception as e:
+                # A cold driver still works, its first request just loads the page itself
+                logging.error(f"Warming a WebDriver session failed: {str(e)}")
+
+        return PooledDriver(driver, created_at=self._clock())
+
+    def _prune_usage(self) -> None:
+        window_start = self._clock() - self.config.demand_window_seconds
+        while self._usage and self._usage[0][0] < window_start:
+            self._usage.popleft()
+
+    def _record_usage(self, started: float) -> None:
+        now = self._clock()
+        with self._condition:
+            self._usage.append((now, now - started))
+            self._prune_usage()
+
+    def _run_warmer(self) -> None:
+        while not self._stop_warmer.wait(self.config.keepalive_interval_seconds):
+            try:
+                self.maintain()
+            except Exception as e:
+                # The browser host may be briefly unavailable, the next interval retries
+                logging.error(f"Driver pool maintenance failed: {str(e)}")
+
+    def _touch_idle(self) -> None:
+        with self._condition:
+            entries = list(self._idle)
+
+        for entry in entries:
+            with self._condition:
+                # Leave drivers that were borrowed in the meantime alone
+                if entry not in self._idle:
+                    continue
+                self._idle.remove(entry)
+
+            # A request should never be the one to find a driver dead or expired
+            margin_seconds = self.config.keepalive_interval_seconds
+            if not self._is_expired(entry, margin_seconds) and self._is_healthy(entry):
+                self._checkin(entry, used=False)
+            else:
+                self._discard(entry)
+
+    def _trim_idle(self, idle_target: int) -> None:
+        with self._condition:
+            surplus = len(self._idle) - idle_target
+            if surplus <= 0:
+                return
+
+            # The oldest drivers are the closest to expiring, so they go first
+            retired = sorted(self._idle, key=lambda entry: entry.created_at)[:surplus]
+            for entry in retired:
+                self._idle.remove(entry)
+            self._size -= len(retired)
+            self._condition.notify_all()
+
+        for entry in retired:
+            self._quit(entry)
+
+    @staticmethod
+    def _is_healthy(entry: PooledDriver) -> bool:
+        try:
+            # Any round trip to the browser proves the session is still alive
+            entry.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, entry: PooledDriver) -> None:
+        try:
+            self._quit_driver(entry.driver)
+        except Exception:
+            pass
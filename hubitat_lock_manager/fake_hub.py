@@ -0,0 +1,173 @@
+import html
+import json
+import threading
+import urllib.parse
+from typing import Dict, List, Optional
+
+from hubitat_lock_manager.maker_api_stub import MakerApiStub
+
+COMMANDS = ("setCode", "deleteCode")
+
+# Stand-ins for the scripts, styles, images and fonts a real hub page pulls in
+PAGE_ASSETS = {
+    "/ui/hub.js": ("application/javascript", b"/* hub ui */" + b" " * 300_000),
+    "/ui/hub.css": (
+        "text/css",
+        b"@font-face{font-family:hub;src:url(/ui/hub.woff2)}body{font-family:hub}"
+        + b" " * 50_000,
+    ),
+    "/ui/logo.png": ("image/png", b"\x89PNG\r\n\x1a\n" + b"\0" * 100_000),
+    "/ui/hub.woff2": ("font/woff2", b"wOF2" + b"\0" * 80_000),
+}
+
+
+class FakeHub(MakerApiStub):
+    """
+    A local stand-in for a Hubitat hub's web UI, used by benchmarks and tests.
+
+    On top of the Maker API endpoints it serves ``/device/list`` with the
+    ``device-table`` and ``/device/edit/<id>`` with the ``lockCodes`` state and
+    the ``setCode``/``deleteCode`` forms, which post to ``/device/runmethod``.
+    Commands reach the lock after ``zwave_latency_seconds``, the way a real
+    Z-Wave lock acknowledges writes some time after the hub accepts them.
+    With ``page_assets`` the pages also load a script, a stylesheet, an image
+    and a font, so browser settings that skip or cache them can be measured.
+    """
+
+    def __init__(
+        self,
+        devices: Optional[Dict[int, str]] = None,
+        app_id: str = "1",
+        access_token: str = "token",
+        latency_seconds: float = 0.0,
+        host: str = "127.0.0.1",
+        zwave_latency_seconds: float = 0.0,
+        page_assets: bool = False,
+    ):
+        super().__init__(devices, app_id, access_token, latency_seconds, host)
+        self.zwave_latency_seconds = zwave_latency_seconds
+        self.page_assets = page_assets
+        self.page_loads: List[str] = []
+        self.asset_loads: List[str] = []
+        self.commands: List[tuple] = []
+        # Commands accepted by the hub that have not reached the lock yet
+        self._in_flight: List[threading.Timer] = []
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]], body: bytes):
+        if method == "GET" and path == "/device/list":
+            with self._lock:
+                self.page_loads.append(path)
+                return 200, {"Content-Type": "text/html"}, self._device_list_page()
+
+        if method == "GET" and path.startswith("/device/edit/"):
+            device_id = int(path.rsplit("/", 1)[-1])
+            with self._lock:
+                self.page_loads.append(path)
+                if device_id not in self.devices:
+                    return 404, {}, b"Device not found"
+                return 200, {"Content-Type": "text/html"}, self._device_edit_page(device_id)
+
+        if method == "GET" and path in PAGE_ASSETS:
+            content_type, asset = PAGE_ASSETS[path]
+            with self._lock:
+                self.asset_loads.append(path)
+            return 200, {"Content-Type": content_type, "Cache-Control": "max-age=3600"}, asset
+
+        if method == "POST" and path == "/device/runmethod":
+            form = urllib.parse.parse_qs(body.decode("utf-8"), keep_blank_values=True)
+            device_id = int(form["id"][0])
+            arguments = [
+                form[f"arg[{index}]"][0]
+                for index in range(1, 4)
+                if form.get(f"arg[{index}]", [""])[0]
+            ]
+            with self._lock:
+                if device_id not in self.devices or not self.run_command(
+                    device_id, form["method"][0], arguments
+                ):
+                    return 400, {}, b"Invalid command"
+
+            # The hub redirects back to the device page after running a command
+            return 302, {"Location": f"/device/edit/{device_id}"}, b""
+
+        return super().route(method, path, query, body)
+
+    def run_command(self, device_id: int, command: str, arguments: List[str]) -> bool:
+        if command not in COMMANDS or not arguments:
+            return False
+        if command == "setCode" and len(arguments) != 3:
+            return False
+
+        self.commands.append((device_id, command, tuple(arguments)))
+        if not self.zwave_latency_seconds:
+            return super().run_command(device_id, command, arguments)
+
+        def apply():
+            with self._lock:
+                super(FakeHub, self).run_command(device_id, command, arguments)
+
+        timer = threading.Timer(self.zwave_latency_seconds, apply)
+        timer.daemon = True
+        timer.start()
+        self._in_flight = [t for t in self._in_flight if t.is_alive()] + [timer]
+        return True
+
+    def wait_for_commands(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until every command accepted so far has reached the lock.
+        """
+        with self._lock:
+            in_flight = list(self._in_flight)
+        for timer in in_flight:
+            timer.join(timeout)
+
+    def _asset_tags(self) -> str:
+        if not self.page_assets:
+            return ""
+        return '<link rel="stylesheet" href="/ui/hub.css"><script src="/ui/hub.js"></script>'
+
+    def _device_edit_page(self, device_id: int) -> bytes:
+        lock_codes = json.dumps(
+            {str(position): value for position, value in self.codes[device_id].items()}
+        )
+        hidden = (
+            f'<input type="hidden" name="id" value="{device_id}">'
+            '<input type="hidden" name="method" value="{method}">'
+        )
+        set_code_form = (
+            '<form id="form-setCode-5" method="post" action="/device/runmethod">'
+            + hidden.replace("{method}", "setCode")
+            + '<input type="text" name="arg[1]" placeholder="Code position">'
+            '<input type="text" name="arg[2]" placeholder="PIN code">'
+            '<input type="text" name="arg[3]" placeholder="Name">'
+            '<button type="submit">Set Code</button></form>'
+        )
+        delete_code_form = (
+            '<form id="form-deleteCode-1" method="post" action="/device/runmethod">'
+            + hidden.replace("{method}", "deleteCode")
+            + '<input type="text" name="arg[1]" placeholder="Code position">'
+            '<button type="submit">Delete Code</button></form>'
+        )
+        return (
+            "<!DOCTYPE html><html><head>"
+            f"<title>{html.escape(self.devices[device_id])}</title>{self._asset_tags()}"
+            "</head><body>"
+            '<table id="state-table"><tr><td>lockCodes</td>'
+            f'<td id="cstate-value-lockCodes">{html.escape(lock_codes)}</td></tr></table>'
+            f"{set_code_form}{delete_code_form}{self._image_tag()}</body></html>"
+        ).encode("utf-8")
+
+    def _device_list_page(self) -> bytes:
+        rows = "".join(
+            f'<tr data-device-id="{device_id}"><td><input type="checkbox"></td>'
+            f"<td>{html.escape(name)}</td><td>Generic Z-Wave Lock</td></tr>"
+            for device_id, name in self.devices.items()
+        )
+        return (
+            f"<!DOCTYPE html><html><head><title>Devices</title>{self._asset_tags()}</head><body>"
+            '<table id="device-table"><thead><tr><th></th><th>Name</th><th>Type</th></tr>'
+            f"</thead><tbody>{rows}</tbody></table>{self._image_tag()}</body></html>"
+        ).encode("utf-8")
+
+    def _image_tag(self) -> str:
+        return '<img src="/ui/logo.png" alt="">' if self.page_assets else ""
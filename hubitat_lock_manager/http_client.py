@@ -0,0 +1,39 @@
+from typing import TYPE_CHECKING, Callable, Optional
+
+from hubitat_lock_manager import smart_lock
+
+if TYPE_CHECKING:
+    import requests
+
+
+def create_http_session(pool_size: int = 8) -> "requests.Session":
+    # Imported here as requests is slow to import and the webdriver backend never needs it
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+
+    # Keep connections to the hub alive and share them between threads
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def poll_hub_until(
+    check: Callable[[], bool], config: Optional[smart_lock.WriteConfirmationConfig]
+) -> bool:
+    """
+    Confirm a write over HTTP like ``smart_lock.poll_until``. A failed request
+    counts as not confirmed yet rather than failing a write the hub already
+    accepted.
+    """
+    import requests
+
+    def check_reachable() -> bool:
+        try:
+            return check()
+        except requests.RequestException:
+            return False
+
+    return smart_lock.poll_until(check_reachable, config)
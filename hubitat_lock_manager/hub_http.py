@@ -0,0 +1,385 @@
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from hubitat_lock_manager import metrics, smart_lock
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.http_client import create_http_session, poll_hub_until
+from hubitat_lock_manager.positions import PositionAllocator
+
+if TYPE_CHECKING:
+    import requests
+
+DEVICE_TABLE_ID = "device-table"
+LOCK_CODES_ELEMENT_ID = "cstate-value-lockCodes"
+SET_CODE_FORM_ID = "form-setCode-5"
+DELETE_CODE_FORM_ID = "form-deleteCode-1"
+
+# Elements that never have a closing tag, so they are never pushed on the open element stack
+VOID_ELEMENTS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+)
+
+
+@dataclass(frozen=True)
+class HtmlForm:
+    action: str
+    method: str
+    fields: Dict[str, str]
+
+
+@dataclass(frozen=True)
+class HubPage:
+    url: str
+    texts: Dict[str, str]
+    forms: Dict[str, HtmlForm]
+    device_rows: List[Tuple[int, List[str]]]
+
+
+@dataclass(frozen=True)
+class HubHttpConfig:
+    hub_ip: str
+    device_name_filter: str = "lock"
+    scheme: str = "http"
+    timeout_seconds: float = 10.0
+    # None returns as soon as the hub accepts a write and reports verified=False
+    write_confirmation: Optional[
+        smart_lock.WriteConfirmationConfig
+    ] = smart_lock.WriteConfirmationConfig()
+    session: "requests.Session" = field(
+        default_factory=create_http_session, compare=False, repr=False
+    )
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.scheme}://{self.hub_ip}"
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_page(self, path: str, page: str) -> HubPage:
+        metrics.HUB_PAGE_REQUESTS.inc(page=page)
+        response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout_seconds)
+        response.raise_for_status()
+        return parse_hub_page(response.text, response.url)
+
+    def submit_form(self, page: HubPage, form_id: str, values: Dict[str, str]) -> None:
+        form = page.forms.get(form_id)
+        if form is None:
+            raise ValueError(f"Form {form_id} not found on {page.url}")
+
+        # Keep the form's hidden fields, such as the device id and command name
+        data = dict(form.fields)
+        data.update(values)
+
+        # The hub answers with a redirect to the device page, which we don't need
+        metrics.HUB_PAGE_REQUESTS.inc(page="runmethod")
+        response = self.session.request(
+            form.method,
+            urllib.parse.urljoin(page.url, form.action),
+            data=data,
+            timeout=self.timeout_seconds,
+            allow_redirects=False,
+        )
+        response.raise_for_status()
+
+
+class HubPageParser(HTMLParser):
+    """
+    Collects, in a single pass over a hub page, the text of every element with
+    an id, every form with its fields, and the rows of the device table.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts: Dict[str, List[str]] = {}
+        self.forms: Dict[str, HtmlForm] = {}
+        self.device_rows: List[Tuple[int, List[str]]] = []
+        self._open: List[Tuple[str, Optional[str]]] = []
+        self._form: Optional[HtmlForm] = None
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._in_device_table = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        element_id = attrs.get("id")
+
+        if tag == "table" and element_id == DEVICE_TABLE_ID:
+            self._in_device_table = True
+        elif tag == "tr" and self._in_device_table and attrs.get("data-device-id"):
+            self._row = []
+            self.device_rows.append((int(attrs["data-device-id"]), self._row))
+        elif tag == "td" and self._row is not None:
+            self._cell = []
+            self._row.append(self._cell)
+        elif tag == "form" and element_id:
+            self._form = HtmlForm(
+                action=attrs.get("action") or "",
+                method=(attrs.get("method") or "get").upper(),
+                fields={},
+            )
+            self.forms[element_id] = self._form
+        elif tag in ("input", "textarea") and self._form is not None and attrs.get("name"):
+            self._form.fields[attrs["name"]] = attrs.get("value") or ""
+
+        if element_id:
+            self.texts[element_id] = []
+        if tag not in VOID_ELEMENTS:
+            self._open.append((tag, element_id))
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self._open):
+            return
+
+        # Close everything up to the matching tag, tolerating unclosed children
+        while self._open:
+            open_tag, element_id = self._open.pop()
+            if element_id == DEVICE_TABLE_ID:
+                self._in_device_table = False
+            if open_tag == "td":
+                self._cell = None
+            elif open_tag == "tr":
+                self._row = None
+            elif open_tag == "form":
+                self._form = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for _, element_id in self._open:
+            if element_id:
+                self.texts[element_id].append(data)
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def create_hub_http_code_deleter(
+    device_id: int, config: HubHttpConfig
+) -> smart_lock.PositionDeleter:
+    def delete_position(
+        params: smart_lock.DeletePositionParams,
+    ) -> smart_lock.DeletePositionResult:
+        page = get_device_page(device_id, config)
+        submit_delete_code_form(page, params.position, config)
+        verified = confirm_delete_code(device_id, params.position, config)
+        return smart_lock.DeletePositionResult(params.position, verified=verified)
+
+    return smart_lock.PositionDeleter(delete_position)
+
+
+def create_hub_http_code_lister(config: HubHttpConfig) -> smart_lock.CodeLister:
+    def list_codes(device_id: int) -> smart_lock.ListKeyCodesResult:
+        return get_codes_via_hub_http(device_id, config)
+
+    return smart_lock.CodeLister(list_codes)
+
+
+def create_hub_http_code_setter(
+    device_id: int, config: HubHttpConfig
+) -> smart_lock.CodeSetter:
+    def get_next_position() -> int:
+        result = get_codes_via_hub_http(device_id, config)
+        return smart_lock.get_next_position_based_on_list_key_codes_result(result)
+
+    def set_code(params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+        # One page load gives both the current codes and the form to submit
+        page = get_device_page(device_id, config)
+        position = params.position or smart_lock.get_next_position_based_on_list_key_codes_result(
+            read_lock_codes(page)
+        )
+
+        params = smart_lock.SetCodeParams(params.code, params.name, position)
+        submit_set_code_form(page, params, config)
+        verified = confirm_set_code(device_id, params, config)
+        return smart_lock.SetCodeResult(position=position, verified=verified)
+
+    return smart_lock.CodeSetter(get_next_position, set_code)
+
+
+def create_hub_http_device_lister(config: HubHttpConfig) -> smart_lock.DeviceLister:
+    def list_devices() -> smart_lock.ListDevicesResult:
+        return list_devices_via_hub_http(config)
+
+    return smart_lock.DeviceLister(list_devices)
+
+
+def create_hub_http_device_session_opener(
+    device_id: int, config: HubHttpConfig
+) -> smart_lock.DeviceSessionOpener:
+    @contextmanager
+    def open_session():
+        pages = []
+
+        def get_page() -> HubPage:
+            # Only load the device page once the session needs it, then reuse its forms
+            if not pages:
+                pages.append(get_device_page(device_id, config))
+            return pages[0]
+
+        def set_code(params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+            submit_set_code_form(get_page(), params, config)
+            verified = confirm_set_code(device_id, params, config)
+            return smart_lock.SetCodeResult(position=params.position, verified=verified)
+
+        def delete_position(
+            params: smart_lock.DeletePositionParams,
+        ) -> smart_lock.DeletePositionResult:
+            submit_delete_code_form(get_page(), params.position, config)
+            verified = confirm_delete_code(device_id, params.position, config)
+            return smart_lock.DeletePositionResult(params.position, verified=verified)
+
+        yield smart_lock.create_tracking_device_session(
+            lambda: read_lock_codes(get_page()),
+            set_code,
+            delete_position,
+            assign_positions=True,
+        )
+
+    return smart_lock.DeviceSessionOpener(open_session)
+
+
+def create_hub_http_smart_lock_config(
+    config: HubHttpConfig,
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> smart_lock.SmartLockConfig:
+    device_lister = create_hub_http_device_lister(config)
+    smart_lock_factory = create_hub_http_smart_lock_factory(
+        config, code_cache, position_allocator
+    )
+    return smart_lock.SmartLockConfig(
+        device_lister, smart_lock_factory, close=config.close, code_cache=code_cache
+    )
+
+
+def create_hub_http_smart_lock_factory(
+    config: HubHttpConfig,
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> smart_lock.Factory:
+    def create_smart_lock(params: smart_lock.CreateSmartLockParams) -> smart_lock.SmartLock:
+        position_deleter = create_hub_http_code_deleter(params.device_id, config)
+        code_lister = create_hub_http_code_lister(config)
+        code_setter = create_hub_http_code_setter(params.device_id, config)
+        session_opener = create_hub_http_device_session_opener(params.device_id, config)
+
+        if code_cache is not None:
+            position_deleter = smart_lock.create_cache_updating_position_deleter(
+                params.device_id, position_deleter, code_cache
+            )
+            code_lister = smart_lock.create_caching_code_lister(code_lister, code_cache)
+            code_setter = smart_lock.create_cache_updating_code_setter(
+                params.device_id, code_setter, code_cache
+            )
+            session_opener = smart_lock.create_cache_updating_device_session_opener(
+                params.device_id, session_opener, code_cache
+            )
+
+        return smart_lock.create_generic_z_wave_lock(
+            params.device_id,
+            position_deleter,
+            code_lister,
+            code_setter,
+            session_opener,
+            position_allocator,
+        )
+
+    def list_smart_locks() -> smart_lock.ListDevicesResult:
+        list_devices_result = list_devices_via_hub_http(config)
+
+        # Filter out devices that are not locks
+        devices = filter(
+            lambda d: config.device_name_filter in d.name.lower(),
+            list_devices_result.devices,
+        )
+
+        return smart_lock.ListDevicesResult(devices=list(devices))
+
+    return smart_lock.Factory(create_smart_lock, list_smart_locks)
+
+
+def confirm_delete_code(device_id: int, position: int, config: HubHttpConfig) -> bool:
+    return poll_hub_until(
+        lambda: all(
+            c.position != position for c in get_codes_via_hub_http(device_id, config).codes
+        ),
+        config.write_confirmation,
+    )
+
+
+def confirm_set_code(
+    device_id: int, params: smart_lock.SetCodeParams, config: HubHttpConfig
+) -> bool:
+    expected = smart_lock.LockCode(
+        code=str(params.code), name=params.name, position=params.position
+    )
+    return poll_hub_until(
+        lambda: expected in get_codes_via_hub_http(device_id, config).codes,
+        config.write_confirmation,
+    )
+
+
+def get_codes_via_hub_http(
+    device_id: int, config: HubHttpConfig
+) -> smart_lock.ListKeyCodesResult:
+    return read_lock_codes(get_device_page(device_id, config))
+
+
+def get_device_page(device_id: int, config: HubHttpConfig) -> HubPage:
+    return config.get_page(f"/device/edit/{device_id}", "device_edit")
+
+
+def list_devices_via_hub_http(config: HubHttpConfig) -> smart_lock.ListDevicesResult:
+    page = config.get_page("/device/list", "device_list")
+
+    # The device name is in the second cell, as on the webdriver backend
+    devices = [
+        smart_lock.Device(id=device_id, name=cells[1])
+        for device_id, cells in page.device_rows
+        if len(cells) > 1
+    ]
+    return smart_lock.ListDevicesResult(devices=devices)
+
+
+def parse_hub_page(html: str, url: str = "") -> HubPage:
+    parser = HubPageParser()
+    parser.feed(html)
+    parser.close()
+    return HubPage(
+        url=url,
+        texts={element_id: "".join(parts).strip() for element_id, parts in parser.texts.items()},
+        forms=parser.forms,
+        # Collapse whitespace the way a browser renders cell text
+        device_rows=[
+            (device_id, [" ".join("".join(cell).split()) for cell in cells])
+            for device_id, cells in parser.device_rows
+        ],
+    )
+
+
+def read_lock_codes(page: HubPage) -> smart_lock.ListKeyCodesResult:
+    if LOCK_CODES_ELEMENT_ID not in page.texts:
+        raise ValueError(f"Lock codes not found on {page.url}")
+
+    json_text = page.texts[LOCK_CODES_ELEMENT_ID]
+    if not json_text:
+        return smart_lock.ListKeyCodesResult(codes=[])
+
+    return smart_lock.parse_lock_codes(json_text)
+
+
+def submit_delete_code_form(page: HubPage, position: int, config: HubHttpConfig) -> None:
+    config.submit_form(page, DELETE_CODE_FORM_ID, {"arg[1]": str(position)})
+
+
+def submit_set_code_form(
+    page: HubPage, params: smart_lock.SetCodeParams, config: HubHttpConfig
+) -> None:
+    config.submit_form(
+        page,
+        SET_CODE_FORM_ID,
+        {"arg[1]": str(params.position), "arg[2]": str(params.code), "arg[3]": params.name},
+    )
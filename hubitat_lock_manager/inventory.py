@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Optional
+
+from hubitat_lock_manager import metrics, smart_lock
+
+
+class DeviceInventory:
+    """
+    Keeps the last known device list and serves it immediately. Once the list
+    is older than ``refresh_interval_seconds`` a background refresh is started
+    while callers keep getting the stale copy (stale-while-revalidate).
+    """
+
+    def __init__(
+        self,
+        list_devices: Callable[[], smart_lock.ListDevicesResult],
+        refresh_interval_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._list_devices = list_devices
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._result: Optional[smart_lock.ListDevicesResult] = None
+        self._loaded_at = 0.0
+        # Loads are numbered as they start, so a caller can tell whether one began after it asked
+        self._load_sequence = 0
+        self._result_sequence = 0
+        self._refreshing: Optional[threading.Thread] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        with self._lock:
+            if self._result is None:
+                return None
+            return self._clock() - self._loaded_at
+
+    def get(self) -> smart_lock.ListDevicesResult:
+        with self._lock:
+            result = self._result
+            stale = (
+                result is not None
+                and self._clock() - self._loaded_at >= self.refresh_interval_seconds
+            )
+
+        # Nothing to serve yet, so the first caller has to wait for the hub
+        metrics.CACHE_REQUESTS.inc(cache="devices", result="miss" if result is None else "hit")
+        if result is None:
+            return self._load(1)
+
+        if stale:
+            self._refresh_in_background()
+        return result
+
+    def refresh(self) -> smart_lock.ListDevicesResult:
+        with self._lock:
+            # A load already running may have read the hub before the change being refreshed for
+            min_sequence = self._load_sequence + 1
+        return self._load(min_sequence)
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            refreshing = self._refreshing
+        if refreshing is not None:
+            refreshing.join(timeout)
+
+    def _load(self, min_sequence: int) -> smart_lock.ListDevicesResult:
+        # Concurrent callers share one load instead of all hitting the hub
+        with self._load_lock:
+            with self._lock:
+                if self._result is not None and self._result_sequence >= min_sequence:
+                    return self._result
+                self._load_sequence += 1
+                sequence = self._load_sequence
+
+            result = self._list_devices()
+            result = smart_lock.ListDevicesResult(devices=list(result.devices))
+            with self._lock:
+                self._result = result
+                self._loaded_at = self._clock()
+                self._result_sequence = sequence
+            return result
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+
+            self._refreshing = threading.Thread(
+                target=self._background_refresh, name="device-inventory-refresh", daemon=True
+            )
+            self._refreshing.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the last known list, the next stale read will retry
+            logging.error(f"Device inventory refresh failed: {str(e)}")
+
+
+def create_inventory_smart_lock_config(
+    config: smart_lock.SmartLockConfig, refresh_interval_seconds: float = 300.0
+) -> smart_lock.SmartLockConfig:
+    inventory = DeviceInventory(
+        config.smart_lock_factory.list_smart_locks, refresh_interval_seconds
+    )
+    smart_lock_factory = smart_lock.Factory(
+        config.smart_lock_factory.create_smart_lock, inventory.get
+    )
+    return replace(
+        config, smart_lock_factory=smart_lock_factory, refresh_devices=inventory.refresh
+    )
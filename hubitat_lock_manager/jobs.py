@@ -0,0 +1,134 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class JobSnapshot:
+    id: str
+    kind: str
+    status: str
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    completed: int
+    results: List[Any]
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+@dataclass
+class JobRecord:
+    id: str
+    kind: str
+    created_at: float
+    status: str = PENDING
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    finished_monotonic: Optional[float] = None
+    results: List[Any] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def snapshot(self) -> JobSnapshot:
+        return JobSnapshot(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            completed=len(self.results),
+            results=list(self.results),
+            error=self.error,
+        )
+
+
+class JobManager:
+    """
+    Runs long lock writes on a background worker pool and tracks their
+    progress. Finished jobs are kept for ``retention_seconds`` and at most
+    ``max_retained`` of them are kept at once.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        retention_seconds: float = 3600.0,
+        max_retained: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lock-job"
+        )
+        self._jobs: "OrderedDict[str, JobRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[JobSnapshot]:
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def submit(self, kind: str, run: Callable[[], Iterable[Any]]) -> str:
+        """
+        Queue ``run`` and return the new job's id. Every item ``run`` yields is
+        recorded as a result as soon as it is produced.
+        """
+        job = JobRecord(id=uuid.uuid4().hex, kind=kind, created_at=time.time())
+        with self._lock:
+            self._evict()
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, run)
+        return job.id
+
+    def _evict(self) -> None:
+        finished = [job for job in self._jobs.values() if job.finished_monotonic is not None]
+
+        # Drop expired jobs first, then the oldest finished ones above the cap
+        now = self._clock()
+        for job in finished:
+            if now - job.finished_monotonic >= self.retention_seconds:
+                del self._jobs[job.id]
+
+        finished = [job for job in finished if job.id in self._jobs]
+        finished.sort(key=lambda job: job.finished_monotonic)
+        for job in finished[: max(0, len(finished) - self.max_retained)]:
+            del self._jobs[job.id]
+
+    def _run(self, job: JobRecord, run: Callable[[], Iterable[Any]]) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+
+        status, error = SUCCEEDED, None
+        try:
+            for result in run():
+                with self._lock:
+                    job.results.append(result)
+        except Exception as e:
+            status, error = FAILED, str(e)
+
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+            job.finished_monotonic = self._clock()
@@ -0,0 +1,211 @@
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+from hubitat_lock_manager import smart_lock
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.http_client import create_http_session, poll_hub_until
+from hubitat_lock_manager.positions import PositionAllocator
+
+if TYPE_CHECKING:
+    import requests
+
+
+@dataclass(frozen=True)
+class MakerApiConfig:
+    hub_ip: str
+    app_id: str
+    access_token: str
+    device_name_filter: str = "lock"
+    scheme: str = "http"
+    timeout_seconds: float = 10.0
+    # None returns as soon as the hub accepts a write and reports verified=False
+    write_confirmation: Optional[
+        smart_lock.WriteConfirmationConfig
+    ] = smart_lock.WriteConfirmationConfig()
+    session: "requests.Session" = field(
+        default_factory=create_http_session, compare=False, repr=False
+    )
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.scheme}://{self.hub_ip}/apps/api/{self.app_id}"
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get(self, path: str) -> Any:
+        response = self.session.get(
+            f"{self.base_url}/{path}",
+            params={"access_token": self.access_token},
+            timeout=self.timeout_seconds,
+        )
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+
+def create_maker_api_code_deleter(
+    device_id: int, config: MakerApiConfig
+) -> smart_lock.PositionDeleter:
+    def delete_position(
+        params: smart_lock.DeletePositionParams,
+    ) -> smart_lock.DeletePositionResult:
+        config.get(f"devices/{device_id}/deleteCode/{params.position}")
+        verified = poll_hub_until(
+            lambda: all(
+                c.position != params.position
+                for c in get_codes_via_maker_api(device_id, config).codes
+            ),
+            config.write_confirmation,
+        )
+        return smart_lock.DeletePositionResult(params.position, verified=verified)
+
+    return smart_lock.PositionDeleter(delete_position)
+
+
+def create_maker_api_code_lister(config: MakerApiConfig) -> smart_lock.CodeLister:
+    def list_codes(device_id: int) -> smart_lock.ListKeyCodesResult:
+        return get_codes_via_maker_api(device_id, config)
+
+    return smart_lock.CodeLister(list_codes)
+
+
+def create_maker_api_code_setter(
+    device_id: int, config: MakerApiConfig
+) -> smart_lock.CodeSetter:
+    def get_next_position() -> int:
+        result = get_codes_via_maker_api(device_id, config)
+        return smart_lock.get_next_position_based_on_list_key_codes_result(result)
+
+    def set_code(params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+        position = params.position or get_next_position()
+
+        # Command arguments are comma separated path segments
+        arguments = ",".join(
+            urllib.parse.quote(str(value), safe="")
+            for value in (position, params.code, params.name)
+        )
+        config.get(f"devices/{device_id}/setCode/{arguments}")
+
+        expected = smart_lock.LockCode(str(params.code), params.name, position)
+        verified = poll_hub_until(
+            lambda: expected in get_codes_via_maker_api(device_id, config).codes,
+            config.write_confirmation,
+        )
+        return smart_lock.SetCodeResult(position=position, verified=verified)
+
+    return smart_lock.CodeSetter(get_next_position, set_code)
+
+
+def create_maker_api_device_lister(config: MakerApiConfig) -> smart_lock.DeviceLister:
+    def list_devices() -> smart_lock.ListDevicesResult:
+        return list_devices_via_maker_api(config)
+
+    return smart_lock.DeviceLister(list_devices)
+
+
+def create_maker_api_device_session_opener(
+    device_id: int, config: MakerApiConfig
+) -> smart_lock.DeviceSessionOpener:
+    code_setter = create_maker_api_code_setter(device_id, config)
+    position_deleter = create_maker_api_code_deleter(device_id, config)
+
+    @contextmanager
+    def open_session():
+        yield smart_lock.create_tracking_device_session(
+            lambda: get_codes_via_maker_api(device_id, config),
+            code_setter.set_code,
+            position_deleter.delete_position,
+            assign_positions=True,
+        )
+
+    return smart_lock.DeviceSessionOpener(open_session)
+
+
+def create_maker_api_smart_lock_config(
+    config: MakerApiConfig,
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> smart_lock.SmartLockConfig:
+    device_lister = create_maker_api_device_lister(config)
+    smart_lock_factory = create_maker_api_smart_lock_factory(
+        config, code_cache, position_allocator
+    )
+    return smart_lock.SmartLockConfig(
+        device_lister, smart_lock_factory, close=config.close, code_cache=code_cache
+    )
+
+
+def create_maker_api_smart_lock_factory(
+    config: MakerApiConfig,
+    code_cache: Optional[TtlLruCache[smart_lock.ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> smart_lock.Factory:
+    def create_smart_lock(params: smart_lock.CreateSmartLockParams) -> smart_lock.SmartLock:
+        position_deleter = create_maker_api_code_deleter(params.device_id, config)
+        code_lister = create_maker_api_code_lister(config)
+        code_setter = create_maker_api_code_setter(params.device_id, config)
+        session_opener = create_maker_api_device_session_opener(params.device_id, config)
+
+        if code_cache is not None:
+            position_deleter = smart_lock.create_cache_updating_position_deleter(
+                params.device_id, position_deleter, code_cache
+            )
+            code_lister = smart_lock.create_caching_code_lister(code_lister, code_cache)
+            code_setter = smart_lock.create_cache_updating_code_setter(
+                params.device_id, code_setter, code_cache
+            )
+            session_opener = smart_lock.create_cache_updating_device_session_opener(
+                params.device_id, session_opener, code_cache
+            )
+
+        return smart_lock.create_generic_z_wave_lock(
+            params.device_id,
+            position_deleter,
+            code_lister,
+            code_setter,
+            session_opener,
+            position_allocator,
+        )
+
+    def list_smart_locks() -> smart_lock.ListDevicesResult:
+        list_devices_result = list_devices_via_maker_api(config)
+
+        # Filter out devices that are not locks
+        devices = filter(
+            lambda d: config.device_name_filter in d.name.lower(),
+            list_devices_result.devices,
+        )
+
+        return smart_lock.ListDevicesResult(devices=list(devices))
+
+    return smart_lock.Factory(create_smart_lock, list_smart_locks)
+
+
+def get_codes_via_maker_api(
+    device_id: int, config: MakerApiConfig
+) -> smart_lock.ListKeyCodesResult:
+    device = config.get(f"devices/{device_id}")
+
+    # The lockCodes attribute holds the same JSON document the device page shows
+    lock_codes = next(
+        (
+            attribute.get("currentValue")
+            for attribute in device.get("attributes", [])
+            if attribute.get("name") == "lockCodes"
+        ),
+        None,
+    )
+    if not lock_codes:
+        return smart_lock.ListKeyCodesResult(codes=[])
+
+    return smart_lock.parse_lock_codes(lock_codes)
+
+
+def list_devices_via_maker_api(config: MakerApiConfig) -> smart_lock.ListDevicesResult:
+    devices = [
+        smart_lock.Device(id=int(device["id"]), name=device.get("label") or device["name"])
+        for device in config.get("devices")
+    ]
+    return smart_lock.ListDevicesResult(devices=devices)
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class MakerApiStub:
+    """
+    A local stand-in for Hubitat's Maker API app, used by tests and benchmarks.
+
+    It serves the device list, device details with the ``lockCodes`` attribute
+    and the ``setCode``/``deleteCode`` commands from in-memory state.
+    """
+
+    def __init__(
+        self,
+        devices: Optional[Dict[int, str]] = None,
+        app_id: str = "1",
+        access_token: str = "token",
+        latency_seconds: float = 0.0,
+        host: str = "127.0.0.1",
+    ):
+        self.devices = dict(devices or {1: "Front Door Lock"})
+        self.codes: Dict[int, Dict[int, Dict[str, str]]] = {
+            device_id: {} for device_id in self.devices
+        }
+        self.app_id = app_id
+        self.access_token = access_token
+        self.latency_seconds = latency_seconds
+        self.host = host
+        self.requests: List[str] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MakerApiStub":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def hub_ip(self) -> str:
+        return f"{self._server.server_address[0]}:{self.port}"
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "MakerApiStub":
+        self._server = ThreadingHTTPServer((self.host, 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, path: str, query: Dict[str, List[str]]):
+        if query.get("access_token") != [self.access_token]:
+            return 401, {"error": "Unauthorized"}
+
+        prefix = ["apps", "api", self.app_id, "devices"]
+        parts = [urllib.parse.unquote(part) for part in path.strip("/").split("/")]
+        if parts[:4] != prefix:
+            return 404, {"error": "Not found"}
+
+        parts = parts[4:]
+        with self._lock:
+            self.requests.append(path)
+
+            if not parts:
+                return 200, [
+                    {"id": str(device_id), "name": name, "label": name}
+                    for device_id, name in self.devices.items()
+                ]
+
+            device_id = int(parts[0])
+            if device_id not in self.devices:
+                return 404, {"error": "Device not found"}
+
+            if len(parts) == 1:
+                return 200, self._device_details(device_id)
+
+            # Maker API passes command arguments as one comma separated segment
+            command, arguments = parts[1], parts[2:]
+            if arguments:
+                arguments = arguments[0].split(",", 2)
+            if not self.run_command(device_id, command, arguments):
+                return 404, {"error": "Unknown command"}
+            return 200, {"command": command}
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]], body: bytes):
+        """
+        Answer one HTTP request with ``(status, headers, body)``.
+        """
+        if method != "GET":
+            return 405, {}, b""
+
+        status, payload = self.handle(path, query)
+        return status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+    def run_command(self, device_id: int, command: str, arguments: List[str]) -> bool:
+        """
+        Apply a lock command to the in-memory codes, returning False if the
+        command or its arguments are not recognised. Callers hold the lock.
+        """
+        if command == "setCode" and len(arguments) == 3:
+            position, code, name = arguments
+            self.codes[device_id][int(position)] = {"code": code, "name": name}
+            return True
+
+        if command == "deleteCode" and len(arguments) >= 1:
+            self.codes[device_id].pop(int(arguments[0]), None)
+            return True
+
+        return False
+
+    def _create_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes, so don't let Nagle delay them
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.dispatch("GET")
+
+            def do_POST(self):
+                self.dispatch("POST")
+
+            def dispatch(self, method):
+                if stub.latency_seconds:
+                    time.sleep(stub.latency_seconds)
+
+                length = int(self.headers.get("Content-Length") or 0)
+                request_body = self.rfile.read(length) if length else b""
+                url = urllib.parse.urlsplit(self.path)
+                status, headers, body = stub.route(
+                    method, url.path, urllib.parse.parse_qs(url.query), request_body
+                )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _device_details(self, device_id: int) -> dict:
+        lock_codes = {
+            str(position): value for position, value in self.codes[device_id].items()
+        }
+        return {
+            "id": str(device_id),
+            "name": self.devices[device_id],
+            "label": self.devices[device_id],
+            "attributes": [
+                {
+                    "name": "lockCodes",
+                    "currentValue": json.dumps(lock_codes),
+                    "dataType": "STRING",
+                }
+            ],
+        }
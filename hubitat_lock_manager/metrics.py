@@ -0,0 +1,286 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(
+        f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ] + self._render_samples()
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class ValueMetric(Metric):
+    """
+    A metric holding one number per combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _add(self, amount: float, labels: Dict[str, object]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Counter(ValueMetric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._add(amount, labels)
+
+
+class Gauge(ValueMetric):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self._add(-amount, labels)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self._add(amount, labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._samples: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            sample = self._samples.get(self._key(labels))
+            return sum(sample[0]) if sample else 0
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._samples.setdefault(
+                key, ([0] * len(self.buckets), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            samples = sorted(
+                (key, list(counts), total[0]) for key, (counts, total) in self._samples.items()
+            )
+
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, counts, total in samples:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = format_labels(names, key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "hubitat_http_request_duration_seconds",
+    "Time spent answering API requests.",
+    ("method", "endpoint", "status"),
+)
+LOCK_OPERATION_DURATION = REGISTRY.histogram(
+    "hubitat_lock_operation_duration_seconds",
+    "Time spent on lock operations in the controller.",
+    ("operation",),
+)
+LOCK_OPERATIONS_IN_FLIGHT = REGISTRY.gauge(
+    "hubitat_lock_operations_in_flight",
+    "Lock operations currently running, per device.",
+    ("device_id",),
+)
+LOCK_COMMAND_QUEUE_DEPTH = REGISTRY.gauge(
+    "hubitat_lock_command_queue_depth",
+    "Key code writes waiting for their device, per device.",
+    ("device_id",),
+)
+LOCK_COMMANDS_COALESCED = REGISTRY.counter(
+    "hubitat_lock_commands_coalesced_total",
+    "Queued key code writes merged into another write to the same user.",
+)
+LOCK_OPERATION_ERRORS = REGISTRY.counter(
+    "hubitat_lock_operation_errors_total",
+    "Failed lock operations by operation and exception type.",
+    ("operation", "error_type"),
+)
+WEBDRIVER_LAUNCHES = REGISTRY.counter(
+    "hubitat_webdriver_launches_total", "Browser sessions started."
+)
+WEBDRIVER_QUITS = REGISTRY.counter(
+    "hubitat_webdriver_quits_total", "Browser sessions shut down."
+)
+WEBDRIVER_STANDBY_TARGET = REGISTRY.gauge(
+    "hubitat_webdriver_standby_target",
+    "Idle browser sessions the pool keeps warm for recent demand.",
+)
+WEBDRIVER_NAVIGATIONS = REGISTRY.counter(
+    "hubitat_webdriver_navigations_total",
+    "Hub pages loaded or reloaded in a browser.",
+    ("page",),
+)
+WEBDRIVER_FORM_SUBMISSIONS = REGISTRY.counter(
+    "hubitat_webdriver_form_submissions_total",
+    "Command forms submitted on device pages.",
+    ("form",),
+)
+HUB_PAGE_REQUESTS = REGISTRY.counter(
+    "hubitat_hub_page_requests_total",
+    "Hub pages fetched and forms posted over HTTP without a browser.",
+    ("page",),
+)
+STARTUP_SECONDS = REGISTRY.gauge(
+    "hubitat_startup_seconds",
+    "Time spent starting up, by phase.",
+    ("phase",),
+)
+SLEEP_SECONDS = REGISTRY.counter(
+    "hubitat_sleep_seconds_total",
+    "Time spent sleeping while waiting on the hub.",
+    ("reason",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "hubitat_cache_requests_total",
+    "Cache lookups by cache and result, hit or miss.",
+    ("cache", "result"),
+)
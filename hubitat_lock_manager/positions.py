@@ -0,0 +1,181 @@
+import heapq
+import math
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+@dataclass(frozen=True)
+class PositionReservation:
+    device_id: int
+    position: int
+    token: str
+    expires_at: float
+
+
+class DevicePositions:
+    def __init__(self, used: Iterable[int], positions: Iterable[int], loaded_at: float):
+        self.used: Set[int] = set(used)
+        self.leases: Dict[int, PositionReservation] = {}
+        self.loaded_at = loaded_at
+
+        # Max-heap of candidate positions; entries that became used or leased are skipped lazily
+        self.free: List[int] = [-p for p in positions if p not in self.used]
+        heapq.heapify(self.free)
+
+    def is_free(self, position: int) -> bool:
+        return position not in self.used and position not in self.leases
+
+    def push(self, position: int) -> None:
+        heapq.heappush(self.free, -position)
+
+    def top(self) -> Optional[int]:
+        while self.free and not self.is_free(-self.free[0]):
+            heapq.heappop(self.free)
+        return -self.free[0] if self.free else None
+
+
+class PositionAllocator:
+    """
+    Hands out free code positions per device so concurrent creates on the same
+    lock never pick the same slot. A reservation is leased for
+    ``lease_seconds`` and must be committed once the write succeeds or
+    released if it fails; expired leases return to the free pool.
+
+    The used positions of a device are read once and then kept current from
+    the writes made through the allocator. They are re-read after
+    ``refresh_interval_seconds`` or after ``invalidate`` to pick up changes
+    made elsewhere, keeping any outstanding reservations.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: float = 120.0,
+        refresh_interval_seconds: float = 300.0,
+        max_position: int = 250,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.lease_seconds = lease_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.max_position = max_position
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._devices: Dict[int, DevicePositions] = {}
+        self._load_locks: Dict[int, threading.Lock] = {}
+
+    def commit(self, reservation: PositionReservation) -> bool:
+        """
+        Mark a reserved position as used. Returns False if the lease had
+        already expired, in which case the position may have been handed out again.
+        """
+        with self._lock:
+            state = self._devices.get(reservation.device_id)
+            if state is None:
+                return False
+
+            held = state.leases.get(reservation.position) == reservation
+            if held:
+                del state.leases[reservation.position]
+            state.used.add(reservation.position)
+            return held
+
+    def invalidate(self, device_id: int) -> None:
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is not None:
+                state.loaded_at = -math.inf
+
+    def mark_free(self, device_id: int, position: int) -> None:
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is not None and position in state.used:
+                state.used.discard(position)
+                state.push(position)
+
+    def mark_used(self, device_id: int, position: int) -> None:
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is not None:
+                state.used.add(position)
+
+    def next_position(self, device_id: int, read_positions: Callable[[], Iterable[int]]) -> int:
+        """
+        Return the position the next reservation would get, without reserving it.
+        """
+        state = self._get_state(device_id, read_positions)
+        with self._lock:
+            self._expire(state)
+            position = state.top()
+        if position is None:
+            raise ValueError(f"No free code positions on device {device_id}")
+        return position
+
+    def release(self, reservation: PositionReservation) -> None:
+        with self._lock:
+            state = self._devices.get(reservation.device_id)
+            if state is not None and state.leases.get(reservation.position) == reservation:
+                del state.leases[reservation.position]
+                state.push(reservation.position)
+
+    def reserve(
+        self,
+        device_id: int,
+        read_positions: Callable[[], Iterable[int]],
+        known_used: Iterable[int] = (),
+    ) -> PositionReservation:
+        """
+        Lease the highest free position on a device. ``read_positions`` returns
+        the positions in use and is only called when the device is not yet known
+        or is due for a refresh. ``known_used`` are positions the caller just saw
+        in use, such as codes added outside the app since the last refresh.
+        """
+        state = self._get_state(device_id, read_positions)
+        with self._lock:
+            self._expire(state)
+            state.used.update(known_used)
+            position = state.top()
+            if position is None:
+                raise ValueError(f"No free code positions on device {device_id}")
+
+            reservation = PositionReservation(
+                device_id, position, uuid.uuid4().hex, self._clock() + self.lease_seconds
+            )
+            state.leases[position] = reservation
+            return reservation
+
+    def _expire(self, state: DevicePositions) -> None:
+        now = self._clock()
+        for position, reservation in list(state.leases.items()):
+            if reservation.expires_at <= now:
+                del state.leases[position]
+                state.push(position)
+
+    def _get_state(
+        self, device_id: int, read_positions: Callable[[], Iterable[int]]
+    ) -> DevicePositions:
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is not None and not self._is_stale(state):
+                return state
+            load_lock = self._load_locks.setdefault(device_id, threading.Lock())
+
+        # Concurrent callers for the same device share one read of the lock
+        with load_lock:
+            with self._lock:
+                state = self._devices.get(device_id)
+                if state is not None and not self._is_stale(state):
+                    return state
+
+            used = list(read_positions())
+            with self._lock:
+                previous = self._devices.get(device_id)
+                state = DevicePositions(used, range(1, self.max_position + 1), self._clock())
+                if previous is not None:
+                    state.leases = previous.leases
+                self._devices[device_id] = state
+                return state
+
+    def _is_stale(self, state: DevicePositions) -> bool:
+        return self._clock() - state.loaded_at >= self.refresh_interval_seconds
@@ -0,0 +1,231 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from hubitat_lock_manager import controller, smart_lock
+
+
+@dataclass(frozen=True)
+class DesiredKeyCode:
+    device_id: int
+    username: str
+    code: str
+
+
+@dataclass(frozen=True)
+class SyncPlan:
+    operations: List[controller.BulkKeyCodeOperation]
+    unchanged: int = 0
+    skipped_devices: List[controller.DeviceKeyCodes] = field(default_factory=list)
+    # Devices with no rows in the desired state, left as they are unless pruning
+    untouched_device_ids: List[int] = field(default_factory=list)
+
+    @property
+    def hub_operations(self) -> int:
+        # Creates and in-place updates are one setCode each, deletes one deleteCode
+        return len(self.operations)
+
+    def count(self, action: str) -> int:
+        return sum(1 for operation in self.operations if operation.action == action)
+
+
+def apply_sync_plan(
+    smart_lock_controller: controller.SmartLockController,
+    plan: SyncPlan,
+    max_concurrency: Optional[int] = None,
+) -> List[controller.BulkKeyCodeOperationResult]:
+    """
+    Apply a plan with one visit per device, running devices in parallel.
+    """
+    return smart_lock_controller.apply_bulk_operations(plan.operations, max_concurrency)
+
+
+def create_sync_plan(
+    smart_lock_controller: controller.SmartLockController,
+    desired: Iterable[DesiredKeyCode],
+    max_concurrency: Optional[int] = None,
+    prune: bool = False,
+) -> SyncPlan:
+    """
+    Diff the desired key codes against the current codes of every device.
+    """
+    snapshot = smart_lock_controller.list_all_key_codes(max_concurrency)
+    return diff_key_codes(desired, snapshot, prune)
+
+
+def diff_key_codes(
+    desired: Iterable[DesiredKeyCode],
+    snapshot: controller.FleetKeyCodesResult,
+    prune: bool = False,
+) -> SyncPlan:
+    """
+    Compute the fewest writes that make every device in the desired state hold
+    exactly its desired codes. A user whose code changed is updated in place,
+    users missing from a device are created and users not wanted on a device
+    are deleted. Devices that could not be read are skipped.
+    :param prune: Also delete every code on devices with no desired codes at all,
+        which are otherwise left alone.
+    """
+    desired_by_device: Dict[int, Dict[str, str]] = {}
+    for key_code in desired:
+        desired_by_device.setdefault(key_code.device_id, {})[key_code.username] = key_code.code
+
+    known_device_ids = {device.device_id for device in snapshot.devices}
+    unknown_device_ids = sorted(set(desired_by_device) - known_device_ids)
+    if unknown_device_ids:
+        raise ValueError(f"Unknown device ids in desired state: {unknown_device_ids}")
+
+    operations: List[controller.BulkKeyCodeOperation] = []
+    unchanged = 0
+    skipped_devices = []
+    untouched_device_ids = []
+    for device in snapshot.devices:
+        if not device.success:
+            skipped_devices.append(device)
+            continue
+
+        # A device missing from the file is more likely left out than meant to be emptied
+        if device.device_id not in desired_by_device and not prune:
+            untouched_device_ids.append(device.device_id)
+            continue
+
+        wanted = desired_by_device.get(device.device_id, {})
+        current = {lock_code.name: str(lock_code.code) for lock_code in device.codes}
+
+        # Deletes go first so their codes and positions are free for the writes after them
+        deletes, updates, creates = [], [], []
+        for username in sorted(current):
+            if username not in wanted:
+                deletes.append(
+                    controller.BulkKeyCodeOperation(
+                        smart_lock.DELETE_ACTION, username, device.device_id
+                    )
+                )
+        for username, code in sorted(wanted.items()):
+            if username not in current:
+                action, bucket = smart_lock.CREATE_ACTION, creates
+            elif current[username] != code:
+                action, bucket = smart_lock.UPDATE_ACTION, updates
+            else:
+                unchanged += 1
+                continue
+            bucket.append(
+                controller.BulkKeyCodeOperation(action, username, device.device_id, code)
+            )
+
+        updates, replaced_users = order_updates(updates, current)
+        for username in replaced_users:
+            deletes.append(
+                controller.BulkKeyCodeOperation(
+                    smart_lock.DELETE_ACTION, username, device.device_id
+                )
+            )
+            creates.append(
+                controller.BulkKeyCodeOperation(
+                    smart_lock.CREATE_ACTION, username, device.device_id, wanted[username]
+                )
+            )
+
+        operations.extend(deletes + updates + creates)
+
+    return SyncPlan(operations, unchanged, skipped_devices, untouched_device_ids)
+
+
+def format_plan(plan: SyncPlan) -> str:
+    lines = [
+        f"{operation.action:<7} device {operation.device_id:<5} {operation.username}"
+        for operation in plan.operations
+    ]
+    for device in plan.skipped_devices:
+        lines.append(f"skip    device {device.device_id:<5} {device.error}")
+    for device_id in plan.untouched_device_ids:
+        lines.append(f"keep    device {device_id:<5} not in desired state, use --prune to empty it")
+
+    lines.append(
+        f"{plan.hub_operations} hub operations: "
+        f"{plan.count(smart_lock.CREATE_ACTION)} create, "
+        f"{plan.count(smart_lock.UPDATE_ACTION)} update, "
+        f"{plan.count(smart_lock.DELETE_ACTION)} delete, "
+        f"{plan.unchanged} unchanged"
+    )
+    return "\n".join(lines)
+
+
+def load_desired_state(path: str) -> List[DesiredKeyCode]:
+    """
+    Read the desired key codes from a CSV file with username, device_id and
+    code columns, as exported from a spreadsheet, or from a JSON list of
+    objects with the same keys.
+    """
+    with open(path, newline="") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    desired = [
+        DesiredKeyCode(
+            int(row["device_id"]), str(row["username"]).strip(), str(row["code"]).strip()
+        )
+        for row in rows
+    ]
+    validate_desired_state(desired)
+    return desired
+
+
+def order_updates(
+    updates: List[controller.BulkKeyCodeOperation], current: Dict[str, str]
+) -> Tuple[List[controller.BulkKeyCodeOperation], List[str]]:
+    """
+    Order a device's updates so each one runs after the update that frees its
+    new code; the lock refuses a code another user still holds. Users whose
+    updates wait on each other, such as two users swapping codes, cannot be
+    ordered and are returned to be deleted first and created last instead.
+    """
+    holders = {code: username for username, code in current.items()}
+    pending = {operation.username: operation for operation in updates}
+    ordered: List[controller.BulkKeyCodeOperation] = []
+    replaced_users: List[str] = []
+    while pending:
+        ready = [
+            username
+            for username, operation in sorted(pending.items())
+            if holders.get(operation.code) not in pending
+        ]
+        if not ready:
+            # Every remaining update waits on another, deleting one breaks the cycle
+            username = min(pending)
+            replaced_users.append(username)
+            del pending[username]
+            continue
+
+        for username in ready:
+            ordered.append(pending.pop(username))
+
+    return ordered, replaced_users
+
+
+def validate_desired_state(desired: List[DesiredKeyCode]) -> None:
+    seen_users: Dict[tuple, str] = {}
+    seen_codes: Dict[tuple, str] = {}
+    for key_code in desired:
+        if not key_code.username:
+            raise ValueError(f"Username is required on device {key_code.device_id}")
+
+        # Ensure code is 8 digits and numeric
+        if not key_code.code.isdigit() or len(key_code.code) != 8:
+            raise ValueError(f"Code for {key_code.username} must be 8 digits and numeric")
+
+        user_key = (key_code.device_id, key_code.username)
+        if seen_users.setdefault(user_key, key_code.code) != key_code.code:
+            raise ValueError(
+                f"{key_code.username} has more than one code on device {key_code.device_id}"
+            )
+
+        code_key = (key_code.device_id, key_code.code)
+        if seen_codes.setdefault(code_key, key_code.username) != key_code.username:
+            raise ValueError(
+                f"Code for {key_code.username} is also given to "
+                f"{seen_codes[code_key]} on device {key_code.device_id}"
+            )
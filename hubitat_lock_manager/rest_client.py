@@ -1,29 +1,214 @@
+import base64
+import logging
+import threading
+import time
 import urllib
+from concurrent.futures import ThreadPoolExecutor
 import google.auth.transport.requests
 import google.oauth2.id_token
 import json
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def fetch_id_token(audience):
+    auth_req = google.auth.transport.requests.Request()
+    return google.oauth2.id_token.fetch_id_token(auth_req, audience)
+
+
+def get_token_expiry(token, default_lifetime_seconds, now):
+    """
+    Read the ``exp`` claim from a JWT without verifying it. Tokens that cannot
+    be decoded are assumed to live for ``default_lifetime_seconds``.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return now + default_lifetime_seconds
+
+
+class IdTokenCache:
+    """
+    Caches ID tokens per audience until shortly before they expire. Within
+    ``refresh_margin_seconds`` of expiry the current token is still served
+    while a single background fetch replaces it, and concurrent callers that
+    need a token share one fetch.
+    """
+
+    def __init__(
+        self,
+        fetch_token=fetch_id_token,
+        refresh_margin_seconds=300,
+        default_lifetime_seconds=3600,
+        clock=time.time,
+    ):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.default_lifetime_seconds = default_lifetime_seconds
+        self._fetch_token = fetch_token
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._fetch_locks = {}
+        self._refreshing = set()
+
+    def get(self, audience):
+        with self._lock:
+            entry = self._tokens.get(audience)
+
+        now = self._clock()
+        if entry is not None:
+            token, expiry = entry
+            if now < expiry - self.refresh_margin_seconds:
+                return token
+
+            if now < expiry:
+                self._refresh_in_background(audience)
+                return token
+
+        return self._fetch(audience, stale_entry=entry)
+
+    def invalidate(self, audience):
+        with self._lock:
+            self._tokens.pop(audience, None)
+
+    def _fetch(self, audience, stale_entry=None):
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(audience, threading.Lock())
+
+        with fetch_lock:
+            # Another caller may have fetched a fresh token while we waited
+            with self._lock:
+                entry = self._tokens.get(audience)
+            if entry is not None and entry is not stale_entry:
+                token, expiry = entry
+                if self._clock() < expiry - self.refresh_margin_seconds:
+                    return token
+
+            token = self._fetch_token(audience)
+            expiry = get_token_expiry(token, self.default_lifetime_seconds, self._clock())
+            with self._lock:
+                self._tokens[audience] = (token, expiry)
+            return token
+
+    def _refresh_in_background(self, audience):
+        with self._lock:
+            if audience in self._refreshing:
+                return
+            self._refreshing.add(audience)
+            stale_entry = self._tokens.get(audience)
+
+        def refresh():
+            try:
+                self._fetch(audience, stale_entry=stale_entry)
+            except Exception as e:
+                logging.error(f"ID token refresh failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(audience)
+
+        threading.Thread(target=refresh, name="id-token-refresh", daemon=True).start()
+
+
+# Shared by every client in the process so tokens are fetched once per audience
+ID_TOKEN_CACHE = IdTokenCache()
+
+
+class UrllibTransport:
+    """
+    Sends each request on a new connection with ``urllib``.
+    """
+
+    def request(self, method, url, headers, body=None):
+        req = urllib.request.Request(url, method=method)
+
+        if body is not None:
+            req.data = body
+
+        for name, value in headers.items():
+            req.add_header(name, value)
+
+        with urllib.request.urlopen(req) as response:
+            return response.read().decode('utf-8')
+
+    def close(self):
+        pass
+
+
+class PooledHttpTransport:
+    """
+    Sends requests over a pool of persistent keep-alive connections, so the
+    TLS handshake is paid once per connection rather than once per call.
+    """
+
+    def __init__(self, pool_size=10, timeout=300):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, headers, body=None):
+        response = self.session.request(
+            method, url, headers=headers, data=body, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        self.session.close()
+
 
 class CloudRunRestClient:
-    def __init__(self, base_url):
+    def __init__(self, base_url, token_cache=None, transport=None, max_workers=8):
         self.base_url = base_url
         self.audience = base_url
+        self.token_cache = token_cache or ID_TOKEN_CACHE
+        self.transport = transport or UrllibTransport()
+        self.max_workers = max_workers
 
     def _get_id_token(self):
-        auth_req = google.auth.transport.requests.Request()
-        return google.oauth2.id_token.fetch_id_token(auth_req, self.audience)
+        return self.token_cache.get(self.audience)
 
     def _make_request(self, method, resource, data=None):
         url = f"{self.base_url}/{resource}"
-        req = urllib.request.Request(url, method=method.upper())
+        headers = {}
+        body = None
 
         if data:
-            req.add_header("Content-Type", "application/json")
-            req.data = json.dumps(data).encode('utf-8')
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(data).encode('utf-8')
 
-        req.add_header("Authorization", f"Bearer {self._get_id_token()}")
+        headers["Authorization"] = f"Bearer {self._get_id_token()}"
 
-        with urllib.request.urlopen(req) as response:
-            return response.read().decode('utf-8')
+        return self.transport.request(method.upper(), url, headers, body)
+
+    def batch(self, calls, return_exceptions=False):
+        """
+        Send several requests concurrently and return their responses in the
+        order given. Each call is a ``(method, resource)`` or
+        ``(method, resource, data)`` tuple. With ``return_exceptions`` a
+        failed call yields its exception in place of a response instead of
+        raising.
+        """
+        calls = [tuple(call) for call in calls]
+        if not calls:
+            return []
+
+        def send(call):
+            try:
+                return self._make_request(*call)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as executor:
+            return list(executor.map(send, calls))
+
+    def close(self):
+        self.transport.close()
 
     def get(self, resource):
         return self._make_request('GET', resource)
@@ -34,5 +219,5 @@ class CloudRunRestClient:
     def put(self, resource, data):
         return self._make_request('PUT', resource, data)
 
-    def delete(self, resource):
-        return self._make_request('DELETE', resource)
+    def delete(self, resource, data=None):
+        return self._make_request('DELETE', resource, data)
@@ -1,12 +1,60 @@
+import importlib
 import json
 import time
-from dataclasses import dataclass
-from typing import Callable, Iterable
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, ContextManager, Iterable, List, Optional
+
+from hubitat_lock_manager import metrics
+from hubitat_lock_manager.browser_profile import (
+    BROWSER_PROFILES,
+    DEFAULT_PROFILE,
+    BrowserProfile,
+    apply_browser_profile,
+    block_urls,
+    get_profile_directories,
+    release_profile_directory,
+)
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.chromedriver import forget_chromedriver_path, resolve_chromedriver_path
+from hubitat_lock_manager.driver_pool import DriverPool, DriverPoolConfig
+from hubitat_lock_manager.positions import PositionAllocator
+
+# Selenium takes a noticeable share of startup time and only the webdriver backend
+# needs it, so it is imported on first use. These names stay reachable as module
+# attributes, e.g. for patching ``smart_lock.webdriver.Chrome``.
+LAZY_IMPORTS = {
+    "By": ("selenium.webdriver.common.by", "By"),
+    "ChromeService": ("selenium.webdriver.chrome.service", "Service"),
+    "NoSuchElementException": ("selenium.common.exceptions", "NoSuchElementException"),
+    "WebDriverException": ("selenium.common.exceptions", "WebDriverException"),
+    "webdriver": ("selenium.webdriver", None),
+}
+
+CREATE_ACTION = "create"
+DELETE_ACTION = "delete"
+UPDATE_ACTION = "update"
+KEY_CODE_ACTIONS = (CREATE_ACTION, DELETE_ACTION, UPDATE_ACTION)
+
+# Reads the device table and the lock codes state in one round trip to the
+# browser, instead of one WebDriver call per element, row and cell
+PAGE_DATA_SCRIPT = """
+const table = document.getElementById("device-table");
+const body = table && table.tBodies[0];
+const lockCodes = document.getElementById("cstate-value-lockCodes");
+return {
+    devices: body
+        ? Array.from(body.querySelectorAll("tr"))
+            .map(row => ({
+                id: row.getAttribute("data-device-id"),
+                cells: Array.from(row.querySelectorAll("td"), cell => cell.innerText),
+            }))
+            .filter(row => row.cells.length > 0)
+        : null,
+    lockCodes: lockCodes ? lockCodes.innerText : null,
+};
+"""
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
 
 @dataclass(frozen=True)
 class CodeLister:
@@ -29,6 +77,7 @@ class CreateKeyCodeParams:
 class CreateKeyCodeResult:
     position: int
     timestamp: int
+    verified: bool = False
 
 
 @dataclass(frozen=True)
@@ -46,6 +95,7 @@ class DeleteKeyCodeParams:
 class DeleteKeyCodeResult:
     success: bool
     message: str
+    verified: bool = False
 
 
 @dataclass(frozen=True)
@@ -53,6 +103,12 @@ class DeletePositionParams:
     position: int
 
 
+@dataclass(frozen=True)
+class DeletePositionResult:
+    position: int
+    verified: bool = False
+
+
 @dataclass(frozen=True)
 class Device:
     id: int
@@ -65,6 +121,26 @@ class Factory:
     list_smart_locks: Callable[[], "ListDevicesResult"]
 
 
+@dataclass(frozen=True)
+class KeyCodeOperation:
+    action: str
+    username: str
+    code: str = ""
+
+
+@dataclass(frozen=True)
+class KeyCodeOperationResult:
+    operation: KeyCodeOperation
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    exception: Optional[Exception] = field(default=None, compare=False, repr=False)
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
 @dataclass(frozen=True)
 class ListDevicesResult:
     devices: Iterable[Device]
@@ -87,34 +163,69 @@ class DeviceLister:
     list_devices: Callable[[], ListDevicesResult]
 
 
+@dataclass(frozen=True)
+class DeviceSession:
+    list_codes: Callable[[], ListKeyCodesResult]
+    set_code: Callable[["SetCodeParams"], "SetCodeResult"]
+    delete_position: Callable[["DeletePositionParams"], "DeletePositionResult"]
+
+
+@dataclass(frozen=True)
+class DeviceSessionOpener:
+    open_session: Callable[[], ContextManager[DeviceSession]]
+
+
 @dataclass(frozen=True)
 class PositionDeleter:
-    delete_position: Callable[["DeletePositionParams"], None]
+    delete_position: Callable[["DeletePositionParams"], "DeletePositionResult"]
 
 
 @dataclass(frozen=True)
 class SetCodeParams:
     code: str
     name: str
+    position: Optional[int] = None
 
 
 @dataclass(frozen=True)
 class SetCodeResult:
     position: int
+    verified: bool = False
 
 
 @dataclass(frozen=True)
 class SmartLock:
+    apply_key_code_operations: Callable[
+        [Iterable[KeyCodeOperation]], List[KeyCodeOperationResult]
+    ]
     create_key_code: Callable[[CreateKeyCodeParams], CreateKeyCodeResult]
     delete_key_code: Callable[[DeleteKeyCodeParams], DeleteKeyCodeResult]
     get_next_position: Callable[[], int]
     list_key_codes: Callable[[], ListKeyCodesResult]
+    update_key_code: Callable[["UpdateKeyCodeParams"], CreateKeyCodeResult]
 
 
 @dataclass(frozen=True)
 class SmartLockConfig:
     device_lister: DeviceLister
     smart_lock_factory: Factory
+    close: Callable[[], None] = lambda: None
+    code_cache: Optional[TtlLruCache["ListKeyCodesResult"]] = None
+    refresh_devices: Optional[Callable[[], ListDevicesResult]] = None
+
+
+@dataclass(frozen=True)
+class UpdateKeyCodeParams:
+    code: str
+    username: str
+
+
+@dataclass(frozen=True)
+class WriteConfirmationConfig:
+    timeout_seconds: float = 30.0
+    initial_delay_seconds: float = 0.25
+    backoff_factor: float = 2.0
+    max_delay_seconds: float = 4.0
 
 
 @dataclass(frozen=True)
@@ -122,102 +233,472 @@ class WebdriverConfig:
     hub_ip: str
     command_executor: str
     device_name_filter: str = "lock"
+    # None returns once a write is submitted, which may cut it off, and reports verified=False
+    write_confirmation: Optional[WriteConfirmationConfig] = WriteConfirmationConfig()
+    driver_pool: Optional[DriverPool] = field(default=None, compare=False, repr=False)
+    browser_profile: BrowserProfile = BROWSER_PROFILES[DEFAULT_PROFILE]
+
+    @contextmanager
+    def borrow_driver(self):
+        if self.driver_pool is not None:
+            with self.driver_pool.borrow() as driver:
+                yield driver
+            return
+
+        driver = self.create_driver()
+        try:
+            yield driver
+        finally:
+            quit_driver(driver)
+
+    def close(self) -> None:
+        if self.driver_pool is not None:
+            self.driver_pool.close()
 
     def create_driver(self):
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.chrome.service import Service as ChromeService
+
         options = webdriver.ChromeOptions()    # ChromeDriver can be sensitive to version changes, so we use these arguments to improve stability
-        options.add_argument("start-maximized")  # Start the browser maximized
+        profile_directories, slot, profile_directory = None, None, None
+        if self.browser_profile.profile_root and not self.command_executor:
+            # Reuse a persistent profile so a new browser starts with the hub's assets cached.
+            # Slots are counted per process, so they would collide on a shared remote node
+            profile_directories = get_profile_directories(self.browser_profile.profile_root)
+            slot, profile_directory = profile_directories.acquire()
+            if slot is None:
+                profile_directories = None
+        apply_browser_profile(options, self.browser_profile, profile_directory)
         options.add_argument("enable-automation")  # Enable automation mode
         options.add_argument("--headless")  # Run in headless mode (no GUI)
         options.add_argument("--no-sandbox")  # Bypass OS security model
         options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
         options.add_argument("--disable-browser-side-navigation")  # Avoid errors on page load timeout
 
-        if self.command_executor:
-            return webdriver.Remote(
-                command_executor=self.command_executor,
-                options=options
+        try:
+            if self.command_executor:
+                driver = webdriver.Remote(
+                    command_executor=self.command_executor,
+                    options=options
+                )
+            else:
+                try:
+                    driver = webdriver.Chrome(
+                        service=ChromeService(resolve_chromedriver_path()), options=options
+                    )
+                except WebDriverException:
+                    # A Chrome upgrade can leave the cached driver behind, so resolve it again
+                    forget_chromedriver_path()
+                    driver = webdriver.Chrome(
+                        service=ChromeService(resolve_chromedriver_path()), options=options
+                    )
+        except Exception:
+            if profile_directories is not None:
+                profile_directories.release(slot)
+            raise
+
+        if profile_directories is not None:
+            profile_directories.bind(driver, slot)
+        block_urls(driver, self.browser_profile)
+
+        metrics.WEBDRIVER_LAUNCHES.inc()
+        return driver
+
+
+def __getattr__(name: str):
+    if name not in LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = LAZY_IMPORTS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+def apply_key_code_operation_in_session(
+    session: DeviceSession, operation: KeyCodeOperation
+) -> KeyCodeOperationResult:
+    """
+    Apply one operation within an open session, capturing its failure so the
+    remaining operations of the batch still run.
+    """
+    try:
+        if operation.action == CREATE_ACTION:
+            params = CreateKeyCodeParams(code=operation.code, username=operation.username)
+            result = create_key_code_in_session(session, params)
+        elif operation.action == DELETE_ACTION:
+            params = DeleteKeyCodeParams(username=operation.username)
+            result = delete_key_code_in_session(session, params)
+        elif operation.action == UPDATE_ACTION:
+            params = UpdateKeyCodeParams(code=operation.code, username=operation.username)
+            result = update_key_code_in_session(session, params)
+        else:
+            raise ValueError(
+                f"Unknown action {operation.action}, expected one of {KEY_CODE_ACTIONS}"
             )
+    except Exception as e:
+        # Counted by the controller, which knows whether the error is raised or reported
+        return KeyCodeOperationResult(
+            operation, error=str(e), error_type=type(e).__name__, exception=e
+        )
+
+    return KeyCodeOperationResult(operation, result=result)
+
+
+def confirm_delete_code(driver, position: int, config: WebdriverConfig) -> bool:
+    return wait_for_lock_codes(
+        driver,
+        lambda result: all(c.position != position for c in result.codes),
+        config.write_confirmation,
+    )
+
+
+def confirm_set_code(driver, params: SetCodeParams, config: WebdriverConfig) -> bool:
+    expected = LockCode(code=str(params.code), name=params.name, position=params.position)
+    return wait_for_lock_codes(
+        driver,
+        lambda result: expected in result.codes,
+        config.write_confirmation,
+    )
+
+
+def create_cache_updating_code_setter(
+    device_id: int, code_setter: CodeSetter, cache: TtlLruCache[ListKeyCodesResult]
+) -> CodeSetter:
+    def get_next_position() -> int:
+        cached = get_cached_codes(cache, device_id)
+        if cached is None:
+            return code_setter.get_next_position()
+
+        return get_next_position_based_on_list_key_codes_result(cached)
+
+    def set_code(params: SetCodeParams) -> SetCodeResult:
+        if params.position is None:
+            params = replace(params, position=get_next_position())
+
+        try:
+            result = code_setter.set_code(params)
+        except Exception:
+            cache.invalidate(device_id)
+            raise
+
+        lock_code = LockCode(code=params.code, name=params.name, position=result.position)
+        cache.update(device_id, lambda cached: with_lock_code(cached, lock_code))
+        return result
+
+    return CodeSetter(get_next_position, set_code)
+
+
+def create_cache_updating_device_session_opener(
+    device_id: int,
+    session_opener: DeviceSessionOpener,
+    cache: TtlLruCache[ListKeyCodesResult],
+) -> DeviceSessionOpener:
+    @contextmanager
+    def open_session():
+        with session_opener.open_session() as session:
+            yield create_cache_updating_device_session(device_id, session, cache)
+
+    return DeviceSessionOpener(open_session)
+
 
-        return webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
-            options=options,
+def create_cache_updating_device_session(
+    device_id: int, session: DeviceSession, cache: TtlLruCache[ListKeyCodesResult]
+) -> DeviceSession:
+    def list_codes() -> ListKeyCodesResult:
+        cached = get_cached_codes(cache, device_id)
+        if cached is not None:
+            return cached
+
+        result = ListKeyCodesResult(codes=list(session.list_codes().codes))
+        cache.put(device_id, result)
+        return result
+
+    def set_code(params: SetCodeParams) -> SetCodeResult:
+        if params.position is None:
+            next_position = get_next_position_based_on_list_key_codes_result(list_codes())
+            params = replace(params, position=next_position)
+
+        try:
+            result = session.set_code(params)
+        except Exception:
+            cache.invalidate(device_id)
+            raise
+
+        lock_code = LockCode(code=params.code, name=params.name, position=result.position)
+        cache.update(device_id, lambda cached: with_lock_code(cached, lock_code))
+        return result
+
+    def delete_position(params: DeletePositionParams) -> DeletePositionResult:
+        try:
+            result = session.delete_position(params)
+        except Exception:
+            cache.invalidate(device_id)
+            raise
+
+        cache.update(
+            device_id, lambda cached: without_position(cached, params.position)
+        )
+        return result
+
+    return DeviceSession(list_codes, set_code, delete_position)
+
+
+def create_cache_updating_position_deleter(
+    device_id: int,
+    position_deleter: PositionDeleter,
+    cache: TtlLruCache[ListKeyCodesResult],
+) -> PositionDeleter:
+    def delete_position(params: DeletePositionParams) -> DeletePositionResult:
+        try:
+            result = position_deleter.delete_position(params)
+        except Exception:
+            cache.invalidate(device_id)
+            raise
+
+        cache.update(
+            device_id, lambda cached: without_position(cached, params.position)
+        )
+        return result
+
+    return PositionDeleter(delete_position)
+
+
+def create_caching_code_lister(
+    code_lister: CodeLister, cache: TtlLruCache[ListKeyCodesResult]
+) -> CodeLister:
+    def list_codes(device_id: int) -> ListKeyCodesResult:
+        cached = get_cached_codes(cache, device_id)
+        if cached is not None:
+            return cached
+
+        result = code_lister.list_codes(device_id)
+
+        # Freeze the codes so later in-place updates never see a consumed iterator
+        result = ListKeyCodesResult(codes=list(result.codes))
+        cache.put(device_id, result)
+        return result
+
+    return CodeLister(list_codes)
+
+
+def create_component_device_session_opener(
+    device_id: int,
+    position_deleter: PositionDeleter,
+    code_lister: CodeLister,
+    code_setter: CodeSetter,
+) -> DeviceSessionOpener:
+    @contextmanager
+    def open_session():
+        yield create_tracking_device_session(
+            lambda: code_lister.list_codes(device_id),
+            code_setter.set_code,
+            position_deleter.delete_position,
         )
 
+    return DeviceSessionOpener(open_session)
+
 
 def create_generic_z_wave_lock(
     device_id: int,
     position_deleter: PositionDeleter,
     code_lister: CodeLister,
     code_setter: CodeSetter,
+    session_opener: Optional[DeviceSessionOpener] = None,
+    position_allocator: Optional[PositionAllocator] = None,
 ) -> SmartLock:
-    def create_key_code(params: CreateKeyCodeParams) -> CreateKeyCodeResult:
-        existing_codes = code_lister.list_codes(device_id).codes
-        if any(lock_code.code == params.code for lock_code in existing_codes):
-            raise ValueError(f"Code {params.code} already exists")
-
-        if any(lock_code.name == params.username for lock_code in existing_codes):
-            raise ValueError(f"Key code for {params.username} already exists")
+    # Without a dedicated session, each write goes through the individual components
+    if session_opener is None:
+        session_opener = create_component_device_session_opener(
+            device_id, position_deleter, code_lister, code_setter
+        )
 
-        timestamp = int(time.time())
-        set_code_result = code_setter.set_code(
-            SetCodeParams(params.code, params.username)
+    # Reserve positions so concurrent creates on this device never pick the same slot
+    if position_allocator is not None:
+        code_setter = create_position_allocating_code_setter(
+            device_id, code_setter, code_lister, position_allocator
+        )
+        session_opener = create_position_allocating_device_session_opener(
+            device_id, session_opener, position_allocator
         )
-        return CreateKeyCodeResult(set_code_result.position, timestamp=timestamp)
+
+    def apply_key_code_operations(
+        operations: Iterable[KeyCodeOperation],
+    ) -> List[KeyCodeOperationResult]:
+        with session_opener.open_session() as session:
+            return [
+                apply_key_code_operation_in_session(session, operation)
+                for operation in operations
+            ]
+
+    def create_key_code(params: CreateKeyCodeParams) -> CreateKeyCodeResult:
+        with session_opener.open_session() as session:
+            return create_key_code_in_session(session, params)
 
     def delete_key_code(
         params: DeleteKeyCodeParams,
     ) -> DeleteKeyCodeResult:
-        existing_codes = code_lister.list_codes(device_id).codes
-        position = next(
-            (
-                lock_code.position
-                for lock_code in existing_codes
-                if lock_code.name == params.username
-            ),
-            None,
-        )
-        if not position:
-            return DeleteKeyCodeResult(success=True, message="Key code not found")
-
-        params = DeletePositionParams(position=position)
-        position_deleter.delete_position(params)
-        return DeleteKeyCodeResult(success=True, message="Key code deleted")
+        with session_opener.open_session() as session:
+            return delete_key_code_in_session(session, params)
 
     def list_key_codes() -> ListKeyCodesResult:
         return code_lister.list_codes(device_id)
 
+    def update_key_code(params: UpdateKeyCodeParams) -> CreateKeyCodeResult:
+        with session_opener.open_session() as session:
+            return update_key_code_in_session(session, params)
+
     return SmartLock(
+        apply_key_code_operations=apply_key_code_operations,
         create_key_code=create_key_code,
         delete_key_code=delete_key_code,
         get_next_position=code_setter.get_next_position,
         list_key_codes=list_key_codes,
+        update_key_code=update_key_code,
+    )
+
+
+def create_key_code_in_session(
+    session: DeviceSession, params: CreateKeyCodeParams
+) -> CreateKeyCodeResult:
+    existing_codes = session.list_codes().codes
+    if any(lock_code.code == params.code for lock_code in existing_codes):
+        raise ValueError(f"Code {params.code} already exists")
+
+    if any(lock_code.name == params.username for lock_code in existing_codes):
+        raise ValueError(f"Key code for {params.username} already exists")
+
+    timestamp = int(time.time())
+    set_code_result = session.set_code(SetCodeParams(params.code, params.username))
+    return CreateKeyCodeResult(
+        set_code_result.position,
+        timestamp=timestamp,
+        verified=set_code_result.verified,
+    )
+
+
+def create_pooled_webdriver_config(
+    config: WebdriverConfig, pool_config: DriverPoolConfig = DriverPoolConfig()
+) -> WebdriverConfig:
+    # The pool creates drivers from the unpooled config, so it never borrows from itself
+    driver_pool = DriverPool(
+        config.create_driver,
+        pool_config,
+        quit_driver=quit_driver,
+        warm_driver=lambda driver: warm_driver(driver, config),
     )
+    driver_pool.start()
+    return replace(config, driver_pool=driver_pool)
+
+
+def create_position_allocating_code_setter(
+    device_id: int,
+    code_setter: CodeSetter,
+    code_lister: CodeLister,
+    allocator: PositionAllocator,
+) -> CodeSetter:
+    def read_positions() -> List[int]:
+        return [lock_code.position for lock_code in code_lister.list_codes(device_id).codes]
+
+    def get_next_position() -> int:
+        return allocator.next_position(device_id, read_positions)
+
+    def set_code(params: SetCodeParams) -> SetCodeResult:
+        return set_code_with_reservation(
+            device_id, code_setter.set_code, params, read_positions, allocator, read_positions
+        )
+
+    return CodeSetter(get_next_position, set_code)
+
+
+def create_position_allocating_device_session_opener(
+    device_id: int, session_opener: DeviceSessionOpener, allocator: PositionAllocator
+) -> DeviceSessionOpener:
+    @contextmanager
+    def open_session():
+        with session_opener.open_session() as session:
+            yield create_position_allocating_device_session(device_id, session, allocator)
+
+    return DeviceSessionOpener(open_session)
+
+
+def create_position_allocating_device_session(
+    device_id: int, session: DeviceSession, allocator: PositionAllocator
+) -> DeviceSession:
+    def read_positions() -> List[int]:
+        return [lock_code.position for lock_code in session.list_codes().codes]
+
+    def set_code(params: SetCodeParams) -> SetCodeResult:
+        # The session's snapshot is already read, so it costs nothing to check against
+        return set_code_with_reservation(
+            device_id, session.set_code, params, read_positions, allocator, read_positions
+        )
+
+    def delete_position(params: DeletePositionParams) -> DeletePositionResult:
+        try:
+            result = session.delete_position(params)
+        except Exception:
+            allocator.invalidate(device_id)
+            raise
+
+        allocator.mark_free(device_id, params.position)
+        return result
+
+    return DeviceSession(session.list_codes, set_code, delete_position)
+
+
+def create_tracking_device_session(
+    read_codes: Callable[[], ListKeyCodesResult],
+    set_code: Callable[[SetCodeParams], SetCodeResult],
+    delete_position: Callable[[DeletePositionParams], DeletePositionResult],
+    assign_positions: bool = False,
+) -> DeviceSession:
+    """
+    Wrap raw read and write operations in a session that reads the lock codes
+    at most once and keeps that snapshot current as writes are applied.
+    """
+    snapshot: Optional[ListKeyCodesResult] = None
+
+    def list_codes() -> ListKeyCodesResult:
+        nonlocal snapshot
+        if snapshot is None:
+            snapshot = ListKeyCodesResult(codes=list(read_codes().codes))
+        return snapshot
+
+    def tracked_set_code(params: SetCodeParams) -> SetCodeResult:
+        nonlocal snapshot
+        if assign_positions and params.position is None:
+            next_position = get_next_position_based_on_list_key_codes_result(list_codes())
+            params = replace(params, position=next_position)
+
+        result = set_code(params)
+        if snapshot is not None:
+            lock_code = LockCode(params.code, params.name, result.position)
+            snapshot = with_lock_code(snapshot, lock_code)
+        return result
+
+    def tracked_delete_position(params: DeletePositionParams) -> DeletePositionResult:
+        nonlocal snapshot
+        # Deleters that predate confirmation return nothing, treat them as unverified
+        result = delete_position(params) or DeletePositionResult(params.position)
+        if snapshot is not None:
+            snapshot = without_position(snapshot, params.position)
+        return result
+
+    return DeviceSession(list_codes, tracked_set_code, tracked_delete_position)
 
 
 def create_webdriver_based_code_deleter(
     device_id: int, config: WebdriverConfig
 ) -> PositionDeleter:
-    def delete_position(params: DeletePositionParams) -> None:
-        driver = config.create_driver()
-        try:
+    def delete_position(params: DeletePositionParams) -> DeletePositionResult:
+        with config.borrow_driver() as driver:
             # Navigate to the device edit page
-            driver.get(f"http://{config.hub_ip}/device/edit/{device_id}")
-
-            # Locate the form element by its id
-            form = driver.find_element(By.ID, "form-deleteCode-1")
-
-            # Now locate the child input field within this form
-            code_position = form.find_element(By.NAME, "arg[1]")
-
-            # Fill in the field
-            code_position.send_keys(
-                str(params.position)
-            )  # Replace with the desired code position
+            open_device_page(driver, device_id, config)
 
-            # Submit the form
-            form.submit()
-        finally:
-            driver.quit()
+            submit_delete_code_form(driver, params.position)
+            verified = confirm_delete_code(driver, params.position, config)
+            return DeletePositionResult(params.position, verified=verified)
 
     return PositionDeleter(delete_position)
 
@@ -236,41 +717,58 @@ def create_webdriver_based_code_setter(
         return get_next_position_via_webdriver(device_id, config)
 
     def set_code(params: SetCodeParams) -> SetCodeResult:
-        driver = config.create_driver()
-        try:
-            # Navigate to the device edit page
-            driver.get(f"http://{config.hub_ip}/device/edit/{device_id}")
-
-            # Locate the form element by its id
-            form = driver.find_element(By.ID, "form-setCode-5")
+        # Resolve the position before borrowing, a nested borrow could exhaust the pool
+        position = params.position or get_next_position()
 
-            # Now locate the child input fields within this form
-            code_position = form.find_element(By.NAME, "arg[1]")
-            pin_code = form.find_element(By.NAME, "arg[2]")
-            name = form.find_element(By.NAME, "arg[3]")
-
-            position = get_next_position()
+        with config.borrow_driver() as driver:
+            # Navigate to the device edit page
+            open_device_page(driver, device_id, config)
 
-            print(f"Setting code at position {position}")
+            params = replace(params, position=position)
+            submit_set_code_form(driver, params)
+            verified = confirm_set_code(driver, params, config)
 
-            # Fill in the fields
-            code_position.send_keys(
-                str(position)
-            )  # Replace with the desired code position
-            pin_code.send_keys(str(params.code))  # Replace with the desired PIN code
-            name.send_keys(params.name)  # Replace with the desired name
+            return SetCodeResult(position=position, verified=verified)
 
-            # Submit the form
-            form.submit()
+    return CodeSetter(get_next_position, set_code)
 
-            # Wait for the page to reload
-            time.sleep(5)
 
-            return SetCodeResult(position=position)
-        finally:
-            driver.quit()
+def create_webdriver_device_session_opener(
+    device_id: int, config: WebdriverConfig
+) -> DeviceSessionOpener:
+    @contextmanager
+    def open_session():
+        with ExitStack() as stack:
+            drivers = []
+
+            def get_driver():
+                # Only borrow a browser and load the page once the session needs it
+                if not drivers:
+                    driver = stack.enter_context(config.borrow_driver())
+                    open_device_page(driver, device_id, config)
+                    drivers.append(driver)
+                return drivers[0]
+
+            def set_code(params: SetCodeParams) -> SetCodeResult:
+                driver = get_driver()
+                submit_set_code_form(driver, params)
+                verified = confirm_set_code(driver, params, config)
+                return SetCodeResult(position=params.position, verified=verified)
+
+            def delete_position(params: DeletePositionParams) -> DeletePositionResult:
+                driver = get_driver()
+                submit_delete_code_form(driver, params.position)
+                verified = confirm_delete_code(driver, params.position, config)
+                return DeletePositionResult(params.position, verified=verified)
+
+            yield create_tracking_device_session(
+                lambda: read_lock_codes(get_driver()),
+                set_code,
+                delete_position,
+                assign_positions=True,
+            )
 
-    return CodeSetter(get_next_position, set_code)
+    return DeviceSessionOpener(open_session)
 
 
 def create_webdriver_device_lister(config: WebdriverConfig) -> DeviceLister:
@@ -280,20 +778,52 @@ def create_webdriver_device_lister(config: WebdriverConfig) -> DeviceLister:
     return DeviceLister(list_devices)
 
 
-def create_webdriver_smart_lock_config(config: WebdriverConfig) -> SmartLockConfig:
+def create_webdriver_smart_lock_config(
+    config: WebdriverConfig,
+    code_cache: Optional[TtlLruCache[ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> SmartLockConfig:
     device_lister = create_webdriver_device_lister(config)
-    smart_lock_factory = create_webdriver_smart_lock_factory(config)
-    return SmartLockConfig(device_lister, smart_lock_factory)
+    smart_lock_factory = create_webdriver_smart_lock_factory(
+        config, code_cache, position_allocator
+    )
+    return SmartLockConfig(
+        device_lister, smart_lock_factory, close=config.close, code_cache=code_cache
+    )
 
 
-def create_webdriver_smart_lock_factory(config: WebdriverConfig) -> Factory:
+def create_webdriver_smart_lock_factory(
+    config: WebdriverConfig,
+    code_cache: Optional[TtlLruCache[ListKeyCodesResult]] = None,
+    position_allocator: Optional[PositionAllocator] = None,
+) -> Factory:
     def create_smart_lock(params: CreateSmartLockParams) -> SmartLock:
         position_deleter = create_webdriver_based_code_deleter(params.device_id, config)
         code_lister = create_webdriver_based_code_lister(config)
         code_setter = create_webdriver_based_code_setter(params.device_id, config)
 
+        session_opener = create_webdriver_device_session_opener(params.device_id, config)
+
+        # Serve repeated reads of the same device from memory and keep them current on writes
+        if code_cache is not None:
+            position_deleter = create_cache_updating_position_deleter(
+                params.device_id, position_deleter, code_cache
+            )
+            code_lister = create_caching_code_lister(code_lister, code_cache)
+            code_setter = create_cache_updating_code_setter(
+                params.device_id, code_setter, code_cache
+            )
+            session_opener = create_cache_updating_device_session_opener(
+                params.device_id, session_opener, code_cache
+            )
+
         return create_generic_z_wave_lock(
-            params.device_id, position_deleter, code_lister, code_setter
+            params.device_id,
+            position_deleter,
+            code_lister,
+            code_setter,
+            session_opener,
+            position_allocator,
         )
 
     def list_smart_locks() -> ListDevicesResult:
@@ -313,32 +843,48 @@ def create_webdriver_smart_lock_factory(config: WebdriverConfig) -> Factory:
 def get_codes_via_webdriver(
     device_id: int, config: WebdriverConfig
 ) -> ListKeyCodesResult:
-    driver = config.create_driver()
-    try:
-        url = f"http://{config.hub_ip}/device/edit/{device_id}"
+    with config.borrow_driver() as driver:
+        open_device_page(driver, device_id, config)
+
+        return read_lock_codes(driver)
+
+
+def delete_key_code_in_session(
+    session: DeviceSession, params: DeleteKeyCodeParams
+) -> DeleteKeyCodeResult:
+    existing_codes = session.list_codes().codes
+    position = next(
+        (
+            lock_code.position
+            for lock_code in existing_codes
+            if lock_code.name == params.username
+        ),
+        None,
+    )
+    if not position:
+        return DeleteKeyCodeResult(success=True, message="Key code not found")
 
-        driver.get(url)
+    result = session.delete_position(DeletePositionParams(position=position))
+    return DeleteKeyCodeResult(
+        success=True, message="Key code deleted", verified=result.verified
+    )
 
-        # Locate the element containing the JSON-like string
-        element = driver.find_element(By.ID, "cstate-value-lockCodes")
 
-        # Extract the text from the element
-        json_text = element.get_attribute("innerText").strip()
+def extract_page_data(driver) -> dict:
+    """
+    Return the device table rows and the lock codes text of the current page
+    from a single ``execute_script`` call. Either is None when the page does
+    not have it.
+    """
+    return driver.execute_script(PAGE_DATA_SCRIPT) or {}
 
-        # Parse the JSON-like string into a Python dictionary
-        lock_codes_dict = json.loads(json_text)
 
-        # Convert the dictionary into a list of dictionaries
-        lock_codes_list = [
-            {"position": int(key), "code": value["code"], "name": value["name"]}
-            for key, value in lock_codes_dict.items()
-        ]
-
-        return ListKeyCodesResult(
-            codes=[LockCode(**lock_code) for lock_code in lock_codes_list]
-        )
-    finally:
-        driver.quit()
+def get_cached_codes(
+    cache: TtlLruCache[ListKeyCodesResult], device_id: int
+) -> Optional[ListKeyCodesResult]:
+    cached = cache.get(device_id)
+    metrics.CACHE_REQUESTS.inc(cache="key_codes", result="miss" if cached is None else "hit")
+    return cached
 
 
 def get_next_position_based_on_list_key_codes_result(result: ListKeyCodesResult) -> int:
@@ -347,40 +893,249 @@ def get_next_position_based_on_list_key_codes_result(result: ListKeyCodesResult)
 
 
 def list_devices_via_webdriver(config: WebdriverConfig) -> ListDevicesResult:
-    driver = config.create_driver()
-    try:
+    with config.borrow_driver() as driver:
         # Navigate to the devices page
+        metrics.WEBDRIVER_NAVIGATIONS.inc(page="device_list")
         driver.get(f"http://{config.hub_ip}/device/list")
 
-        # Locate the table element containing the devices
-        table = driver.find_element(By.ID, "device-table")
+        # Rows without cells (e.g., header or empty rows) are already skipped by the script
+        rows = extract_page_data(driver).get("devices")
+        if rows is None:
+            from selenium.common.exceptions import NoSuchElementException
+
+            raise NoSuchElementException("Unable to locate the device-table element")
+
+        # The device ID is on the row and the name is in the 2nd cell
+        devices = [
+            Device(id=int(row["id"]), name=row["cells"][1].strip()) for row in rows
+        ]
 
-        # Locate the rows within the table's body
-        tbody = table.find_element(By.TAG_NAME, "tbody")
-        rows = tbody.find_elements(By.TAG_NAME, "tr")
+        return ListDevicesResult(devices=devices)
 
-        # Extract the device information from each row
-        devices = []
 
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
+def get_next_position_via_webdriver(device_id: int, config: WebdriverConfig) -> int:
+    result = get_codes_via_webdriver(device_id, config)
+    return get_next_position_based_on_list_key_codes_result(result)
 
-            # Skip rows without cells (e.g., header or empty rows)
-            if not cells:
-                continue
 
-            # Adjust the cell indices based on the actual table structure
-            # Assuming the device ID and name are in the 1st and 2nd cell respectively
-            device_id = row.get_attribute("data-device-id")
-            device_name = cells[1].text
+def open_device_page(driver, device_id: int, config: WebdriverConfig) -> None:
+    metrics.WEBDRIVER_NAVIGATIONS.inc(page="device_edit")
+    driver.get(f"http://{config.hub_ip}/device/edit/{device_id}")
 
-            devices.append(Device(id=int(device_id), name=device_name))
 
-        return ListDevicesResult(devices=devices)
-    finally:
+def poll_until(
+    check: Callable[[], bool], config: Optional[WriteConfirmationConfig]
+) -> bool:
+    """
+    Call ``check`` with exponential backoff until it returns True or the
+    confirmation timeout elapses. A None config means the caller opted out
+    of confirmation: ``check`` is never called and False is returned.
+    """
+    if config is None:
+        return False
+
+    deadline = time.monotonic() + config.timeout_seconds
+    delay = config.initial_delay_seconds
+    while True:
+        if check():
+            return True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+
+        sleep_seconds = min(delay, remaining)
+        metrics.SLEEP_SECONDS.inc(sleep_seconds, reason="write_confirmation")
+        time.sleep(sleep_seconds)
+        delay = min(delay * config.backoff_factor, config.max_delay_seconds)
+
+
+def quit_driver(driver) -> None:
+    metrics.WEBDRIVER_QUITS.inc()
+    try:
         driver.quit()
+    finally:
+        # The browser has let go of its profile, so the next one can use it
+        release_profile_directory(driver)
 
 
-def get_next_position_via_webdriver(device_id: int, config: WebdriverConfig) -> int:
-    result = get_codes_via_webdriver(device_id, config)
-    return get_next_position_based_on_list_key_codes_result(result)
+def read_lock_codes(driver) -> ListKeyCodesResult:
+    # Extract the JSON-like string from the lock codes state
+    json_text = extract_page_data(driver).get("lockCodes")
+    if json_text is None:
+        from selenium.common.exceptions import NoSuchElementException
+
+        raise NoSuchElementException("Unable to locate the cstate-value-lockCodes element")
+
+    return parse_lock_codes(json_text.strip())
+
+
+def parse_lock_codes(json_text: str) -> ListKeyCodesResult:
+    # Parse the JSON-like string into a Python dictionary
+    lock_codes_dict = json.loads(json_text)
+
+    # Convert the dictionary into a list of dictionaries
+    lock_codes_list = [
+        {"position": int(key), "code": value["code"], "name": value["name"]}
+        for key, value in lock_codes_dict.items()
+    ]
+
+    return ListKeyCodesResult(
+        codes=[LockCode(**lock_code) for lock_code in lock_codes_list]
+    )
+
+
+def set_code_with_reservation(
+    device_id: int,
+    set_code: Callable[[SetCodeParams], SetCodeResult],
+    params: SetCodeParams,
+    read_positions: Callable[[], Iterable[int]],
+    allocator: PositionAllocator,
+    read_current_positions: Optional[Callable[[], Iterable[int]]] = None,
+) -> SetCodeResult:
+    """
+    Write a code, reserving a free position first unless one was given. The
+    reservation is committed on success and released on failure, after which
+    the device's positions are re-read since the slot's state is unknown.
+    Positions from ``read_current_positions`` are treated as used even if the
+    allocator has not refreshed since they were taken.
+    """
+    if params.position is not None:
+        try:
+            result = set_code(params)
+        except Exception:
+            allocator.invalidate(device_id)
+            raise
+
+        allocator.mark_used(device_id, result.position)
+        return result
+
+    known_used = read_current_positions() if read_current_positions is not None else ()
+    reservation = allocator.reserve(device_id, read_positions, known_used)
+    try:
+        result = set_code(replace(params, position=reservation.position))
+    except Exception:
+        allocator.release(reservation)
+        allocator.invalidate(device_id)
+        raise
+
+    allocator.commit(reservation)
+    return result
+
+
+def submit_delete_code_form(driver, position: int) -> None:
+    from selenium.webdriver.common.by import By
+
+    # Locate the form element by its id
+    form = driver.find_element(By.ID, "form-deleteCode-1")
+
+    # Now locate the child input field within this form
+    code_position = form.find_element(By.NAME, "arg[1]")
+
+    # Fill in the field
+    code_position.send_keys(str(position))  # Replace with the desired code position
+
+    # Submit the form
+    metrics.WEBDRIVER_FORM_SUBMISSIONS.inc(form="deleteCode")
+    form.submit()
+
+
+def submit_set_code_form(driver, params: SetCodeParams) -> None:
+    from selenium.webdriver.common.by import By
+
+    # Locate the form element by its id
+    form = driver.find_element(By.ID, "form-setCode-5")
+
+    # Now locate the child input fields within this form
+    code_position = form.find_element(By.NAME, "arg[1]")
+    pin_code = form.find_element(By.NAME, "arg[2]")
+    name = form.find_element(By.NAME, "arg[3]")
+
+    print(f"Setting code at position {params.position}")
+
+    # Fill in the fields
+    code_position.send_keys(
+        str(params.position)
+    )  # Replace with the desired code position
+    pin_code.send_keys(str(params.code))  # Replace with the desired PIN code
+    name.send_keys(params.name)  # Replace with the desired name
+
+    # Submit the form
+    metrics.WEBDRIVER_FORM_SUBMISSIONS.inc(form="setCode")
+    form.submit()
+
+
+def update_key_code_in_session(
+    session: DeviceSession, params: UpdateKeyCodeParams
+) -> CreateKeyCodeResult:
+    existing_codes = session.list_codes().codes
+    if any(
+        lock_code.code == params.code and lock_code.name != params.username
+        for lock_code in existing_codes
+    ):
+        raise ValueError(f"Code {params.code} already exists")
+
+    # Overwrite the user's current slot in place, or take a fresh one
+    position = next(
+        (
+            lock_code.position
+            for lock_code in existing_codes
+            if lock_code.name == params.username
+        ),
+        None,
+    )
+
+    timestamp = int(time.time())
+    set_code_result = session.set_code(
+        SetCodeParams(params.code, params.username, position=position)
+    )
+    return CreateKeyCodeResult(
+        set_code_result.position,
+        timestamp=timestamp,
+        verified=set_code_result.verified,
+    )
+
+
+def wait_for_lock_codes(
+    driver,
+    predicate: Callable[[ListKeyCodesResult], bool],
+    config: Optional[WriteConfirmationConfig],
+) -> bool:
+    """
+    Reload the device page with exponential backoff until the reported lock
+    codes satisfy ``predicate``. Returns whether that happened before the
+    timeout; without a confirmation config the write is left unverified.
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    attempts = []
+
+    def check() -> bool:
+        if attempts:
+            metrics.WEBDRIVER_NAVIGATIONS.inc(page="refresh")
+            driver.refresh()
+        attempts.append(None)
+
+        try:
+            return predicate(read_lock_codes(driver))
+        except (WebDriverException, ValueError):
+            # The page may still be reloading after the form submission
+            return False
+
+    return poll_until(check, config)
+
+
+def warm_driver(driver, config: WebdriverConfig) -> None:
+    # The device list puts a standby browser on the hub origin with the hub's shared
+    # scripts and styles cached, so its first device page only loads what is specific to it
+    metrics.WEBDRIVER_NAVIGATIONS.inc(page="warmup")
+    driver.get(f"http://{config.hub_ip}/device/list")
+
+
+def with_lock_code(result: ListKeyCodesResult, lock_code: LockCode) -> ListKeyCodesResult:
+    codes = [c for c in result.codes if c.position != lock_code.position]
+    return ListKeyCodesResult(codes=codes + [lock_code])
+
+
+def without_position(result: ListKeyCodesResult, position: int) -> ListKeyCodesResult:
+    return ListKeyCodesResult(codes=[c for c in result.codes if c.position != position])
@@ -0,0 +1,94 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import List
+
+from hubitat_lock_manager.benchmark import percentile
+
+ENTRY_POINTS = ("hubitat_lock_manager.cli", "hubitat_lock_manager.api")
+
+# Only needed once a backend talks to the hub, so importing an entry point must not load them
+DEFERRED_MODULES = ("requests", "selenium", "webdriver_manager")
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "import_seconds": time.perf_counter() - start,
+    "deferred_loaded": sorted(name for name in {deferred!r} if name in sys.modules),
+}}))
+"""
+
+
+@dataclass(frozen=True)
+class StartupStats:
+    module: str
+    import_seconds: List[float]
+    process_seconds: List[float]
+    deferred_loaded: List[str]
+
+
+def format_report(stats: List[StartupStats]) -> str:
+    header = (
+        f"{'module':<28} {'n':>3} {'import p50 ms':>14} {'process p50 ms':>15} "
+        f"{'process max ms':>15}  deferred modules loaded"
+    )
+    lines = [header, "-" * len(header)]
+    for entry in stats:
+        lines.append(
+            f"{entry.module:<28} {len(entry.import_seconds):>3} "
+            f"{percentile(entry.import_seconds, 0.5) * 1000:>14.1f} "
+            f"{percentile(entry.process_seconds, 0.5) * 1000:>15.1f} "
+            f"{percentile(entry.process_seconds, 1.0) * 1000:>15.1f}  "
+            f"{', '.join(entry.deferred_loaded) or '-'}"
+        )
+    return "\n".join(lines)
+
+
+def measure_startup(module: str, runs: int = 5) -> StartupStats:
+    """
+    Import ``module`` in ``runs`` fresh interpreters, as a cold start or a CLI
+    run would, timing the import alone and the whole process.
+    """
+    script = MEASURE_SCRIPT.format(module=module, deferred=DEFERRED_MODULES)
+    import_seconds, process_seconds = [], []
+    deferred_loaded = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        ).stdout
+        process_seconds.append(time.perf_counter() - start)
+
+        result = json.loads(output.strip().splitlines()[-1])
+        import_seconds.append(result["import_seconds"])
+        deferred_loaded.update(result["deferred_loaded"])
+
+    return StartupStats(module, import_seconds, process_seconds, sorted(deferred_loaded))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how long the entry points take to start in a fresh interpreter."
+    )
+    parser.add_argument(
+        "modules", nargs="*", default=list(ENTRY_POINTS), help="Modules to import"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+
+    args = parser.parse_args()
+
+    stats = [measure_startup(module, args.runs) for module in args.modules]
+    if args.json:
+        print(json.dumps([asdict(entry) for entry in stats], indent=2))
+    else:
+        print(format_report(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,26 @@
 import streamlit as st
 import argparse
 import json
-from hubitat_lock_manager.rest_client import CloudRunRestClient
+import os
+from hubitat_lock_manager.rest_client import CloudRunRestClient, PooledHttpTransport
+
+# How long device and key code lists are reused across reruns before refetching
+CACHE_TTL_SECONDS = int(os.getenv("UI_CACHE_TTL_SECONDS", "60"))
+
+SECTIONS = ["Create Key Code", "Delete Key Code", "List Key Codes"]
+
+@st.cache_resource
+def get_client(api_url):
+    """
+    Return a client shared across reruns so its keep-alive connections are reused.
+
+    Args:
+    api_url (str): The base URL of the API.
+
+    Returns:
+    client (CloudRunRestClient): A client using a pooled transport.
+    """
+    return CloudRunRestClient(api_url, transport=PooledHttpTransport())
 
 def create_key_code(client, username, code, device_id):
     """
@@ -48,6 +67,18 @@ def list_devices(client):
     """
     return client.get("list_devices")
 
+def refresh_devices(client):
+    """
+    Ask the API to reload its device list from the hub, bypassing its cache.
+
+    Args:
+    client (CloudRunRestClient): An instance of the CloudRunRestClient.
+
+    Returns:
+    response (str): The response from the API call as a string.
+    """
+    return client.post("refresh_devices", {})
+
 def list_key_codes(client, device_id):
     """
     List all key codes for a specified device.
@@ -62,33 +93,88 @@ def list_key_codes(client, device_id):
     params = {"device_id": device_id}
     return client.get(f"list_key_codes?device_id={device_id}")
 
-def main(api_url):
+def list_all_key_codes(client):
     """
-    Main driver function to render the Streamlit application.
+    List the key codes of every device in one call. The API reads the devices
+    in parallel and reports how old each device's codes are.
 
     Args:
-    api_url (str): The base URL of the API.
+    client (CloudRunRestClient): An instance of the CloudRunRestClient.
+
+    Returns:
+    response (str): The response from the API call as a string.
     """
-    client = CloudRunRestClient(api_url)
+    return client.get("key_codes")
 
-    st.title("Smart Lock Management")
+def parse_response(response):
+    """
+    Decode an API response, raising if it is not JSON or reports an error.
 
-    # List Devices to populate dropdowns
-    devices_response = list_devices(client)
+    Args:
+    response (str): The response from the API call as a string.
 
+    Returns:
+    data (dict): The decoded response.
+    """
     try:
-        devices_data = json.loads(devices_response)
+        data = json.loads(response)
     except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to decode JSON response. Response body: {devices_response}") from e
+        raise ValueError(f"Failed to decode JSON response. Response body: {response}") from e
 
-    if not devices_data or "error" in devices_data:
-        st.error(f"Error fetching devices: {devices_data.get('error')}")
-        return
+    if not data or "error" in data:
+        raise ValueError(data.get("error") if data else "Empty response")
+    return data
 
-    devices = devices_data["devices"]
-    device_options = {device["name"]: device["id"] for device in devices}
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner="Loading devices...")
+def fetch_devices(api_url):
+    """
+    Fetch the device list, reusing the last result for up to CACHE_TTL_SECONDS.
+    Errors are raised rather than returned so they are never cached.
+
+    Args:
+    api_url (str): The base URL of the API.
 
-    # Create Key Code Section
+    Returns:
+    devices (list): The devices reported by the API.
+    """
+    return parse_response(list_devices(get_client(api_url)))["devices"]
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner="Loading key codes...")
+def fetch_key_codes(api_url, device_id):
+    """
+    Fetch the key codes of one device, reusing the last result for up to CACHE_TTL_SECONDS.
+
+    Args:
+    api_url (str): The base URL of the API.
+    device_id (int): The device ID for which to list key codes.
+
+    Returns:
+    key_codes (dict): The decoded key code listing.
+    """
+    return parse_response(list_key_codes(get_client(api_url), device_id))
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner="Loading key codes...")
+def fetch_all_key_codes(api_url):
+    """
+    Fetch the key codes of every device with a single request. A device that
+    fails is reported with an error entry instead of failing the whole listing.
+
+    Args:
+    api_url (str): The base URL of the API.
+
+    Returns:
+    devices (list): One entry per device with its name, codes, age_seconds or error.
+    """
+    return parse_response(list_all_key_codes(get_client(api_url)))["devices"]
+
+def invalidate_key_codes():
+    """
+    Drop cached key code listings after a successful write.
+    """
+    fetch_key_codes.clear()
+    fetch_all_key_codes.clear()
+
+def render_create_section(client, device_options):
     st.header("Create Key Code")
     with st.form("create_key_code_form"):
         username = st.text_input("Username", help="Enter the username for the key code.")
@@ -104,13 +190,12 @@ def main(api_url):
             response = create_key_code(client, username, code, device_id)
             response_data = json.loads(response)
             if "error" not in response_data:
+                invalidate_key_codes()
                 st.success("Key code created successfully!")
             else:
                 st.error(f"Error: {response}")
 
-    st.markdown("---")
-
-    # Delete Key Code Section
+def render_delete_section(client, device_options):
     st.header("Delete Key Code")
     with st.form("delete_key_code_form"):
         username_delete = st.text_input(
@@ -128,29 +213,77 @@ def main(api_url):
             response = delete_key_code(client, username_delete, device_id_delete)
             response_data = json.loads(response)
             if "error" not in response_data:
+                invalidate_key_codes()
                 st.success("Key code deleted successfully!")
             else:
                 st.error(f"Error: {response}")
 
-    st.markdown("---")
-
-    # List Key Codes Section
+def render_list_section(api_url, device_options):
     st.header("List Key Codes")
     with st.form("list_key_codes_form"):
         device_name_list = st.selectbox(
             "Select Device to list key codes from",
-            options=list(device_options.keys()),
+            options=["All Devices"] + list(device_options.keys()),
             help="Select the device to list all key codes from.",
         )
         list_key_codes_button = st.form_submit_button("List Key Codes")
-        if list_key_codes_button:
-            selected_device_id = device_options[device_name_list]
-            response = list_key_codes(client, selected_device_id)
-            response_data = json.loads(response)
-            if "error" not in response_data:
-                st.json(response_data)
-            else:
-                st.error(f"Error: {response}")
+        if list_key_codes_button and device_name_list == "All Devices":
+            try:
+                listings = fetch_all_key_codes(api_url)
+            except ValueError as e:
+                st.error(f"Error: {e}")
+                listings = []
+            for device in listings:
+                st.subheader(device["name"])
+                if device["error"] is None:
+                    st.caption(f"Codes read {device['age_seconds']:.0f}s ago")
+                    st.json({"codes": device["codes"]})
+                else:
+                    st.error(f"Error: {device['error']}")
+        elif list_key_codes_button:
+            try:
+                st.json(fetch_key_codes(api_url, device_options[device_name_list]))
+            except ValueError as e:
+                st.error(f"Error: {e}")
+
+def main(api_url):
+    """
+    Main driver function to render the Streamlit application.
+
+    Only the section chosen in the sidebar is rendered, so each rerun fetches
+    just the data that section needs, and fetched lists are served from cache.
+
+    Args:
+    api_url (str): The base URL of the API.
+    """
+    client = get_client(api_url)
+
+    st.title("Smart Lock Management")
+
+    section = st.sidebar.radio("Section", SECTIONS)
+    if st.sidebar.button("Refresh", help="Reload devices and key codes from the hub."):
+        try:
+            refresh_devices(client)
+        except Exception as e:
+            st.sidebar.warning(f"Hub refresh failed, showing cached data: {e}")
+        fetch_devices.clear()
+        invalidate_key_codes()
+
+    # List Devices to populate dropdowns
+    try:
+        devices = fetch_devices(api_url)
+    except ValueError as e:
+        st.error(f"Error fetching devices: {e}")
+        return
+
+    device_options = {device["name"]: device["id"] for device in devices}
+
+    if section == "Create Key Code":
+        render_create_section(client, device_options)
+    elif section == "Delete Key Code":
+        render_delete_section(client, device_options)
+    else:
+        render_list_section(api_url, device_options)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the Smart Lock Management Streamlit app.")
@@ -0,0 +1,124 @@
+import time
+import unittest
+from unittest import TestCase
+from unittest.mock import patch
+
+from hubitat_lock_manager import api, controller, smart_lock
+
+
+class FakeController:
+    def __init__(self):
+        self.calls = []
+
+    def apply_bulk_operations_as_completed(self, operations, max_concurrency=None):
+        self.calls.append(("bulk", len(operations), max_concurrency))
+        for index, operation in enumerate(operations):
+            yield controller.create_bulk_result(
+                index, operation, result=smart_lock.SetCodeResult(index + 1)
+            )
+
+    def delete_key_code(self, username, device_id):
+        self.calls.append(("delete", username, device_id))
+        return smart_lock.DeleteKeyCodeResult(success=True, message="Key code deleted")
+
+    def delete_key_code_on_all_devices_concurrently(self, username, concurrency=None):
+        self.calls.append(("delete_all", username, concurrency))
+        return []
+
+
+class TestDeleteKeyCode(TestCase):
+    def setUp(self):
+        # Arrange
+        self.controller = FakeController()
+        patcher = patch.object(api, "smart_lock_controller", self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = api.app.test_client()
+
+    def test_deletes_from_one_device(self):
+        # Act
+        response = self.client.delete(
+            "/delete_key_code", json={"username": "bob", "device_id": 1}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.controller.calls, [("delete", "bob", 1)])
+
+    def test_missing_device_id_is_rejected(self):
+        # Act
+        response = self.client.delete("/delete_key_code", json={"username": "bob"})
+        async_response = self.client.delete(
+            "/delete_key_code", json={"username": "bob", "async": True}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(async_response.status_code, 400)
+        self.assertEqual(self.controller.calls, [])
+
+    def test_all_devices_opt_in_deletes_everywhere(self):
+        # Act
+        all_devices = self.client.delete(
+            "/delete_key_code", json={"username": "bob", "all_devices": True}
+        )
+        concurrency = self.client.delete(
+            "/delete_key_code", json={"username": "bob", "concurrency": 2}
+        )
+
+        # Assert
+        self.assertEqual(all_devices.status_code, 200)
+        self.assertEqual(concurrency.status_code, 200)
+        self.assertEqual(
+            self.controller.calls, [("delete_all", "bob", None), ("delete_all", "bob", 2)]
+        )
+
+
+class TestBulkKeyCodesJob(TestCase):
+    def setUp(self):
+        # Arrange
+        self.controller = FakeController()
+        patcher = patch.object(api, "smart_lock_controller", self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = api.app.test_client()
+
+    def wait_for_job(self, status_url: str) -> dict:
+        for _ in range(100):
+            job = self.client.get(status_url).get_json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail(f"Job {status_url} did not finish")
+
+    def test_async_bulk_returns_job_to_poll(self):
+        # Arrange
+        operations = [
+            {"action": "create", "username": "bob", "device_id": 1, "code": "12345678"},
+            {"action": "create", "username": "bob", "device_id": 2, "code": "12345678"},
+        ]
+
+        # Act
+        response = self.client.post(
+            "/bulk_key_codes", json={"operations": operations, "async": True, "concurrency": 2}
+        )
+        job = self.wait_for_job(response.headers["Location"])
+
+        # Assert
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()["status_url"], response.headers["Location"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["completed"], 2)
+        self.assertEqual([result["device_id"] for result in job["results"]], [1, 2])
+        self.assertEqual(self.controller.calls, [("bulk", 2, 2)])
+
+    def test_unknown_job(self):
+        # Act
+        response = self.client.get("/jobs/missing")
+
+        # Assert
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
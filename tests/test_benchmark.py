@@ -0,0 +1,63 @@
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import benchmark
+from hubitat_lock_manager.fake_hub import FakeHub
+
+
+class TestPercentile(TestCase):
+    def test_nearest_rank(self):
+        # Arrange
+        samples = [0.4, 0.1, 0.3, 0.2]
+
+        # Act / Assert
+        self.assertEqual(benchmark.percentile(samples, 0.5), 0.2)
+        self.assertEqual(benchmark.percentile(samples, 0.9), 0.4)
+        self.assertEqual(benchmark.percentile(samples, 0.0), 0.1)
+        self.assertEqual(benchmark.percentile([], 0.5), 0.0)
+
+
+class TestRunBenchmark(TestCase):
+    def test_maker_api_backend(self):
+        # Arrange
+        with FakeHub(devices={1: "Benchmark Lock"}) as hub:
+            backend = benchmark.create_maker_api_backend(hub)
+
+            # Act
+            stats = benchmark.run_benchmark(hub, backend, 1, iterations=2)
+            backend.smart_lock_config.close()
+
+        # Assert
+        by_operation = {entry.operation: entry for entry in stats}
+        self.assertEqual(set(by_operation), set(benchmark.OPERATIONS))
+        for entry in stats:
+            self.assertEqual(entry.count, 2)
+            self.assertEqual(entry.page_loads, 0)
+            self.assertEqual(entry.browser_launches, 0)
+        list_key_codes = by_operation["list_key_codes"]
+        self.assertEqual(list_key_codes.per_operation(list_key_codes.api_requests), 1)
+        self.assertGreater(by_operation["create_key_code"].api_requests, 0)
+        self.assertEqual(hub.codes[1], {})
+
+        report = benchmark.format_report(stats)
+        self.assertIn("create_key_code", report)
+        self.assertIn("maker_api", report)
+
+    def test_unconfirmed_writes_land_before_next_operation(self):
+        # Arrange
+        with FakeHub(devices={1: "Benchmark Lock"}, zwave_latency_seconds=0.05) as hub:
+            backend = benchmark.create_maker_api_backend(hub)
+
+            # Act
+            stats = benchmark.run_benchmark(hub, backend, 1, iterations=2)
+            backend.smart_lock_config.close()
+
+        # Assert
+        by_operation = {entry.operation: entry for entry in stats}
+        delete_key_code = by_operation["delete_key_code"]
+        self.assertEqual(delete_key_code.per_operation(delete_key_code.api_requests), 2)
+        self.assertEqual(hub.codes[1], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
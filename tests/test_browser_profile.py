@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from unittest.mock import Mock
+
+from selenium import webdriver
+
+from hubitat_lock_manager import browser_profile
+
+
+class TestApplyBrowserProfile(TestCase):
+    def test_default_profile_keeps_full_page_loads(self):
+        # Arrange
+        options = webdriver.ChromeOptions()
+        profile = browser_profile.get_browser_profile(browser_profile.DEFAULT_PROFILE)
+
+        # Act
+        browser_profile.apply_browser_profile(options, profile)
+
+        # Assert
+        self.assertEqual(options.page_load_strategy, "normal")
+        self.assertEqual(options.arguments, ["start-maximized"])
+        self.assertEqual(options.experimental_options, {})
+
+    def test_lean_profile(self):
+        # Arrange
+        options = webdriver.ChromeOptions()
+        profile = browser_profile.get_browser_profile(browser_profile.LEAN_PROFILE)
+
+        # Act
+        browser_profile.apply_browser_profile(options, profile, "/profiles/profile-0")
+
+        # Assert
+        self.assertEqual(options.page_load_strategy, "eager")
+        self.assertIn("--window-size=800,600", options.arguments)
+        self.assertIn("--user-data-dir=/profiles/profile-0", options.arguments)
+        self.assertIn("--renderer-process-limit=2", options.arguments)
+        self.assertNotIn("start-maximized", options.arguments)
+        self.assertEqual(
+            options.experimental_options["prefs"],
+            {"profile.managed_default_content_settings.images": 2},
+        )
+
+    def test_unknown_profile(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            browser_profile.get_browser_profile("fast")
+
+
+class TestBlockUrls(TestCase):
+    def test_blocks_patterns_over_devtools(self):
+        # Arrange
+        driver = Mock()
+        profile = browser_profile.BrowserProfile("test", blocked_url_patterns=("*.woff2",))
+
+        # Act
+        browser_profile.block_urls(driver, profile)
+
+        # Assert
+        driver.execute_cdp_cmd.assert_called_with("Network.setBlockedURLs", {"urls": ["*.woff2"]})
+
+    def test_blocks_patterns_on_remote_chrome(self):
+        # Arrange
+        driver = Mock(spec=["execute", "quit"])
+        profile = browser_profile.BrowserProfile("test", blocked_url_patterns=("*.png",))
+
+        # Act
+        browser_profile.block_urls(driver, profile)
+
+        # Assert
+        driver.execute.assert_called_with(
+            "executeCdpCommand",
+            {"cmd": "Network.setBlockedURLs", "params": {"urls": ["*.png"]}},
+        )
+
+    def test_logs_when_remote_does_not_support_devtools(self):
+        # Arrange
+        driver = Mock(spec=["execute", "quit"])
+        driver.execute.side_effect = Exception("unknown command")
+        profile = browser_profile.BrowserProfile("test", blocked_url_patterns=("*.png",))
+
+        # Act / Assert
+        with self.assertLogs(level="ERROR"):
+            browser_profile.block_urls(driver, profile)
+
+
+class TestProfileDirectories(TestCase):
+    def setUp(self):
+        # Arrange
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.sut = browser_profile.ProfileDirectories(self.root.name)
+
+    def test_concurrent_browsers_get_their_own_directory(self):
+        # Act
+        first = self.sut.acquire()
+        second = self.sut.acquire()
+
+        # Assert
+        self.assertNotEqual(first[1], second[1])
+        self.assertTrue(os.path.isdir(first[1]))
+        self.assertTrue(os.path.isdir(second[1]))
+
+    def test_released_directory_is_reused(self):
+        # Arrange
+        driver = Mock()
+        slot, directory = self.sut.acquire()
+        self.sut.bind(driver, slot)
+        self.sut.acquire()
+
+        # Act
+        self.sut.release_driver(driver)
+        _, reused = self.sut.acquire()
+
+        # Assert
+        self.assertEqual(reused, directory)
+
+    def test_slot_held_by_another_process_is_skipped(self):
+        # Arrange
+        other_process = browser_profile.ProfileDirectories(self.root.name)
+        _, taken = other_process.acquire()
+
+        # Act
+        _, directory = self.sut.acquire()
+
+        # Assert
+        self.assertNotEqual(directory, taken)
+
+    def test_root_others_can_write_is_not_used(self):
+        # Arrange
+        os.chmod(self.root.name, 0o777)
+
+        # Act
+        with self.assertLogs(level="ERROR"):
+            result = self.sut.acquire()
+
+        # Assert
+        self.assertEqual(result, (None, None))
+        self.assertEqual(os.listdir(self.root.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
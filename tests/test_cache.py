@@ -0,0 +1,89 @@
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager.cache import TtlLruCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTtlLruCache(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.sut = TtlLruCache(ttl_seconds=10, max_size=2, clock=self.clock)
+
+    def test_get_returns_fresh_value(self):
+        # Arrange
+        self.sut.put(1, "codes")
+
+        # Act
+        result = self.sut.get(1)
+
+        # Assert
+        self.assertEqual(result, "codes")
+
+    def test_get_expires_after_ttl(self):
+        # Arrange
+        self.sut.put(1, "codes")
+        self.clock.now = 10
+
+        # Act
+        result = self.sut.get(1)
+
+        # Assert
+        self.assertIsNone(result)
+        self.assertEqual(len(self.sut), 0)
+
+    def test_evicts_least_recently_used(self):
+        # Arrange
+        self.sut.put(1, "one")
+        self.sut.put(2, "two")
+        self.sut.get(1)
+
+        # Act
+        self.sut.put(3, "three")
+
+        # Assert
+        self.assertEqual(self.sut.get(1), "one")
+        self.assertIsNone(self.sut.get(2))
+        self.assertEqual(self.sut.get(3), "three")
+
+    def test_update_keeps_original_age(self):
+        # Arrange
+        self.sut.put(1, 1)
+        self.clock.now = 6
+
+        # Act
+        self.sut.update(1, lambda value: value + 1)
+
+        # Assert
+        entry = self.sut.get_entry(1)
+        self.assertEqual(entry.value, 2)
+        self.assertEqual(self.sut.age(entry), 6)
+
+    def test_update_ignores_missing_entry(self):
+        # Act
+        self.sut.update(1, lambda value: value + 1)
+
+        # Assert
+        self.assertIsNone(self.sut.get(1))
+
+    def test_invalidate(self):
+        # Arrange
+        self.sut.put(1, "codes")
+
+        # Act
+        self.sut.invalidate(1)
+
+        # Assert
+        self.assertIsNone(self.sut.get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import TestCase
+from unittest.mock import patch
+
+from hubitat_lock_manager import chromedriver
+
+
+class TestResolveChromedriverPath(TestCase):
+    def setUp(self):
+        # Arrange
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.directory.name, "chromedriver_path")
+        self.driver_path = self.create_executable("chromedriver")
+        patchers = [
+            patch.object(chromedriver, "PATH_CACHE_FILE", self.cache_file),
+            patch.object(chromedriver, "_resolved_path", None),
+            patch.dict(os.environ, {}, clear=False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop("CHROMEDRIVER_PATH", None)
+        self.addCleanup(self.directory.cleanup)
+
+    def create_executable(self, name: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            f.write("")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_installs_once_per_process(self, mock_install):
+        # Arrange
+        mock_install.return_value = self.driver_path
+
+        # Act
+        paths = [chromedriver.resolve_chromedriver_path() for _ in range(3)]
+
+        # Assert
+        self.assertEqual(paths, [self.driver_path] * 3)
+        mock_install.assert_called_once()
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_uses_path_cached_by_earlier_process(self, mock_install):
+        # Arrange
+        chromedriver.write_cached_path(self.cache_file, self.driver_path)
+
+        # Act
+        path = chromedriver.resolve_chromedriver_path()
+
+        # Assert
+        self.assertEqual(path, self.driver_path)
+        mock_install.assert_not_called()
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_reinstalls_when_cached_driver_is_gone(self, mock_install):
+        # Arrange
+        chromedriver.write_cached_path(self.cache_file, os.path.join(self.directory.name, "gone"))
+        mock_install.return_value = self.driver_path
+
+        # Act
+        path = chromedriver.resolve_chromedriver_path()
+
+        # Assert
+        self.assertEqual(path, self.driver_path)
+        mock_install.assert_called_once()
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_ignores_cache_others_can_write(self, mock_install):
+        # Arrange
+        planted_path = self.create_executable("planted")
+        chromedriver.write_cached_path(self.cache_file, planted_path)
+        os.chmod(self.cache_file, 0o666)
+        mock_install.return_value = self.driver_path
+
+        # Act
+        path = chromedriver.resolve_chromedriver_path()
+
+        # Assert
+        self.assertEqual(path, self.driver_path)
+
+    def test_ignores_cached_path_that_is_not_a_file(self):
+        # Arrange
+        chromedriver.write_cached_path(self.cache_file, self.directory.name)
+
+        # Act
+        path = chromedriver.read_cached_path(self.cache_file)
+
+        # Assert
+        self.assertIsNone(path)
+
+    def test_failed_write_is_logged(self):
+        # Arrange
+        blocker = os.path.join(self.directory.name, "blocker")
+        with open(blocker, "w") as f:
+            f.write("")
+
+        # Act
+        with self.assertLogs(level="ERROR"):
+            chromedriver.write_cached_path(os.path.join(blocker, "path"), self.driver_path)
+
+        # Assert
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["blocker", "chromedriver"])
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_environment_overrides_cache(self, mock_install):
+        # Arrange
+        chromedriver.write_cached_path(self.cache_file, self.driver_path)
+        os.environ["CHROMEDRIVER_PATH"] = "/opt/chromedriver"
+
+        # Act
+        path = chromedriver.resolve_chromedriver_path()
+
+        # Assert
+        self.assertEqual(path, "/opt/chromedriver")
+        mock_install.assert_not_called()
+
+    @patch.object(chromedriver, "install_chromedriver")
+    def test_forget_resolves_again(self, mock_install):
+        # Arrange
+        upgraded_path = self.create_executable("chromedriver-upgraded")
+        mock_install.side_effect = [self.driver_path, upgraded_path]
+        chromedriver.resolve_chromedriver_path()
+        chromedriver.write_cached_path(self.cache_file, self.driver_path)
+
+        # Act
+        chromedriver.forget_chromedriver_path()
+        path = chromedriver.resolve_chromedriver_path()
+
+        # Assert
+        self.assertEqual(path, upgraded_path)
+        self.assertFalse(os.path.exists(self.cache_file))
+        self.assertEqual(mock_install.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from hubitat_lock_manager import cli, smart_lock
+
+
+class FakeController:
+    def __init__(self):
+        self.calls = []
+
+    def delete_key_code(self, username, device_id):
+        self.calls.append(("delete", username, device_id))
+        return smart_lock.DeleteKeyCodeResult(success=True, message="Key code deleted")
+
+    def delete_key_code_on_all_devices_concurrently(self, username):
+        self.calls.append(("delete_all", username))
+        return []
+
+    def list_devices(self):
+        self.calls.append(("list_devices",))
+        return smart_lock.ListDevicesResult(devices=[smart_lock.Device(id=1, name="Front Door")])
+
+    def update_key_code(self, device_id, username, code):
+        raise ValueError("Code must be 8 digits and numeric")
+
+
+class TestBatchMode(TestCase):
+    def setUp(self):
+        # Arrange
+        self.controller = FakeController()
+
+    def test_runs_every_command_on_one_controller(self):
+        # Arrange
+        lines = [
+            "# nightly cleanup",
+            "list_devices",
+            "",
+            "delete --username 'bob smith' --device-id 1",
+        ]
+        output = io.StringIO()
+
+        # Act
+        with redirect_stdout(output):
+            failures = cli.run_batch(self.controller, lines)
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.assertEqual(
+            self.controller.calls, [("list_devices",), ("delete", "bob smith", 1)]
+        )
+        self.assertEqual(output.getvalue().count("s)\n"), 2)
+
+    def test_delete_without_device_id_needs_all_devices(self):
+        # Arrange
+        lines = ["delete --username bob", "create --username bob --code 12345678"]
+
+        # Act
+        with redirect_stdout(io.StringIO()) as output:
+            failures = cli.run_batch(self.controller, lines)
+
+        # Assert
+        self.assertEqual(failures, 2)
+        self.assertEqual(self.controller.calls, [])
+        self.assertIn("pass --all-devices", output.getvalue())
+
+    def test_delete_on_all_devices(self):
+        # Arrange
+        lines = ["delete --username bob --all-devices"]
+
+        # Act
+        with redirect_stdout(io.StringIO()):
+            failures = cli.run_batch(self.controller, lines)
+
+        # Assert
+        self.assertEqual(failures, 0)
+        self.assertEqual(self.controller.calls, [("delete_all", "bob")])
+
+    def test_failed_commands_do_not_stop_the_batch(self):
+        # Arrange
+        lines = ["frobnicate", "update --username bob --code 1 --device-id 1", "list_devices"]
+
+        # Act
+        with redirect_stdout(io.StringIO()) as output:
+            failures = cli.run_batch(self.controller, lines)
+
+        # Assert
+        self.assertEqual(failures, 2)
+        self.assertEqual(self.controller.calls, [("list_devices",)])
+        self.assertIn("Error: Code must be 8 digits and numeric", output.getvalue())
+
+
+class TestShellMode(TestCase):
+    def test_reads_commands_until_exit(self):
+        # Arrange
+        controller = FakeController()
+        commands = io.StringIO("list_devices\n\nlist_devices\nexit\nlist_devices\n")
+        sut = cli.LockManagerShell(controller, stdin=commands, stdout=io.StringIO())
+        sut.use_rawinput = False
+
+        # Act
+        with redirect_stdout(io.StringIO()):
+            sut.cmdloop(intro="")
+
+        # Assert
+        self.assertEqual(controller.calls, [("list_devices",), ("list_devices",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import smart_lock
+from hubitat_lock_manager.code_index import KeyCodeIndex, KeyCodeLocation
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestKeyCodeIndex(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.sut = KeyCodeIndex(max_age_seconds=30, clock=self.clock)
+        self.sut.index_device(
+            1,
+            smart_lock.ListKeyCodesResult(
+                codes=[
+                    smart_lock.LockCode("11111111", "user1", 250),
+                    smart_lock.LockCode("22222222", "user2", 249),
+                ]
+            ),
+        )
+        self.sut.index_device(
+            2, smart_lock.ListKeyCodesResult(codes=[smart_lock.LockCode("11111111", "user1", 250)])
+        )
+
+    def test_find_user_across_devices(self):
+        # Act
+        result = self.sut.find_user("user1")
+
+        # Assert
+        self.assertEqual(
+            result, [KeyCodeLocation(1, 250, "user1"), KeyCodeLocation(2, 250, "user1")]
+        )
+
+    def test_find_code_reports_collisions(self):
+        # Act
+        result = self.sut.find_code("22222222")
+
+        # Assert
+        self.assertEqual(result, [KeyCodeLocation(1, 249, "user2")])
+        self.assertEqual(self.sut.find_code("33333333"), [])
+
+    def test_set_code_moves_user_and_replaces_position(self):
+        # Act
+        self.sut.set_code(1, smart_lock.LockCode("33333333", "user1", 249))
+
+        # Assert
+        self.assertEqual(self.sut.find_user("user1")[0], KeyCodeLocation(1, 249, "user1"))
+        self.assertEqual(self.sut.find_user("user2"), [])
+        self.assertEqual(self.sut.find_code("11111111"), [KeyCodeLocation(2, 250, "user1")])
+
+    def test_remove_user_only_affects_one_device(self):
+        # Act
+        self.sut.remove_user(1, "user1")
+
+        # Assert
+        self.assertEqual(self.sut.find_user("user1"), [KeyCodeLocation(2, 250, "user1")])
+        self.assertIsNone(self.sut.get_device_code(1, "user1"))
+
+    def test_duplicated_username_resolves_to_lowest_position(self):
+        # Arrange
+        self.sut.index_device(
+            3,
+            smart_lock.ListKeyCodesResult(
+                codes=[
+                    smart_lock.LockCode("11111111", "user1", 250),
+                    smart_lock.LockCode("33333333", "user1", 247),
+                    smart_lock.LockCode("44444444", "user1", 248),
+                ]
+            ),
+        )
+
+        # Act
+        results = [self.sut.get_device_code(3, "user1") for _ in range(5)]
+
+        # Assert
+        self.assertEqual(results, [smart_lock.LockCode("33333333", "user1", 247)] * 5)
+
+    def test_devices_become_stale(self):
+        # Arrange
+        self.clock.now = 10
+        self.sut.invalidate(2)
+
+        # Act / Assert
+        self.assertFalse(self.sut.is_stale(1))
+        self.assertTrue(self.sut.is_stale(2))
+        self.assertTrue(self.sut.is_stale(3))
+        self.clock.now = 30
+        self.assertTrue(self.sut.is_stale(1))
+
+    def test_retain_devices_forgets_removed_devices(self):
+        # Act
+        self.sut.retain_devices([2])
+
+        # Assert
+        self.assertEqual(self.sut.find_user("user2"), [])
+        self.assertTrue(self.sut.is_stale(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import smart_lock
+from hubitat_lock_manager.command_queue import DeviceCommandQueue, coalesce_operations
+
+CREATE = smart_lock.CREATE_ACTION
+DELETE = smart_lock.DELETE_ACTION
+UPDATE = smart_lock.UPDATE_ACTION
+
+
+class RecordingApplier:
+    def __init__(self):
+        self.batches = []
+        self.active = {}
+        self.peak = {}
+        self.release = threading.Event()
+        self.release.set()
+        self.lock = threading.Lock()
+
+    def __call__(self, device_id, operations):
+        with self.lock:
+            self.batches.append((device_id, list(operations)))
+            self.active[device_id] = self.active.get(device_id, 0) + 1
+            self.peak[device_id] = max(self.peak.get(device_id, 0), self.active[device_id])
+        self.release.wait(5)
+        with self.lock:
+            self.active[device_id] -= 1
+
+        results = []
+        for operation in operations:
+            if operation.action == DELETE:
+                result = smart_lock.DeleteKeyCodeResult(True, "Key code deleted")
+            else:
+                result = smart_lock.CreateKeyCodeResult(position=250, timestamp=0)
+            results.append(smart_lock.KeyCodeOperationResult(operation, result=result))
+        return results
+
+
+class InMemoryLock:
+    def __init__(self, codes):
+        self.codes = dict(codes)
+        self.deleted_positions = []
+        self.smart_lock = smart_lock.create_generic_z_wave_lock(
+            1,
+            smart_lock.PositionDeleter(self.delete_position),
+            smart_lock.CodeLister(self.list_codes),
+            smart_lock.CodeSetter(self.get_next_position, self.set_code),
+        )
+
+    def delete_position(self, params: smart_lock.DeletePositionParams) -> None:
+        self.deleted_positions.append(params.position)
+        self.codes.pop(params.position, None)
+
+    def get_next_position(self) -> int:
+        return next(p for p in range(250, 0, -1) if p not in self.codes)
+
+    def list_codes(self, device_id: int) -> smart_lock.ListKeyCodesResult:
+        return smart_lock.ListKeyCodesResult(
+            codes=[
+                smart_lock.LockCode(code, name, position)
+                for position, (name, code) in self.codes.items()
+            ]
+        )
+
+    def set_code(self, params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+        position = params.position or self.get_next_position()
+        self.codes[position] = (params.name, params.code)
+        return smart_lock.SetCodeResult(position)
+
+
+class TestDeviceCommandQueue(TestCase):
+    def setUp(self):
+        # Arrange
+        self.applier = RecordingApplier()
+        self.sut = DeviceCommandQueue(self.applier, max_workers=4)
+
+    def tearDown(self):
+        self.applier.release.set()
+        self.sut.close()
+
+    def test_writes_to_one_device_are_serialized(self):
+        # Arrange
+        threads = [
+            threading.Thread(
+                target=self.sut.run,
+                args=(device_id, smart_lock.KeyCodeOperation(CREATE, f"user{i}", "12345678")),
+            )
+            for i in range(8)
+            for device_id in (1, 2)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(self.applier.peak, {1: 1, 2: 1})
+        applied = sum(len(operations) for _, operations in self.applier.batches)
+        self.assertEqual(applied, 16)
+
+    def test_queued_operations_run_in_one_visit(self):
+        # Arrange
+        self.applier.release.clear()
+        first = self.sut.submit(1, [smart_lock.KeyCodeOperation(CREATE, "user0", "10000000")])
+        queued = [
+            self.sut.submit(1, [smart_lock.KeyCodeOperation(CREATE, f"user{i}", f"1000000{i}")])
+            for i in range(1, 4)
+        ]
+
+        # Act
+        self.applier.release.set()
+        for (future,) in [first] + queued:
+            future.result(5)
+
+        # Assert
+        self.assertEqual([len(operations) for _, operations in self.applier.batches], [1, 3])
+
+    def test_delete_then_create_run_separately(self):
+        # Arrange
+        self.applier.release.clear()
+        self.sut.submit(1, [smart_lock.KeyCodeOperation(CREATE, "other", "99999999")])
+        delete, create = self.sut.submit(
+            1,
+            [
+                smart_lock.KeyCodeOperation(DELETE, "user1"),
+                smart_lock.KeyCodeOperation(CREATE, "user1", "12345678"),
+            ],
+        )
+
+        # Act
+        self.applier.release.set()
+        delete_result = delete.result(5)
+        create_result = create.result(5)
+
+        # Assert
+        self.assertEqual(
+            self.applier.batches[-1][1],
+            [
+                smart_lock.KeyCodeOperation(DELETE, "user1"),
+                smart_lock.KeyCodeOperation(CREATE, "user1", "12345678"),
+            ],
+        )
+        self.assertEqual(delete_result.result.message, "Key code deleted")
+        self.assertEqual(create_result.result.position, 250)
+
+    def test_failed_replacement_still_deletes_old_code(self):
+        # Arrange
+        lock = InMemoryLock({250: ("alice", "11111111"), 249: ("bob", "22222222")})
+        sut = DeviceCommandQueue(
+            lambda device_id, operations: lock.smart_lock.apply_key_code_operations(operations)
+        )
+        self.addCleanup(sut.close)
+
+        # Act
+        delete, create = sut.submit(
+            1,
+            [
+                smart_lock.KeyCodeOperation(DELETE, "alice"),
+                smart_lock.KeyCodeOperation(CREATE, "alice", "22222222"),
+            ],
+        )
+        delete_result = delete.result(5)
+        create_result = create.result(5)
+
+        # Assert
+        self.assertTrue(delete_result.success)
+        self.assertFalse(create_result.success)
+        self.assertEqual(create_result.error, "Code 22222222 already exists")
+        self.assertEqual(lock.deleted_positions, [250])
+        self.assertEqual(lock.codes, {249: ("bob", "22222222")})
+
+    def test_run_raises_operation_error(self):
+        # Arrange
+        def apply(device_id, operations):
+            error = ValueError("Code 12345678 already exists")
+            return [
+                smart_lock.KeyCodeOperationResult(
+                    operation, error=str(error), error_type="ValueError", exception=error
+                )
+                for operation in operations
+            ]
+
+        sut = DeviceCommandQueue(apply)
+
+        # Act / Assert
+        with self.assertRaisesRegex(ValueError, "already exists"):
+            sut.run(1, smart_lock.KeyCodeOperation(CREATE, "user1", "12345678"))
+        sut.close()
+
+    def test_failed_visit_fails_whole_batch(self):
+        # Arrange
+        def apply(device_id, operations):
+            raise RuntimeError("Lock 1 is offline")
+
+        sut = DeviceCommandQueue(apply)
+
+        # Act
+        futures = sut.submit(
+            1,
+            [
+                smart_lock.KeyCodeOperation(DELETE, "user1"),
+                smart_lock.KeyCodeOperation(DELETE, "user2"),
+            ],
+        )
+
+        # Assert
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "offline"):
+                future.result(5)
+        sut.close()
+
+
+class TestCoalesceOperations(TestCase):
+    def test_merges_adjacent_operations_on_same_user(self):
+        # Arrange
+        operations = [
+            smart_lock.KeyCodeOperation(UPDATE, "user1", "11111111"),
+            smart_lock.KeyCodeOperation(UPDATE, "user1", "22222222"),
+            smart_lock.KeyCodeOperation(DELETE, "user2"),
+            smart_lock.KeyCodeOperation(DELETE, "user2"),
+            smart_lock.KeyCodeOperation(CREATE, "user3", "33333333"),
+            smart_lock.KeyCodeOperation(DELETE, "user3"),
+        ]
+
+        # Act
+        result = coalesce_operations(operations)
+
+        # Assert
+        self.assertEqual(
+            result,
+            [
+                (smart_lock.KeyCodeOperation(UPDATE, "user1", "22222222"), [0, 1]),
+                (smart_lock.KeyCodeOperation(DELETE, "user2"), [2, 3]),
+                (smart_lock.KeyCodeOperation(CREATE, "user3", "33333333"), [4]),
+                (smart_lock.KeyCodeOperation(DELETE, "user3"), [5]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
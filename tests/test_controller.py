@@ -0,0 +1,288 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import controller, metrics, smart_lock
+
+
+class FakeSmartLockProvider:
+    def __init__(self, device_ids, failing_device_ids=()):
+        self.devices = [smart_lock.Device(id=i, name=f"Lock {i}") for i in device_ids]
+        self.failing_device_ids = set(failing_device_ids)
+        self.codes = {device_id: [] for device_id in device_ids}
+        self.reads = {device_id: 0 for device_id in device_ids}
+        self.lock = threading.Lock()
+        # Writes to slow devices wait until release is set
+        self.slow_device_ids = set()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_smart_lock(self, device_id: int) -> smart_lock.SmartLock:
+        def list_codes(_device_id):
+            with self.lock:
+                self.reads[device_id] += 1
+                return smart_lock.ListKeyCodesResult(codes=list(self.codes[device_id]))
+
+        def set_code(params):
+            if device_id in self.slow_device_ids:
+                self.release.wait(5)
+            if device_id in self.failing_device_ids:
+                raise RuntimeError(f"Lock {device_id} is offline")
+
+            with self.lock:
+                codes = self.codes[device_id]
+                position = params.position or len(codes) + 1
+                codes[:] = [c for c in codes if c.position != position]
+                codes.append(smart_lock.LockCode(params.code, params.name, position))
+            return smart_lock.SetCodeResult(position)
+
+        def delete_position(params):
+            with self.lock:
+                self.codes[device_id] = [
+                    c for c in self.codes[device_id] if c.position != params.position
+                ]
+
+        return smart_lock.create_generic_z_wave_lock(
+            device_id,
+            smart_lock.PositionDeleter(delete_position),
+            smart_lock.CodeLister(list_codes),
+            smart_lock.CodeSetter(lambda: 1, set_code),
+        )
+
+    def list_smart_locks(self) -> smart_lock.ListDevicesResult:
+        return smart_lock.ListDevicesResult(devices=self.devices)
+
+
+def total_lock_operation_errors() -> float:
+    samples = [line for line in metrics.LOCK_OPERATION_ERRORS.render() if not line.startswith("#")]
+    return sum(float(line.rsplit(" ", 1)[1]) for line in samples)
+
+
+class TestSmartLockController(TestCase):
+    def setUp(self):
+        # Arrange
+        self.provider = FakeSmartLockProvider([1, 2, 3], failing_device_ids=[2])
+        self.sut = controller.SmartLockController(self.provider, max_concurrency=3)
+
+    def test_create_key_code_on_all_devices_concurrently_collects_errors(self):
+        # Act
+        results = list(
+            self.sut.create_key_code_on_all_devices_concurrently("user1", "12345678")
+        )
+
+        # Assert
+        by_device = {result.device_id: result for result in results}
+        self.assertEqual(sorted(by_device), [1, 2, 3])
+        self.assertTrue(by_device[1].success)
+        self.assertEqual(by_device[1].result.position, 1)
+        self.assertFalse(by_device[2].success)
+        self.assertEqual(by_device[2].error, "Lock 2 is offline")
+        self.assertEqual(by_device[2].error_type, "RuntimeError")
+        self.assertTrue(by_device[3].success)
+
+    def test_create_key_code_on_all_devices_concurrently_validates_code(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.sut.create_key_code_on_all_devices_concurrently("user1", "123")
+
+    def test_delete_key_code_on_all_devices_concurrently(self):
+        # Arrange
+        self.provider.codes[1] = [smart_lock.LockCode("12345678", "user1", 1)]
+
+        # Act
+        results = list(self.sut.delete_key_code_on_all_devices_concurrently("user1"))
+
+        # Assert
+        messages = {result.device_id: result.result.message for result in results}
+        self.assertEqual(messages[1], "Key code deleted")
+        self.assertEqual(messages[2], "Key code not found")
+        self.assertEqual(self.provider.codes[1], [])
+
+    def test_run_on_devices_respects_concurrency_limit(self):
+        # Arrange
+        active = []
+        peak = []
+        lock = threading.Lock()
+        barrier = threading.Event()
+
+        def operation(device_id):
+            with lock:
+                active.append(device_id)
+                peak.append(len(active))
+            barrier.wait(0.05)
+            with lock:
+                active.remove(device_id)
+            return device_id
+
+        # Act
+        results = list(self.sut.run_on_devices(range(6), operation, max_concurrency=2))
+
+        # Assert
+        self.assertEqual(sorted(result.result for result in results), list(range(6)))
+        self.assertLessEqual(max(peak), 2)
+
+    def test_apply_bulk_operations_groups_by_device(self):
+        # Arrange
+        self.provider.codes[1] = [smart_lock.LockCode("11111111", "old", 1)]
+        operations = [
+            controller.BulkKeyCodeOperation("create", "user1", 1, "12345678"),
+            controller.BulkKeyCodeOperation("create", "user1", 3, "12345678"),
+            controller.BulkKeyCodeOperation("delete", "old", 1),
+            controller.BulkKeyCodeOperation("update", "user1", 1, "87654321"),
+            controller.BulkKeyCodeOperation("create", "user2", 2, "22222222"),
+            controller.BulkKeyCodeOperation("create", "user3", 1, "bad"),
+        ]
+
+        # Act
+        results = self.sut.apply_bulk_operations(operations)
+
+        # Assert
+        self.assertEqual([result.index for result in results], list(range(6)))
+        self.assertEqual(
+            [result.success for result in results], [True, True, True, True, False, False]
+        )
+        self.assertEqual(results[4].error, "Lock 2 is offline")
+        self.assertEqual(results[5].error, "Code must be 8 digits and numeric")
+        self.assertEqual(
+            self.provider.codes[1], [smart_lock.LockCode("87654321", "user1", 2)]
+        )
+        self.assertEqual(self.provider.reads, {1: 1, 2: 1, 3: 1})
+
+    def test_bulk_results_arrive_as_each_device_finishes(self):
+        # Arrange
+        self.provider.slow_device_ids = {3}
+        self.provider.release.clear()
+        operations = [
+            controller.BulkKeyCodeOperation("create", "user1", 3, "11111111"),
+            controller.BulkKeyCodeOperation("create", "user1", 1, "11111111"),
+        ]
+
+        # Act
+        results = self.sut.apply_bulk_operations_as_completed(operations)
+        first = next(results)
+        self.provider.release.set()
+        rest = list(results)
+
+        # Assert
+        self.assertEqual((first.index, first.device_id, first.success), (1, 1, True))
+        self.assertEqual([result.index for result in rest], [0])
+
+    def test_failed_operation_counts_one_error(self):
+        # Arrange
+        errors = total_lock_operation_errors()
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            self.sut.create_key_code_on_one_device("user1", "12345678", 2)
+
+        # Assert
+        self.assertEqual(total_lock_operation_errors(), errors + 1)
+
+    def test_failed_bulk_operation_counts_one_error(self):
+        # Arrange
+        errors = total_lock_operation_errors()
+        operations = [controller.BulkKeyCodeOperation("create", "user1", 2, "12345678")]
+
+        # Act
+        self.sut.apply_bulk_operations(operations)
+
+        # Assert
+        self.assertEqual(total_lock_operation_errors(), errors + 1)
+
+    def test_operations_record_metrics(self):
+        # Arrange
+        errors = metrics.LOCK_OPERATION_ERRORS.value(
+            operation="create_key_code", error_type="RuntimeError"
+        )
+        observed = metrics.LOCK_OPERATION_DURATION.count(operation="create_key_code")
+
+        # Act
+        list(self.sut.create_key_code_on_all_devices_concurrently("user1", "12345678"))
+
+        # Assert
+        self.assertEqual(
+            metrics.LOCK_OPERATION_ERRORS.value(
+                operation="create_key_code", error_type="RuntimeError"
+            ),
+            errors + 1,
+        )
+        self.assertEqual(
+            metrics.LOCK_OPERATION_DURATION.count(operation="create_key_code"), observed + 3
+        )
+        for device_id in (1, 2, 3):
+            self.assertEqual(metrics.LOCK_OPERATIONS_IN_FLIGHT.value(device_id=device_id), 0)
+
+    def test_command_queue_serializes_writes_per_device(self):
+        # Arrange
+        smart_lock_factory = smart_lock.Factory(
+            lambda params: self.provider.get_smart_lock(params.device_id),
+            self.provider.list_smart_locks,
+        )
+        factory = controller.SmartLockControllerFactory(
+            smart_lock_factory, max_concurrency=3, serialize_writes=True
+        )
+        sut = factory.create_smart_lock_controller(
+            smart_lock.SmartLockConfig(
+                smart_lock.DeviceLister(self.provider.list_smart_locks), smart_lock_factory
+            )
+        )
+        threads = [
+            threading.Thread(
+                target=sut.create_key_code_on_one_device, args=(f"user{i}", f"1000000{i}", 1)
+            )
+            for i in range(5)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sut.close()
+
+        # Assert
+        positions = sorted(code.position for code in self.provider.codes[1])
+        self.assertEqual(positions, [1, 2, 3, 4, 5])
+
+    def test_fleet_lookups_use_index_kept_current_by_writes(self):
+        # Arrange
+        self.provider.codes[3] = [smart_lock.LockCode("11111111", "user1", 1)]
+        self.sut.find_key_codes_for_user("user1")
+
+        # Act
+        self.sut.create_key_code_on_one_device("user1", "12345678", 1)
+        self.sut.delete_key_code("user1", 3)
+        by_user = self.sut.find_key_codes_for_user("user1")
+        by_code = self.sut.find_key_codes_by_code("12345678")
+
+        # Assert
+        self.assertEqual([location.device_id for location in by_user.locations], [1])
+        self.assertEqual(by_code.locations, by_user.locations)
+        self.assertEqual([result.device_id for result in by_user.failed_devices], [])
+        self.assertEqual(self.provider.reads, {1: 3, 2: 1, 3: 2})
+
+    def test_list_all_key_codes_reports_every_device(self):
+        # Arrange
+        self.provider.codes[1] = [smart_lock.LockCode("11111111", "user1", 250)]
+        self.provider.smart_lock_config = smart_lock.SmartLockConfig(
+            smart_lock.DeviceLister(self.provider.list_smart_locks), None
+        )
+
+        # Act
+        result = self.sut.list_all_key_codes()
+
+        # Assert
+        self.assertEqual([device.device_id for device in result.devices], [1, 2, 3])
+        self.assertEqual(result.devices[0].name, "Lock 1")
+        self.assertEqual(result.devices[0].codes, self.provider.codes[1])
+        self.assertEqual(result.devices[0].age_seconds, 0.0)
+        self.assertTrue(all(device.success for device in result.devices))
+
+    def test_update_key_code_validates_code(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.sut.update_key_code(1, "user1", "abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
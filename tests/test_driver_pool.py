@@ -0,0 +1,265 @@
+import time
+import unittest
+from unittest import TestCase
+from unittest.mock import Mock, PropertyMock
+
+from hubitat_lock_manager.driver_pool import DriverPool, DriverPoolConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDriverPool(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.created_drivers = []
+
+    def create_driver(self):
+        driver = Mock()
+        self.created_drivers.append(driver)
+        return driver
+
+    def create_pool(self, **kwargs) -> DriverPool:
+        return DriverPool(self.create_driver, DriverPoolConfig(**kwargs), self.clock)
+
+    def test_borrow_reuses_driver(self):
+        # Arrange
+        pool = self.create_pool(max_size=1)
+
+        # Act
+        with pool.borrow() as first:
+            pass
+        with pool.borrow() as second:
+            pass
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created_drivers), 1)
+        first.quit.assert_not_called()
+
+    def test_start_prefills_min_size(self):
+        # Arrange
+        pool = self.create_pool(min_size=2, max_size=3)
+
+        # Act
+        pool.start()
+
+        # Assert
+        self.assertEqual(len(self.created_drivers), 2)
+        self.assertEqual(pool.idle_count, 2)
+
+    def test_driver_recycled_after_max_uses(self):
+        # Arrange
+        pool = self.create_pool(max_size=1, max_uses=2)
+
+        # Act
+        for _ in range(3):
+            with pool.borrow():
+                pass
+
+        # Assert
+        self.assertEqual(len(self.created_drivers), 2)
+        self.created_drivers[0].quit.assert_called_once()
+
+    def test_driver_recycled_after_max_age(self):
+        # Arrange
+        pool = self.create_pool(max_size=1, max_age_seconds=10)
+        with pool.borrow():
+            pass
+
+        # Act
+        self.clock.now = 11
+        with pool.borrow() as driver:
+            pass
+
+        # Assert
+        self.assertIs(driver, self.created_drivers[1])
+        self.created_drivers[0].quit.assert_called_once()
+
+    def test_unhealthy_driver_replaced_on_checkout(self):
+        # Arrange
+        pool = self.create_pool(max_size=1)
+        with pool.borrow() as dead_driver:
+            pass
+        type(dead_driver).current_url = PropertyMock(side_effect=Exception("gone"))
+
+        # Act
+        with pool.borrow() as driver:
+            pass
+
+        # Assert
+        self.assertIsNot(driver, dead_driver)
+        dead_driver.quit.assert_called_once()
+
+    def test_checkout_times_out_when_exhausted(self):
+        # Arrange
+        pool = self.create_pool(max_size=1, checkout_timeout_seconds=0)
+
+        # Act / Assert
+        with pool.borrow():
+            with self.assertRaises(TimeoutError):
+                with pool.borrow():
+                    pass
+
+    def test_close_quits_idle_and_returned_drivers(self):
+        # Arrange
+        pool = self.create_pool(max_size=2)
+        with pool.borrow():
+            pass
+
+        # Act
+        with pool.borrow() as borrowed:
+            pool.close()
+
+        # Assert
+        for driver in self.created_drivers:
+            driver.quit.assert_called_once()
+        self.assertIs(borrowed, self.created_drivers[0])
+        self.assertEqual(pool.size, 0)
+        with self.assertRaises(RuntimeError):
+            with pool.borrow():
+                pass
+
+
+class TestDriverPoolWarmer(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.created_drivers = []
+        self.warmed_drivers = []
+
+    def create_driver(self):
+        driver = Mock()
+        self.created_drivers.append(driver)
+        return driver
+
+    def create_pool(self, **kwargs) -> DriverPool:
+        pool = DriverPool(
+            self.create_driver,
+            DriverPoolConfig(**kwargs),
+            self.clock,
+            warm_driver=self.warmed_drivers.append,
+        )
+        self.addCleanup(pool.close)
+        return pool
+
+    def hold_driver(self, pool: DriverPool, seconds: float) -> None:
+        with pool.borrow():
+            self.clock.now += seconds
+
+    def test_standby_follows_recent_demand(self):
+        # Arrange
+        pool = self.create_pool(max_size=4, max_standby=3, demand_window_seconds=100)
+        for _ in range(3):
+            self.hold_driver(pool, 50)
+
+        # Act
+        busy_target = pool.standby_target()
+        pool.maintain()
+        busy_idle = pool.idle_count
+        self.clock.now += 200
+        pool.maintain()
+
+        # Assert
+        self.assertEqual(busy_target, 2)
+        self.assertEqual(busy_idle, 2)
+        self.assertEqual(self.warmed_drivers, self.created_drivers[1:])
+        self.assertEqual(pool.idle_count, 0)
+        for driver in self.created_drivers:
+            driver.quit.assert_called_once()
+
+    def test_standby_never_below_min_size_or_above_max_standby(self):
+        # Arrange
+        pool = self.create_pool(min_size=1, max_size=10, max_standby=2, demand_window_seconds=10)
+
+        # Act
+        idle_target = pool.standby_target()
+        for _ in range(5):
+            self.hold_driver(pool, 10)
+        busy_target = pool.standby_target()
+
+        # Assert
+        self.assertEqual((idle_target, busy_target), (1, 2))
+
+    def test_maintain_replaces_dead_driver(self):
+        # Arrange
+        pool = self.create_pool(min_size=2, max_size=2, keepalive_interval_seconds=30)
+        pool.start()
+        dead_driver, live_driver = self.created_drivers
+        type(dead_driver).current_url = PropertyMock(side_effect=Exception("gone"))
+
+        # Act
+        pool.maintain()
+
+        # Assert
+        self.assertEqual(pool.idle_count, 2)
+        dead_driver.quit.assert_called_once()
+        live_driver.quit.assert_not_called()
+        self.assertEqual(self.warmed_drivers, self.created_drivers)
+        self.assertEqual(len(self.created_drivers), 3)
+
+    def test_maintain_replaces_drivers_expiring_before_next_keepalive(self):
+        # Arrange
+        pool = self.create_pool(
+            min_size=1, max_size=1, max_age_seconds=100, keepalive_interval_seconds=30
+        )
+        pool.start()
+        self.clock.now = 60
+        pool.maintain()
+        kept = list(self.created_drivers)
+
+        # Act
+        self.clock.now = 75
+        pool.maintain()
+
+        # Assert
+        self.assertEqual(len(kept), 1)
+        kept[0].quit.assert_called_once()
+        self.assertEqual(len(self.created_drivers), 2)
+        with pool.borrow() as driver:
+            self.assertIs(driver, self.created_drivers[1])
+
+    def test_cold_driver_kept_when_warming_fails(self):
+        # Arrange
+        pool = DriverPool(
+            self.create_driver,
+            DriverPoolConfig(min_size=1, max_size=1),
+            self.clock,
+            warm_driver=Mock(side_effect=Exception("hub unreachable")),
+        )
+
+        # Act
+        pool.start()
+
+        # Assert
+        self.assertEqual(pool.idle_count, 1)
+        self.created_drivers[0].quit.assert_not_called()
+
+    def test_warmer_runs_until_close(self):
+        # Arrange
+        pool = self.create_pool(min_size=1, max_size=1, keepalive_interval_seconds=0.01)
+        pool.start()
+        driver = self.created_drivers[0]
+        type(driver).current_url = PropertyMock(side_effect=Exception("gone"))
+
+        # Act
+        for _ in range(500):
+            if len(self.created_drivers) > 1:
+                break
+            time.sleep(0.01)
+        pool.close()
+
+        # Assert
+        driver.quit.assert_called_once()
+        self.assertEqual(len(self.created_drivers), 2)
+        self.assertEqual(pool.size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
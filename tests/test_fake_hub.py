@@ -0,0 +1,138 @@
+import html
+import re
+import time
+import unittest
+from unittest import TestCase
+
+import requests
+
+from hubitat_lock_manager import maker_api, smart_lock
+from hubitat_lock_manager.fake_hub import FakeHub
+
+
+class TestFakeHub(TestCase):
+    def setUp(self):
+        # Arrange
+        self.hub = FakeHub(devices={1: "Front Door Lock", 2: "Kitchen Light"})
+        self.hub.start()
+        self.addCleanup(self.hub.stop)
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+
+    def url(self, path: str) -> str:
+        return f"http://{self.hub.hub_ip}{path}"
+
+    def read_lock_codes(self, device_id: int) -> smart_lock.ListKeyCodesResult:
+        page = self.session.get(self.url(f"/device/edit/{device_id}")).text
+        match = re.search(r'id="cstate-value-lockCodes">([^<]*)<', page)
+        return smart_lock.parse_lock_codes(html.unescape(match.group(1)))
+
+    def test_device_list_page(self):
+        # Act
+        page = self.session.get(self.url("/device/list")).text
+
+        # Assert
+        self.assertIn('id="device-table"', page)
+        rows = re.findall(r'<tr data-device-id="(\d+)"><td>.*?</td><td>([^<]*)</td>', page)
+        self.assertEqual(rows, [("1", "Front Door Lock"), ("2", "Kitchen Light")])
+        self.assertEqual(self.hub.page_loads, ["/device/list"])
+
+    def test_device_edit_page_has_forms(self):
+        # Act
+        page = self.session.get(self.url("/device/edit/1")).text
+
+        # Assert
+        self.assertIn('id="form-setCode-5"', page)
+        self.assertIn('id="form-deleteCode-1"', page)
+        for name in ("arg[1]", "arg[2]", "arg[3]"):
+            self.assertIn(f'name="{name}"', page)
+        self.assertEqual(self.read_lock_codes(1).codes, [])
+
+    def test_page_assets(self):
+        # Arrange
+        self.hub.page_assets = True
+
+        # Act
+        page = self.session.get(self.url("/device/edit/1")).text
+        assets = re.findall(r'(?:src|href)="(/ui/[^"]+)"', page)
+        responses = [self.session.get(self.url(path)) for path in assets]
+
+        # Assert
+        self.assertEqual(sorted(assets), ["/ui/hub.css", "/ui/hub.js", "/ui/logo.png"])
+        self.assertTrue(all(response.ok for response in responses))
+        self.assertIn("/ui/hub.woff2", responses[assets.index("/ui/hub.css")].text)
+        self.assertEqual(self.hub.asset_loads, assets)
+        self.assertEqual(self.hub.page_loads, ["/device/edit/1"])
+
+    def test_set_and_delete_code_forms(self):
+        # Act
+        response = self.session.post(
+            self.url("/device/runmethod"),
+            data={"id": "1", "method": "setCode", "arg[1]": "250", "arg[2]": "12345678", "arg[3]": "alice"},
+        )
+
+        # Assert
+        self.assertEqual(response.url, self.url("/device/edit/1"))
+        self.assertEqual(
+            self.read_lock_codes(1).codes, [smart_lock.LockCode(code="12345678", name="alice", position=250)]
+        )
+
+        # Act
+        self.session.post(
+            self.url("/device/runmethod"),
+            data={"id": "1", "method": "deleteCode", "arg[1]": "250"},
+        )
+
+        # Assert
+        self.assertEqual(self.read_lock_codes(1).codes, [])
+
+    def test_rejects_unknown_command(self):
+        # Act
+        response = self.session.post(
+            self.url("/device/runmethod"), data={"id": "1", "method": "unlock"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+
+    def test_zwave_latency_delays_commands(self):
+        # Arrange
+        self.hub.zwave_latency_seconds = 0.1
+
+        # Act
+        self.session.post(
+            self.url("/device/runmethod"),
+            data={"id": "1", "method": "setCode", "arg[1]": "250", "arg[2]": "12345678", "arg[3]": "alice"},
+        )
+
+        # Assert
+        self.assertEqual(self.read_lock_codes(1).codes, [])
+        time.sleep(0.2)
+        self.assertEqual(len(self.read_lock_codes(1).codes), 1)
+
+    def test_maker_api_confirms_delayed_write(self):
+        # Arrange
+        self.hub.zwave_latency_seconds = 0.1
+        config = maker_api.MakerApiConfig(
+            self.hub.hub_ip,
+            self.hub.app_id,
+            self.hub.access_token,
+            write_confirmation=smart_lock.WriteConfirmationConfig(
+                timeout_seconds=2, initial_delay_seconds=0.02
+            ),
+        )
+        self.addCleanup(config.close)
+        lock = maker_api.create_maker_api_smart_lock_factory(config).create_smart_lock(
+            smart_lock.CreateSmartLockParams(1, None)
+        )
+
+        # Act
+        result = lock.create_key_code(smart_lock.CreateKeyCodeParams("12345678", "alice"))
+
+        # Assert
+        self.assertTrue(result.verified)
+        self.assertEqual(self.hub.codes[1][result.position]["name"], "alice")
+
+
+if __name__ == "__main__":
+    unittest.main()
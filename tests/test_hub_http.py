@@ -0,0 +1,198 @@
+import unittest
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+
+from hubitat_lock_manager import controller, hub_http, smart_lock
+from hubitat_lock_manager.fake_hub import FakeHub
+
+
+class TestParseHubPage(TestCase):
+    def test_reads_device_table(self):
+        # Arrange
+        html = (
+            '<table id="device-table"><thead><tr><th>Name</th></tr></thead><tbody>'
+            '<tr data-device-id="12"><td><input type="checkbox"></td>'
+            '<td><a href="/device/edit/12">Front\n   Door &amp; Lock</a></td></tr>'
+            '<tr data-device-id="13"><td></td><td>Back Lock<br></td></tr>'
+            "</tbody></table>"
+            '<table><tr data-device-id="99"><td></td><td>Not a device</td></tr></table>'
+        )
+
+        # Act
+        page = hub_http.parse_hub_page(html)
+
+        # Assert
+        self.assertEqual(
+            page.device_rows, [(12, ["", "Front Door & Lock"]), (13, ["", "Back Lock"])]
+        )
+
+    def test_reads_element_text_and_forms(self):
+        # Arrange
+        html = (
+            '<td id="cstate-value-lockCodes">{&quot;1&quot;: {&quot;code&quot;: &quot;1234&quot;, '
+            "&quot;name&quot;: &quot;alice&quot;}}</td>"
+            '<form id="form-deleteCode-1" method="post" action="/device/runmethod">'
+            '<input type="hidden" name="id" value="5"><input name="arg[1]">'
+            '<button type="submit">Delete</button></form>'
+        )
+
+        # Act
+        page = hub_http.parse_hub_page(html, "http://hub/device/edit/5")
+
+        # Assert
+        self.assertEqual(
+            hub_http.read_lock_codes(page).codes, [smart_lock.LockCode("1234", "alice", 1)]
+        )
+        self.assertEqual(
+            page.forms["form-deleteCode-1"],
+            hub_http.HtmlForm("/device/runmethod", "POST", {"id": "5", "arg[1]": ""}),
+        )
+
+    def test_missing_lock_codes_raises(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            hub_http.read_lock_codes(hub_http.parse_hub_page("<p>Login</p>"))
+
+
+class TestHubHttpBackend(TestCase):
+    def setUp(self):
+        # Arrange
+        self.hub = FakeHub(devices={1: "Front Door Lock", 2: "Kitchen Light"})
+        self.hub.start()
+        self.addCleanup(self.hub.stop)
+        self.config = hub_http.HubHttpConfig(
+            self.hub.hub_ip,
+            write_confirmation=smart_lock.WriteConfirmationConfig(
+                timeout_seconds=2, initial_delay_seconds=0.02
+            ),
+        )
+        self.addCleanup(self.config.close)
+        self.factory = hub_http.create_hub_http_smart_lock_factory(self.config)
+
+    def create_lock(self, device_id: int) -> smart_lock.SmartLock:
+        return self.factory.create_smart_lock(
+            smart_lock.CreateSmartLockParams(device_id, None)
+        )
+
+    def test_list_smart_locks_filters_non_locks(self):
+        # Act
+        result = self.factory.list_smart_locks()
+
+        # Assert
+        self.assertEqual(result.devices, [smart_lock.Device(1, "Front Door Lock")])
+
+    def test_create_key_code(self):
+        # Arrange
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.create_key_code(
+            smart_lock.CreateKeyCodeParams(code="12345678", username="Jane, Doe")
+        )
+
+        # Assert
+        self.assertEqual(result.position, 250)
+        self.assertTrue(result.verified)
+        self.assertEqual(self.hub.codes[1][250], {"code": "12345678", "name": "Jane, Doe"})
+        self.assertEqual(
+            self.hub.commands, [(1, "setCode", ("250", "12345678", "Jane, Doe"))]
+        )
+
+    def test_writes_are_confirmed_by_default(self):
+        # Arrange
+        self.hub.zwave_latency_seconds = 0.05
+        config = hub_http.HubHttpConfig(self.hub.hub_ip)
+        self.addCleanup(config.close)
+        lock = hub_http.create_hub_http_smart_lock_factory(config).create_smart_lock(
+            smart_lock.CreateSmartLockParams(1, None)
+        )
+
+        # Act
+        result = lock.create_key_code(
+            smart_lock.CreateKeyCodeParams(code="12345678", username="user1")
+        )
+
+        # Assert
+        self.assertTrue(result.verified)
+        self.assertEqual(len(self.hub.codes[1]), 1)
+
+    def test_failed_read_while_confirming_is_retried(self):
+        # Arrange
+        params = smart_lock.SetCodeParams("12345678", "user1", position=250)
+        written = smart_lock.ListKeyCodesResult(
+            codes=[smart_lock.LockCode("12345678", "user1", 250)]
+        )
+
+        # Act
+        with patch.object(
+            hub_http,
+            "get_codes_via_hub_http",
+            side_effect=[requests.ConnectionError("connection reset"), written],
+        ):
+            confirmed = hub_http.confirm_set_code(1, params, self.config)
+
+        # Assert
+        self.assertTrue(confirmed)
+
+    def test_create_key_code_loads_page_once_without_confirmation(self):
+        # Arrange
+        config = hub_http.HubHttpConfig(self.hub.hub_ip, write_confirmation=None)
+        self.addCleanup(config.close)
+        lock = hub_http.create_hub_http_smart_lock_factory(config).create_smart_lock(
+            smart_lock.CreateSmartLockParams(1, None)
+        )
+
+        # Act
+        lock.create_key_code(smart_lock.CreateKeyCodeParams(code="12345678", username="user1"))
+
+        # Assert
+        self.assertEqual(self.hub.page_loads, ["/device/edit/1"])
+        self.assertEqual(len(self.hub.commands), 1)
+
+    def test_delete_key_code_waits_for_zwave(self):
+        # Arrange
+        self.hub.codes[1][3] = {"code": "12345678", "name": "user1"}
+        self.hub.zwave_latency_seconds = 0.1
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.delete_key_code(smart_lock.DeleteKeyCodeParams(username="user1"))
+
+        # Assert
+        self.assertEqual(result.message, "Key code deleted")
+        self.assertTrue(result.verified)
+        self.assertEqual(self.hub.codes[1], {})
+
+    def test_update_key_code_overwrites_slot(self):
+        # Arrange
+        self.hub.codes[1][7] = {"code": "12345678", "name": "user1"}
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.update_key_code(
+            smart_lock.UpdateKeyCodeParams(code="87654321", username="user1")
+        )
+
+        # Assert
+        self.assertEqual(result.position, 7)
+        self.assertEqual(self.hub.codes[1], {7: {"code": "87654321", "name": "user1"}})
+
+    def test_controller_uses_hub_http_backend(self):
+        # Arrange
+        sut = controller.create_smart_lock_controller(
+            self.hub.hub_ip, "", backend=controller.HUB_HTTP_BACKEND
+        )
+        self.addCleanup(sut.close)
+
+        # Act
+        results = list(sut.create_key_code_on_all_devices_concurrently("user1", "12345678"))
+
+        # Assert
+        self.assertEqual([result.device_id for result in results], [1])
+        self.assertTrue(results[0].result.verified)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import smart_lock
+from hubitat_lock_manager.inventory import DeviceInventory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeDeviceSource:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+        self.loading = threading.Event()
+
+    def list_devices(self) -> smart_lock.ListDevicesResult:
+        self.loading.set()
+        self.release.wait(5)
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("hub offline")
+        return smart_lock.ListDevicesResult(
+            devices=[smart_lock.Device(id=self.calls, name=f"Lock {self.calls}")]
+        )
+
+
+class TestDeviceInventory(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.source = FakeDeviceSource()
+        self.sut = DeviceInventory(self.source.list_devices, 60, self.clock)
+
+    def test_first_get_loads_devices(self):
+        # Act
+        result = self.sut.get()
+
+        # Assert
+        self.assertEqual(result.devices[0].id, 1)
+        self.assertEqual(self.sut.age, 0)
+
+    def test_fresh_get_uses_cached_devices(self):
+        # Arrange
+        self.sut.get()
+        self.clock.now = 59
+
+        # Act
+        result = self.sut.get()
+
+        # Assert
+        self.assertEqual(result.devices[0].id, 1)
+        self.assertEqual(self.source.calls, 1)
+
+    def test_stale_get_returns_last_known_and_refreshes_in_background(self):
+        # Arrange
+        self.sut.get()
+        self.clock.now = 60
+        self.source.release.clear()
+
+        # Act
+        stale = self.sut.get()
+        self.source.release.set()
+        self.sut.wait_for_refresh(5)
+
+        # Assert
+        self.assertEqual(stale.devices[0].id, 1)
+        self.assertEqual(self.sut.get().devices[0].id, 2)
+
+    def test_failed_background_refresh_keeps_last_known(self):
+        # Arrange
+        self.sut.get()
+        self.clock.now = 60
+        self.source.fail = True
+
+        # Act
+        self.sut.get()
+        self.sut.wait_for_refresh(5)
+
+        # Assert
+        self.assertEqual(self.sut.get().devices[0].id, 1)
+
+    def test_concurrent_first_gets_share_one_load(self):
+        # Arrange
+        self.source.release.clear()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.sut.get())) for _ in range(5)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        self.source.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        # Assert
+        self.assertEqual(self.source.calls, 1)
+        self.assertEqual([result.devices[0].id for result in results], [1] * 5)
+
+    def test_refresh_during_background_load_returns_its_own_load(self):
+        # Arrange
+        self.sut.get()
+        self.clock.now = 60
+        self.source.release.clear()
+        self.source.loading.clear()
+        self.sut.get()
+        self.source.loading.wait(5)
+        results = []
+        refresh = threading.Thread(target=lambda: results.append(self.sut.refresh()))
+
+        # Act
+        refresh.start()
+        self.source.release.set()
+        refresh.join(5)
+
+        # Assert
+        self.assertEqual(results[0].devices[0].id, 3)
+        self.assertEqual(self.source.calls, 3)
+
+    def test_refresh_reloads_immediately(self):
+        # Arrange
+        self.sut.get()
+
+        # Act
+        result = self.sut.refresh()
+
+        # Assert
+        self.assertEqual(result.devices[0].id, 2)
+        self.assertEqual(self.sut.get().devices[0].id, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import jobs
+from hubitat_lock_manager.jobs import JobManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def wait_until_done(manager: JobManager, job_id: str) -> jobs.JobSnapshot:
+    for _ in range(500):
+        job = manager.get(job_id)
+        if job.done:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError("Job did not finish")
+
+
+class TestJobManager(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.sut = JobManager(max_workers=1, retention_seconds=60, max_retained=2, clock=self.clock)
+        self.addCleanup(self.sut.shutdown)
+
+    def test_job_reports_progress_and_results(self):
+        # Arrange
+        release = threading.Event()
+
+        def run():
+            yield "device 1"
+            release.wait(5)
+            yield "device 2"
+
+        # Act
+        job_id = self.sut.submit("create_key_code", run)
+        for _ in range(500):
+            if self.sut.get(job_id).completed == 1:
+                break
+            threading.Event().wait(0.01)
+        in_progress = self.sut.get(job_id)
+        release.set()
+        job = wait_until_done(self.sut, job_id)
+
+        # Assert
+        self.assertEqual(in_progress.status, jobs.RUNNING)
+        self.assertEqual(in_progress.results, ["device 1"])
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(job.results, ["device 1", "device 2"])
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_records_error(self):
+        # Arrange
+        def run():
+            raise ValueError("Code must be 8 digits and numeric")
+
+        # Act
+        job = wait_until_done(self.sut, self.sut.submit("create_key_code", run))
+
+        # Assert
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertEqual(job.error, "Code must be 8 digits and numeric")
+
+    def test_finished_jobs_expire_after_retention(self):
+        # Arrange
+        job_id = self.sut.submit("delete_key_code", lambda: [])
+        wait_until_done(self.sut, job_id)
+
+        # Act
+        self.clock.now = 60
+
+        # Assert
+        self.assertIsNone(self.sut.get(job_id))
+
+    def test_oldest_finished_jobs_evicted_above_cap(self):
+        # Arrange
+        job_ids = []
+        for i in range(3):
+            self.clock.now = i
+            job_ids.append(self.sut.submit("delete_key_code", lambda: []))
+            wait_until_done(self.sut, job_ids[-1])
+
+        # Act
+        first = self.sut.get(job_ids[0])
+
+        # Assert
+        self.assertIsNone(first)
+        self.assertIsNotNone(self.sut.get(job_ids[1]))
+        self.assertIsNotNone(self.sut.get(job_ids[2]))
+
+    def test_unknown_job(self):
+        # Act / Assert
+        self.assertIsNone(self.sut.get("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
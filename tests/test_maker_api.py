@@ -0,0 +1,127 @@
+import unittest
+from unittest import TestCase
+
+import requests
+
+from hubitat_lock_manager import controller, maker_api, smart_lock
+from hubitat_lock_manager.maker_api_stub import MakerApiStub
+
+
+class TestMakerApiBackend(TestCase):
+    def setUp(self):
+        # Arrange
+        self.stub = MakerApiStub(devices={1: "Front Door Lock", 2: "Kitchen Light"})
+        self.stub.start()
+        self.addCleanup(self.stub.stop)
+        self.config = maker_api.MakerApiConfig(
+            self.stub.hub_ip,
+            self.stub.app_id,
+            self.stub.access_token,
+            write_confirmation=smart_lock.WriteConfirmationConfig(timeout_seconds=1),
+        )
+        self.addCleanup(self.config.close)
+        self.factory = maker_api.create_maker_api_smart_lock_factory(self.config)
+
+    def create_lock(self, device_id: int) -> smart_lock.SmartLock:
+        return self.factory.create_smart_lock(
+            smart_lock.CreateSmartLockParams(device_id, None)
+        )
+
+    def test_list_smart_locks_filters_non_locks(self):
+        # Act
+        result = self.factory.list_smart_locks()
+
+        # Assert
+        self.assertEqual(result.devices, [smart_lock.Device(1, "Front Door Lock")])
+
+    def test_create_key_code(self):
+        # Arrange
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.create_key_code(
+            smart_lock.CreateKeyCodeParams(code="12345678", username="Jane, Doe")
+        )
+
+        # Assert
+        self.assertEqual(result.position, 250)
+        self.assertTrue(result.verified)
+        self.assertEqual(
+            self.stub.codes[1][250], {"code": "12345678", "name": "Jane, Doe"}
+        )
+
+    def test_create_key_code_reads_device_once(self):
+        # Arrange
+        config = maker_api.MakerApiConfig(
+            self.stub.hub_ip, self.stub.app_id, self.stub.access_token, write_confirmation=None
+        )
+        self.addCleanup(config.close)
+        lock = maker_api.create_maker_api_smart_lock_factory(config).create_smart_lock(
+            smart_lock.CreateSmartLockParams(1, None)
+        )
+
+        # Act
+        lock.create_key_code(
+            smart_lock.CreateKeyCodeParams(code="12345678", username="user1")
+        )
+
+        # Assert
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(self.stub.requests[0], "/apps/api/1/devices/1")
+
+    def test_delete_key_code(self):
+        # Arrange
+        self.stub.codes[1][3] = {"code": "12345678", "name": "user1"}
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.delete_key_code(smart_lock.DeleteKeyCodeParams(username="user1"))
+
+        # Assert
+        self.assertEqual(result.message, "Key code deleted")
+        self.assertTrue(result.verified)
+        self.assertEqual(self.stub.codes[1], {})
+
+    def test_list_key_codes(self):
+        # Arrange
+        self.stub.codes[1][7] = {"code": "12345678", "name": "user1"}
+        lock = self.create_lock(1)
+
+        # Act
+        result = lock.list_key_codes()
+
+        # Assert
+        self.assertEqual(result.codes, [smart_lock.LockCode("12345678", "user1", 7)])
+
+    def test_rejects_wrong_access_token(self):
+        # Arrange
+        config = maker_api.MakerApiConfig(self.stub.hub_ip, self.stub.app_id, "wrong")
+        self.addCleanup(config.close)
+
+        # Act / Assert
+        with self.assertRaises(requests.HTTPError):
+            maker_api.list_devices_via_maker_api(config)
+
+    def test_controller_uses_maker_api_backend(self):
+        # Arrange
+        sut = controller.create_smart_lock_controller(
+            self.stub.hub_ip,
+            "",
+            backend=controller.MAKER_API_BACKEND,
+            maker_api_app_id=self.stub.app_id,
+            maker_api_access_token=self.stub.access_token,
+        )
+        self.addCleanup(sut.close)
+
+        # Act
+        results = list(
+            sut.create_key_code_on_all_devices_concurrently("user1", "12345678")
+        )
+
+        # Assert
+        self.assertEqual([result.device_id for result in results], [1])
+        self.assertTrue(results[0].result.verified)
+
+
+if __name__ == "__main__":
+    unittest.main()
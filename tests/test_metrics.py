@@ -0,0 +1,90 @@
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(TestCase):
+    def setUp(self):
+        # Arrange
+        self.registry = MetricsRegistry()
+
+    def test_counter_renders_per_label_values(self):
+        # Arrange
+        counter = self.registry.counter("page_loads_total", "Pages loaded.", ("page",))
+
+        # Act
+        counter.inc(page="device_edit")
+        counter.inc(2, page="device_edit")
+        counter.inc(page="device_list")
+
+        # Assert
+        self.assertEqual(counter.value(page="device_edit"), 3)
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP page_loads_total Pages loaded.\n"
+            "# TYPE page_loads_total counter\n"
+            'page_loads_total{page="device_edit"} 3\n'
+            'page_loads_total{page="device_list"} 1\n',
+        )
+
+    def test_counter_rejects_decrease_and_wrong_labels(self):
+        # Arrange
+        counter = self.registry.counter("errors_total", "Errors.", ("error_type",))
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            counter.inc(-1, error_type="ValueError")
+        with self.assertRaises(ValueError):
+            counter.inc(device_id=1)
+
+    def test_gauge_tracks_in_progress(self):
+        # Arrange
+        gauge = self.registry.gauge("in_flight", "Running operations.", ("device_id",))
+
+        # Act
+        with gauge.track_in_progress(device_id=1):
+            during = gauge.value(device_id=1)
+
+        # Assert
+        self.assertEqual(during, 1)
+        self.assertEqual(gauge.value(device_id=1), 0)
+
+    def test_histogram_renders_cumulative_buckets(self):
+        # Arrange
+        histogram = self.registry.histogram("duration_seconds", "Durations.", buckets=(0.1, 1))
+
+        # Act
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        # Assert
+        lines = self.registry.render().splitlines()
+        self.assertIn('duration_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('duration_seconds_bucket{le="1"} 2', lines)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("duration_seconds_sum 5.55", lines)
+        self.assertIn("duration_seconds_count 3", lines)
+
+    def test_label_values_are_escaped(self):
+        # Arrange
+        counter = self.registry.counter("errors_total", "Errors.", ("error",))
+
+        # Act
+        counter.inc(error='bad "quote"\n')
+
+        # Assert
+        self.assertIn('errors_total{error="bad \\"quote\\"\\n"} 1', self.registry.render())
+
+    def test_duplicate_names_rejected(self):
+        # Arrange
+        self.registry.counter("errors_total", "Errors.")
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.registry.gauge("errors_total", "Errors.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import threading
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager.positions import PositionAllocator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPositionAllocator(TestCase):
+    def setUp(self):
+        # Arrange
+        self.clock = FakeClock()
+        self.reads = 0
+        self.used = [250]
+        self.sut = PositionAllocator(
+            lease_seconds=30, refresh_interval_seconds=300, clock=self.clock
+        )
+
+    def read_positions(self):
+        self.reads += 1
+        return list(self.used)
+
+    def test_reserve_hands_out_distinct_positions(self):
+        # Act
+        first = self.sut.reserve(1, self.read_positions)
+        second = self.sut.reserve(1, self.read_positions)
+
+        # Assert
+        self.assertEqual((first.position, second.position), (249, 248))
+        self.assertEqual(self.reads, 1)
+
+    def test_concurrent_reservations_never_collide(self):
+        # Arrange
+        positions = []
+        barrier = threading.Barrier(8)
+
+        def reserve():
+            barrier.wait()
+            positions.append(self.sut.reserve(1, self.read_positions).position)
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(sorted(positions), list(range(242, 250)))
+        self.assertEqual(self.reads, 1)
+
+    def test_release_returns_position(self):
+        # Arrange
+        reservation = self.sut.reserve(1, self.read_positions)
+
+        # Act
+        self.sut.release(reservation)
+
+        # Assert
+        self.assertEqual(self.sut.reserve(1, self.read_positions).position, 249)
+
+    def test_commit_keeps_position_used(self):
+        # Arrange
+        reservation = self.sut.reserve(1, self.read_positions)
+
+        # Act
+        committed = self.sut.commit(reservation)
+
+        # Assert
+        self.assertTrue(committed)
+        self.assertEqual(self.sut.next_position(1, self.read_positions), 248)
+
+    def test_expired_lease_is_handed_out_again(self):
+        # Arrange
+        reservation = self.sut.reserve(1, self.read_positions)
+        self.clock.now = 30
+
+        # Act
+        again = self.sut.reserve(1, self.read_positions)
+
+        # Assert
+        self.assertEqual(again.position, 249)
+        self.assertFalse(self.sut.commit(reservation))
+
+    def test_mark_free_returns_deleted_position(self):
+        # Act
+        self.sut.next_position(1, self.read_positions)
+        self.sut.mark_free(1, 250)
+
+        # Assert
+        self.assertEqual(self.sut.next_position(1, self.read_positions), 250)
+
+    def test_reload_keeps_outstanding_leases(self):
+        # Arrange
+        reservation = self.sut.reserve(1, self.read_positions)
+        self.sut.invalidate(1)
+
+        # Act
+        position = self.sut.next_position(1, self.read_positions)
+
+        # Assert
+        self.assertEqual(self.reads, 2)
+        self.assertEqual(position, 248)
+        self.assertTrue(self.sut.commit(reservation))
+
+    def test_reserve_fails_when_device_is_full(self):
+        # Arrange
+        sut = PositionAllocator(max_position=2, clock=self.clock)
+        sut.reserve(1, lambda: [1])
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            sut.reserve(1, lambda: [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
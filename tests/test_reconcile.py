@@ -0,0 +1,234 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import controller, reconcile, smart_lock
+
+
+class InMemoryLock:
+    def __init__(self, codes):
+        self.codes = list(codes)
+        self.lock = smart_lock.create_generic_z_wave_lock(
+            1,
+            smart_lock.PositionDeleter(self.delete_position),
+            smart_lock.CodeLister(self.list_codes),
+            smart_lock.CodeSetter(self.get_next_position, self.set_code),
+        )
+
+    def apply(self, operations):
+        return self.lock.apply_key_code_operations(
+            [
+                smart_lock.KeyCodeOperation(operation.action, operation.username, operation.code)
+                for operation in operations
+            ]
+        )
+
+    def delete_position(self, params):
+        self.codes = [c for c in self.codes if c.position != params.position]
+
+    def get_next_position(self):
+        return min({c.position for c in self.codes} or {251}) - 1
+
+    def list_codes(self, _device_id):
+        return smart_lock.ListKeyCodesResult(codes=list(self.codes))
+
+    def set_code(self, params):
+        position = params.position or self.get_next_position()
+        self.codes = [c for c in self.codes if c.position != position]
+        self.codes.append(smart_lock.LockCode(params.code, params.name, position))
+        return smart_lock.SetCodeResult(position)
+
+
+class TestDiffKeyCodes(TestCase):
+    def setUp(self):
+        # Arrange
+        self.snapshot = controller.FleetKeyCodesResult(
+            [
+                controller.DeviceKeyCodes(
+                    1,
+                    "Front Door",
+                    [
+                        smart_lock.LockCode("11111111", "alice", 250),
+                        smart_lock.LockCode("22222222", "bob", 249),
+                        smart_lock.LockCode("33333333", "carol", 248),
+                    ],
+                ),
+                controller.DeviceKeyCodes(2, "Back Door", []),
+                controller.DeviceKeyCodes(3, "Garage", error="Lock 3 is offline"),
+            ]
+        )
+
+    def test_plans_minimal_operations(self):
+        # Arrange
+        desired = [
+            reconcile.DesiredKeyCode(1, "alice", "11111111"),
+            reconcile.DesiredKeyCode(1, "bob", "44444444"),
+            reconcile.DesiredKeyCode(1, "dave", "55555555"),
+            reconcile.DesiredKeyCode(2, "alice", "11111111"),
+        ]
+
+        # Act
+        plan = reconcile.diff_key_codes(desired, self.snapshot)
+
+        # Assert
+        self.assertEqual(
+            plan.operations,
+            [
+                controller.BulkKeyCodeOperation("delete", "carol", 1),
+                controller.BulkKeyCodeOperation("update", "bob", 1, "44444444"),
+                controller.BulkKeyCodeOperation("create", "dave", 1, "55555555"),
+                controller.BulkKeyCodeOperation("create", "alice", 2, "11111111"),
+            ],
+        )
+        self.assertEqual(plan.unchanged, 1)
+        self.assertEqual(plan.hub_operations, 4)
+        self.assertEqual([device.device_id for device in plan.skipped_devices], [3])
+
+    def test_format_plan_summarizes_hub_operations(self):
+        # Arrange
+        plan = reconcile.diff_key_codes(
+            [reconcile.DesiredKeyCode(1, "alice", "11111111")], self.snapshot
+        )
+
+        # Act
+        result = reconcile.format_plan(plan)
+
+        # Assert
+        self.assertTrue(
+            result.endswith("2 hub operations: 0 create, 0 update, 2 delete, 1 unchanged")
+        )
+        self.assertIn("skip    device 3     Lock 3 is offline", result)
+
+    def test_leaves_devices_missing_from_desired_state(self):
+        # Arrange
+        desired = [reconcile.DesiredKeyCode(2, "alice", "11111111")]
+
+        # Act
+        plan = reconcile.diff_key_codes(desired, self.snapshot)
+
+        # Assert
+        self.assertEqual(
+            plan.operations, [controller.BulkKeyCodeOperation("create", "alice", 2, "11111111")]
+        )
+        self.assertEqual(plan.untouched_device_ids, [1])
+        self.assertIn("keep    device 1", reconcile.format_plan(plan))
+
+    def test_prune_empties_devices_missing_from_desired_state(self):
+        # Arrange
+        desired = [reconcile.DesiredKeyCode(2, "alice", "11111111")]
+
+        # Act
+        plan = reconcile.diff_key_codes(desired, self.snapshot, prune=True)
+
+        # Assert
+        self.assertEqual(plan.count("delete"), 3)
+        self.assertEqual(plan.untouched_device_ids, [])
+
+    def test_update_runs_after_the_update_freeing_its_code(self):
+        # Arrange
+        desired = [
+            reconcile.DesiredKeyCode(1, "alice", "22222222"),
+            reconcile.DesiredKeyCode(1, "bob", "44444444"),
+            reconcile.DesiredKeyCode(1, "carol", "33333333"),
+        ]
+
+        # Act
+        plan = reconcile.diff_key_codes(desired, self.snapshot)
+
+        # Assert
+        self.assertEqual(
+            plan.operations,
+            [
+                controller.BulkKeyCodeOperation("update", "bob", 1, "44444444"),
+                controller.BulkKeyCodeOperation("update", "alice", 1, "22222222"),
+            ],
+        )
+
+    def test_swapped_codes_can_be_applied(self):
+        # Arrange
+        desired = [
+            reconcile.DesiredKeyCode(1, "alice", "22222222"),
+            reconcile.DesiredKeyCode(1, "bob", "11111111"),
+            reconcile.DesiredKeyCode(1, "carol", "33333333"),
+        ]
+        lock = InMemoryLock(self.snapshot.devices[0].codes)
+
+        # Act
+        plan = reconcile.diff_key_codes(desired, self.snapshot)
+        results = lock.apply(plan.operations)
+
+        # Assert
+        self.assertEqual(
+            plan.operations,
+            [
+                controller.BulkKeyCodeOperation("delete", "alice", 1),
+                controller.BulkKeyCodeOperation("update", "bob", 1, "11111111"),
+                controller.BulkKeyCodeOperation("create", "alice", 1, "22222222"),
+            ],
+        )
+        self.assertEqual([result.error for result in results], [None, None, None])
+        self.assertEqual(
+            {lock_code.name: lock_code.code for lock_code in lock.codes},
+            {"alice": "22222222", "bob": "11111111", "carol": "33333333"},
+        )
+
+    def test_rejects_unknown_devices(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            reconcile.diff_key_codes(
+                [reconcile.DesiredKeyCode(9, "alice", "11111111")], self.snapshot
+            )
+
+
+class TestLoadDesiredState(TestCase):
+    def write_file(self, suffix: str, content: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load_csv(self):
+        # Arrange
+        path = self.write_file(
+            ".csv", "username,device_id,code\nalice,1,11111111\nbob, 2 ,22222222\n"
+        )
+
+        # Act
+        result = reconcile.load_desired_state(path)
+
+        # Assert
+        self.assertEqual(
+            result,
+            [
+                reconcile.DesiredKeyCode(1, "alice", "11111111"),
+                reconcile.DesiredKeyCode(2, "bob", "22222222"),
+            ],
+        )
+
+    def test_load_json(self):
+        # Arrange
+        path = self.write_file(
+            ".json", '[{"username": "alice", "device_id": 1, "code": "11111111"}]'
+        )
+
+        # Act
+        result = reconcile.load_desired_state(path)
+
+        # Assert
+        self.assertEqual(result, [reconcile.DesiredKeyCode(1, "alice", "11111111")])
+
+    def test_rejects_code_shared_on_one_device(self):
+        # Arrange
+        path = self.write_file(
+            ".csv", "username,device_id,code\nalice,1,11111111\nbob,1,11111111\n"
+        )
+
+        # Act / Assert
+        with self.assertRaisesRegex(ValueError, "also given to alice"):
+            reconcile.load_desired_state(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
+import base64
+import threading
+import time
 import unittest
 from unittest.mock import patch, Mock
 import json
 import urllib.error
-from hubitat_lock_manager.rest_client import CloudRunRestClient
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from hubitat_lock_manager.rest_client import CloudRunRestClient, IdTokenCache, PooledHttpTransport
 
 class TestCloudRunRestClient(unittest.TestCase):
 
@@ -93,5 +97,231 @@ class TestCloudRunRestClient(unittest.TestCase):
         self.assertEqual(response, json.dumps(self.data))
 
 
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestIdTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetched = []
+        self.release = threading.Event()
+        self.release.set()
+        self.cache = IdTokenCache(self.fetch, refresh_margin_seconds=60, clock=self.clock)
+
+    def fetch(self, audience):
+        self.release.wait(5)
+        self.fetched.append(audience)
+        return make_jwt(self.clock.now + 3600)
+
+    def test_reuses_token_until_refresh_margin(self):
+        # Act
+        first = self.cache.get("https://a.run.app")
+        self.clock.now += 3000
+        second = self.cache.get("https://a.run.app")
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(self.fetched, ["https://a.run.app"])
+
+    def test_keyed_by_audience(self):
+        # Act
+        self.cache.get("https://a.run.app")
+        self.cache.get("https://b.run.app")
+
+        # Assert
+        self.assertEqual(self.fetched, ["https://a.run.app", "https://b.run.app"])
+
+    def test_refreshes_in_background_near_expiry(self):
+        # Arrange
+        first = self.cache.get("https://a.run.app")
+        self.clock.now += 3550
+        self.release.clear()
+
+        # Act
+        served = self.cache.get("https://a.run.app")
+        self.release.set()
+        for _ in range(500):
+            if len(self.fetched) == 2:
+                break
+            threading.Event().wait(0.01)
+        refreshed = self.cache.get("https://a.run.app")
+
+        # Assert
+        self.assertEqual(served, first)
+        self.assertNotEqual(refreshed, first)
+        self.assertEqual(len(self.fetched), 2)
+
+    def test_expired_token_fetched_synchronously(self):
+        # Arrange
+        first = self.cache.get("https://a.run.app")
+        self.clock.now += 3600
+
+        # Act
+        second = self.cache.get("https://a.run.app")
+
+        # Assert
+        self.assertNotEqual(first, second)
+
+    def test_concurrent_callers_share_one_fetch(self):
+        # Arrange
+        self.release.clear()
+        tokens = []
+        threads = [
+            threading.Thread(target=lambda: tokens.append(self.cache.get("https://a.run.app")))
+            for _ in range(5)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        threading.Event().wait(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(len(set(tokens)), 1)
+
+    def test_opaque_token_uses_default_lifetime(self):
+        # Arrange
+        cache = IdTokenCache(lambda audience: "opaque", refresh_margin_seconds=60, clock=self.clock)
+        cache.get("https://a.run.app")
+
+        # Act
+        self.clock.now += 3600
+        with patch.object(cache, "_fetch", return_value="new") as mock_fetch:
+            token = cache.get("https://a.run.app")
+
+        # Assert
+        self.assertEqual(token, "new")
+        mock_fetch.assert_called_once()
+
+
 if __name__ == '__main__':
     unittest.main()
+
+
+class FakeTransport:
+    def __init__(self, delays=None, failures=()):
+        self.delays = delays or {}
+        self.failures = set(failures)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, headers, body=None):
+        resource = url.rsplit("/", 1)[-1]
+        time.sleep(self.delays.get(resource, 0))
+        with self.lock:
+            self.requests.append((method, url, headers, body))
+        if resource in self.failures:
+            raise urllib.error.URLError(f"failed {resource}")
+        return f"{method} {resource}"
+
+    def close(self):
+        pass
+
+
+class TestBatchRequests(unittest.TestCase):
+
+    def setUp(self):
+        self.token_cache = IdTokenCache(fetch_token=lambda audience: "test_token")
+
+    def test_results_returned_in_order(self):
+        # Arrange
+        transport = FakeTransport(delays={"a": 0.05, "b": 0.0, "c": 0.02})
+        client = CloudRunRestClient("https://example", self.token_cache, transport)
+
+        # Act
+        responses = client.batch([("get", "a"), ("GET", "b"), ("post", "c", {"key": "value"})])
+
+        # Assert
+        self.assertEqual(responses, ["GET a", "GET b", "POST c"])
+        post = [r for r in transport.requests if r[0] == "POST"][0]
+        self.assertEqual(post[2]["Authorization"], "Bearer test_token")
+        self.assertEqual(post[3], json.dumps({"key": "value"}).encode('utf-8'))
+
+    def test_requests_sent_concurrently(self):
+        # Arrange
+        transport = FakeTransport(delays={str(i): 0.1 for i in range(4)})
+        client = CloudRunRestClient("https://example", self.token_cache, transport, max_workers=4)
+
+        # Act
+        start = time.monotonic()
+        client.batch([("GET", str(i)) for i in range(4)])
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertLess(elapsed, 0.35)
+
+    def test_failures_raise_or_are_returned(self):
+        # Arrange
+        transport = FakeTransport(failures={"b"})
+        client = CloudRunRestClient("https://example", self.token_cache, transport)
+
+        # Act
+        responses = client.batch([("GET", "a"), ("GET", "b")], return_exceptions=True)
+
+        # Assert
+        self.assertEqual(responses[0], "GET a")
+        self.assertIsInstance(responses[1], urllib.error.URLError)
+        with self.assertRaises(urllib.error.URLError):
+            client.batch([("GET", "a"), ("GET", "b")])
+
+
+class TestPooledHttpTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.client_ports = []
+        test = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                test.client_ports.append(self.client_address[1])
+                body = json.dumps({"path": self.path}).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        host, port = self.server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reuses_connection_between_requests(self):
+        # Arrange
+        token_cache = IdTokenCache(fetch_token=lambda audience: "test_token")
+        client = CloudRunRestClient(self.base_url, token_cache, PooledHttpTransport())
+
+        # Act
+        responses = [client.get("list_devices") for _ in range(3)]
+        client.close()
+
+        # Assert
+        self.assertEqual(json.loads(responses[0]), {"path": "/list_devices"})
+        self.assertEqual(len(self.client_ports), 3)
+        self.assertEqual(len(set(self.client_ports)), 1)
@@ -2,9 +2,19 @@ import unittest
 from unittest import TestCase
 from unittest.mock import patch, Mock
 from typing import List
+import dataclasses
+import os
+import tempfile
+import threading
 import time
 
-from hubitat_lock_manager import smart_lock
+from selenium.common.exceptions import NoSuchElementException
+
+from hubitat_lock_manager import metrics, smart_lock
+from hubitat_lock_manager.browser_profile import BROWSER_PROFILES, LEAN_PROFILE
+from hubitat_lock_manager.cache import TtlLruCache
+from hubitat_lock_manager.driver_pool import DriverPoolConfig
+from hubitat_lock_manager.positions import PositionAllocator
 
 
 # Fake implementations of the test doubles
@@ -35,7 +45,7 @@ class FakeCodeSetter(smart_lock.CodeSetter):
         return self.next_position
 
     def set_code(self, params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
-        position = self.get_next_position()
+        position = params.position or self.get_next_position()
         self.codes.append(smart_lock.LockCode(params.code, params.name, position))
         self.next_position += 1
         return smart_lock.SetCodeResult(position)
@@ -162,6 +172,66 @@ class TestSmartLock(TestCase):
         # Assert
         self.assertEqual(result, 5)
 
+    def test_update_key_code_overwrites_existing_position(self):
+        # Arrange
+        self.fake_code_lister.codes = [
+            smart_lock.LockCode(code="1234", name="test_user", position=7)
+        ]
+        params = smart_lock.UpdateKeyCodeParams(code="5678", username="test_user")
+
+        # Act
+        result = self.sut.update_key_code(params)
+
+        # Assert
+        self.assertEqual(result.position, 7)
+        self.assertEqual(self.fake_code_setter.codes[0].code, "5678")
+        self.assertEqual(self.fake_position_deleter.deleted_positions, [])
+
+    def test_update_key_code_creates_missing_user(self):
+        # Arrange
+        params = smart_lock.UpdateKeyCodeParams(code="5678", username="test_user")
+
+        # Act
+        result = self.sut.update_key_code(params)
+
+        # Assert
+        self.assertEqual(result.position, 1)
+
+    def test_update_key_code_rejects_code_of_other_user(self):
+        # Arrange
+        self.fake_code_lister.codes = [
+            smart_lock.LockCode(code="5678", name="user1", position=1)
+        ]
+        params = smart_lock.UpdateKeyCodeParams(code="5678", username="test_user")
+
+        # Act / Assert
+        with self.assertRaises(ValueError) as context:
+            self.sut.update_key_code(params)
+        self.assertEqual(str(context.exception), "Code 5678 already exists")
+
+    def test_apply_key_code_operations_in_one_session(self):
+        # Arrange
+        self.fake_code_lister.codes = [
+            smart_lock.LockCode(code="1234", name="user1", position=1)
+        ]
+        operations = [
+            smart_lock.KeyCodeOperation("delete", "user1"),
+            smart_lock.KeyCodeOperation("create", "user1", "5678"),
+            smart_lock.KeyCodeOperation("create", "user2", "5678"),
+            smart_lock.KeyCodeOperation("rename", "user3"),
+        ]
+
+        # Act
+        results = self.sut.apply_key_code_operations(operations)
+
+        # Assert
+        self.assertEqual(
+            [result.success for result in results], [True, True, False, False]
+        )
+        self.assertEqual(results[2].error, "Code 5678 already exists")
+        self.assertEqual(results[3].error_type, "ValueError")
+        self.assertEqual(self.fake_position_deleter.deleted_positions, [1])
+
     @patch('time.time')
     def test_create_key_code_timestamp(self, mock_time):
         # Arrange
@@ -174,11 +244,303 @@ class TestSmartLock(TestCase):
         # Assert
         self.assertEqual(result.timestamp, 1630000000)
 
+class FailingCodeSetter(FakeCodeSetter):
+    def set_code(self, params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+        raise RuntimeError("hub offline")
+
+
+class CountingCodeLister(FakeCodeLister):
+    def __init__(self, codes=None):
+        super().__init__(codes)
+        self.calls = 0
+
+    def list_codes(self, device_id: int) -> smart_lock.ListKeyCodesResult:
+        self.calls += 1
+        return super().list_codes(device_id)
+
+
+class TestCachingComponents(TestCase):
+    def setUp(self):
+        # Arrange
+        self.device_id = 1
+        self.cache = TtlLruCache(ttl_seconds=60, max_size=8)
+        self.code_lister = CountingCodeLister(
+            [smart_lock.LockCode(code="1111", name="user1", position=250)]
+        )
+        self.code_setter = FakeCodeSetter()
+        self.position_deleter = FakePositionDeleter()
+
+        self.sut = smart_lock.create_generic_z_wave_lock(
+            self.device_id,
+            smart_lock.create_cache_updating_position_deleter(
+                self.device_id, self.position_deleter, self.cache
+            ),
+            smart_lock.create_caching_code_lister(self.code_lister, self.cache),
+            smart_lock.create_cache_updating_code_setter(
+                self.device_id, self.code_setter, self.cache
+            ),
+        )
+
+    def test_create_key_code_reads_lock_once(self):
+        # Arrange
+        self.sut.list_key_codes()
+        params = smart_lock.CreateKeyCodeParams(code="2222", username="user2")
+
+        # Act
+        result = self.sut.create_key_code(params)
+
+        # Assert
+        self.assertEqual(self.code_lister.calls, 1)
+        self.assertEqual(result.position, 249)
+        cached_names = [code.name for code in self.sut.list_key_codes().codes]
+        self.assertEqual(cached_names, ["user1", "user2"])
+        self.assertEqual(self.code_lister.calls, 1)
+
+    def test_delete_key_code_updates_cache(self):
+        # Act
+        self.sut.delete_key_code(smart_lock.DeleteKeyCodeParams(username="user1"))
+
+        # Assert
+        self.assertEqual(self.position_deleter.deleted_positions, [250])
+        self.assertEqual(list(self.sut.list_key_codes().codes), [])
+        self.assertEqual(self.code_lister.calls, 1)
+
+    def test_cache_lookups_counted(self):
+        # Arrange
+        hits = metrics.CACHE_REQUESTS.value(cache="key_codes", result="hit")
+        misses = metrics.CACHE_REQUESTS.value(cache="key_codes", result="miss")
+
+        # Act
+        self.sut.list_key_codes()
+        self.sut.list_key_codes()
+
+        # Assert
+        self.assertEqual(metrics.CACHE_REQUESTS.value(cache="key_codes", result="miss"), misses + 1)
+        self.assertEqual(metrics.CACHE_REQUESTS.value(cache="key_codes", result="hit"), hits + 1)
+
+    def test_failed_write_invalidates_cache(self):
+        # Arrange
+        code_setter = smart_lock.create_cache_updating_code_setter(
+            self.device_id, FailingCodeSetter(), self.cache
+        )
+        self.sut.list_key_codes()
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            code_setter.set_code(smart_lock.SetCodeParams(code="2222", name="user2"))
+        self.sut.list_key_codes()
+
+        # Assert
+        self.assertEqual(self.code_lister.calls, 2)
+
+
+class SlowCodeSetter(FakeCodeSetter):
+    def __init__(self, barrier: threading.Barrier):
+        super().__init__()
+        self.barrier = barrier
+
+    def set_code(self, params: smart_lock.SetCodeParams) -> smart_lock.SetCodeResult:
+        # Hold every writer here so none of them sees the others' codes
+        self.barrier.wait()
+        return super().set_code(params)
+
+
+class TestPositionAllocatingComponents(TestCase):
+    def test_concurrent_creates_use_distinct_positions(self):
+        # Arrange
+        writers = 4
+        code_setter = SlowCodeSetter(threading.Barrier(writers, timeout=5))
+        sut = smart_lock.create_generic_z_wave_lock(
+            1,
+            FakePositionDeleter(),
+            FakeCodeLister([smart_lock.LockCode(code="1111", name="user1", position=250)]),
+            code_setter,
+            position_allocator=PositionAllocator(),
+        )
+        positions = []
+
+        def create(index: int):
+            params = smart_lock.CreateKeyCodeParams(code=f"200{index}", username=f"guest{index}")
+            positions.append(sut.create_key_code(params).position)
+
+        threads = [threading.Thread(target=create, args=(i,)) for i in range(writers)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(sorted(positions), [246, 247, 248, 249])
+        self.assertEqual(sut.get_next_position(), 245)
+
+    def test_code_added_between_refreshes_is_not_overwritten(self):
+        # Arrange
+        code_lister = FakeCodeLister([smart_lock.LockCode(code="1111", name="user1", position=250)])
+        sut = smart_lock.create_generic_z_wave_lock(
+            1,
+            FakePositionDeleter(),
+            code_lister,
+            FakeCodeSetter(),
+            position_allocator=PositionAllocator(refresh_interval_seconds=300),
+        )
+        sut.create_key_code(smart_lock.CreateKeyCodeParams(code="2222", username="user2"))
+        code_lister.codes = code_lister.codes + [
+            smart_lock.LockCode(code="3333", name="keypad", position=248)
+        ]
+
+        # Act
+        result = sut.create_key_code(smart_lock.CreateKeyCodeParams(code="4444", username="user4"))
+
+        # Assert
+        self.assertEqual(result.position, 247)
+
+    def test_failed_create_releases_position(self):
+        # Arrange
+        allocator = PositionAllocator()
+        sut = smart_lock.create_generic_z_wave_lock(
+            1,
+            FakePositionDeleter(),
+            FakeCodeLister(),
+            FailingCodeSetter(),
+            position_allocator=allocator,
+        )
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            sut.create_key_code(smart_lock.CreateKeyCodeParams(code="2222", username="user2"))
+
+        # Assert
+        self.assertEqual(sut.get_next_position(), 250)
+
+
 class TestWebdriverBasedComponents(TestCase):
     @patch('hubitat_lock_manager.smart_lock.webdriver.Chrome')
-    def test_webdriver_based_code_deleter(self, mock_chrome):
+    def test_webdriver_activity_counted(self, mock_chrome):
+        # Arrange
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100", command_executor="", write_confirmation=None
+        )
+        mock_chrome.return_value = Mock()
+        counters = [
+            (metrics.WEBDRIVER_LAUNCHES, {}),
+            (metrics.WEBDRIVER_QUITS, {}),
+            (metrics.WEBDRIVER_NAVIGATIONS, {"page": "device_edit"}),
+            (metrics.WEBDRIVER_FORM_SUBMISSIONS, {"form": "deleteCode"}),
+        ]
+        before = [counter.value(**labels) for counter, labels in counters]
+        deleter = smart_lock.create_webdriver_based_code_deleter(device_id=1, config=config)
+
+        # Act
+        deleter.delete_position(smart_lock.DeletePositionParams(position=1))
+
+        # Assert
+        after = [counter.value(**labels) for counter, labels in counters]
+        self.assertEqual([a - b for a, b in zip(after, before)], [1, 1, 1, 1])
+
+    @patch('hubitat_lock_manager.smart_lock.forget_chromedriver_path')
+    @patch('hubitat_lock_manager.smart_lock.resolve_chromedriver_path')
+    @patch('hubitat_lock_manager.smart_lock.webdriver.Chrome')
+    def test_create_driver_resolves_chromedriver_again_after_failure(
+        self, mock_chrome, mock_resolve, mock_forget
+    ):
         # Arrange
         config = smart_lock.WebdriverConfig(hub_ip="192.168.1.100", command_executor="")
+        driver = Mock()
+        mock_chrome.side_effect = [smart_lock.WebDriverException("version mismatch"), driver]
+        mock_resolve.side_effect = ["/old/chromedriver", "/new/chromedriver"]
+
+        # Act
+        result = config.create_driver()
+
+        # Assert
+        self.assertIs(result, driver)
+        mock_forget.assert_called_once()
+        self.assertEqual(mock_resolve.call_count, 2)
+
+    @patch('hubitat_lock_manager.smart_lock.webdriver.Chrome')
+    def test_pooled_config_warms_standby_drivers_on_hub(self, mock_chrome):
+        # Arrange
+        driver = Mock()
+        mock_chrome.return_value = driver
+        config = smart_lock.WebdriverConfig(hub_ip="192.168.1.100", command_executor="")
+
+        # Act
+        pooled = smart_lock.create_pooled_webdriver_config(
+            config, DriverPoolConfig(min_size=1, max_size=1)
+        )
+        pooled.close()
+
+        # Assert
+        driver.get.assert_called_once_with("http://192.168.1.100/device/list")
+
+    @patch('hubitat_lock_manager.smart_lock.webdriver.Chrome')
+    def test_lean_profile_reuses_profile_directory_after_quit(self, mock_chrome):
+        # Arrange
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        profile = dataclasses.replace(
+            BROWSER_PROFILES[LEAN_PROFILE], profile_root=root.name
+        )
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100", command_executor="", browser_profile=profile
+        )
+        mock_chrome.side_effect = lambda **kwargs: Mock()
+
+        # Act
+        first = config.create_driver()
+        second = config.create_driver()
+        smart_lock.quit_driver(first)
+        third = config.create_driver()
+
+        # Assert
+        directories = [
+            next(
+                argument
+                for argument in call.kwargs["options"].arguments
+                if argument.startswith("--user-data-dir=")
+            )
+            for call in mock_chrome.call_args_list
+        ]
+        self.assertNotEqual(directories[0], directories[1])
+        self.assertEqual(directories[2], directories[0])
+        self.assertEqual(mock_chrome.call_args.kwargs["options"].page_load_strategy, "eager")
+        third.execute_cdp_cmd.assert_any_call(
+            "Network.setBlockedURLs", {"urls": list(profile.blocked_url_patterns)}
+        )
+        smart_lock.quit_driver(second)
+        smart_lock.quit_driver(third)
+
+    @patch('hubitat_lock_manager.smart_lock.webdriver.Remote')
+    def test_lean_profile_keeps_remote_browsers_on_their_own_profile(self, mock_remote):
+        # Arrange
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        profile = dataclasses.replace(
+            BROWSER_PROFILES[LEAN_PROFILE], profile_root=root.name
+        )
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100",
+            command_executor="http://localhost:4444/wd/hub",
+            browser_profile=profile,
+        )
+
+        # Act
+        driver = config.create_driver()
+
+        # Assert
+        arguments = mock_remote.call_args.kwargs["options"].arguments
+        self.assertFalse(any(argument.startswith("--user-data-dir=") for argument in arguments))
+        self.assertEqual(os.listdir(root.name), [])
+        smart_lock.quit_driver(driver)
+
+    @patch('hubitat_lock_manager.smart_lock.webdriver.Chrome')
+    def test_webdriver_based_code_deleter(self, mock_chrome):
+        # Arrange
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100", command_executor="", write_confirmation=None
+        )
         mock_driver = Mock()
         mock_chrome.return_value = mock_driver
         mock_form = Mock()
@@ -203,7 +565,7 @@ class TestWebdriverBasedComponents(TestCase):
         mock_driver = Mock()
         mock_chrome.return_value = mock_driver
         mock_element = Mock()
-        mock_element.get_attribute.return_value = '{"1": {"code": "1234", "name": "user1"}}'
+        mock_driver.execute_script.return_value = {"lockCodes": '{"1": {"code": "1234", "name": "user1"}}'}
         mock_driver.find_element.return_value = mock_element
         
         lister = smart_lock.create_webdriver_based_code_lister(config)
@@ -224,7 +586,9 @@ class TestWebdriverBasedComponents(TestCase):
     @patch('hubitat_lock_manager.smart_lock.get_next_position_via_webdriver')
     def test_webdriver_based_code_setter(self, mock_get_next_position, mock_chrome):
         # Arrange
-        config = smart_lock.WebdriverConfig(hub_ip="192.168.1.100", command_executor="")
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100", command_executor="", write_confirmation=None
+        )
         mock_driver = Mock()
         mock_chrome.return_value = mock_driver
         mock_form = Mock()
@@ -245,6 +609,170 @@ class TestWebdriverBasedComponents(TestCase):
         mock_form.submit.assert_called_once()
         mock_driver.quit.assert_called_once()
 
+    @patch('hubitat_lock_manager.smart_lock.WebdriverConfig.create_driver')
+    def test_pooled_config_reuses_driver(self, mock_create_driver):
+        # Arrange
+        mock_driver = Mock()
+        mock_element = Mock()
+        mock_driver.execute_script.return_value = {"lockCodes": '{"1": {"code": "1234", "name": "user1"}}'}
+        mock_driver.find_element.return_value = mock_element
+        mock_create_driver.return_value = mock_driver
+        config = smart_lock.create_pooled_webdriver_config(
+            smart_lock.WebdriverConfig(hub_ip="192.168.1.100", command_executor=""),
+        )
+        lister = smart_lock.create_webdriver_based_code_lister(config)
+
+        # Act
+        lister.list_codes(device_id=1)
+        lister.list_codes(device_id=2)
+        config.close()
+
+        # Assert
+        mock_create_driver.assert_called_once()
+        self.assertEqual(mock_driver.get.call_count, 2)
+        mock_driver.quit.assert_called_once()
+
+    @patch('hubitat_lock_manager.smart_lock.time.sleep')
+    @patch('hubitat_lock_manager.smart_lock.WebdriverConfig.create_driver')
+    def test_webdriver_session_creates_code_with_one_page_load(
+        self, mock_create_driver, mock_sleep
+    ):
+        # Arrange
+        mock_driver = Mock()
+        mock_element = Mock()
+        mock_driver.execute_script.return_value = {"lockCodes": '{"250": {"code": "1234", "name": "user1"}}'}
+        mock_driver.find_element.return_value = mock_element
+        mock_create_driver.return_value = mock_driver
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100", command_executor="", write_confirmation=None
+        )
+        factory = smart_lock.create_webdriver_smart_lock_factory(config)
+        lock = factory.create_smart_lock(smart_lock.CreateSmartLockParams(1, None))
+
+        # Act
+        result = lock.create_key_code(
+            smart_lock.CreateKeyCodeParams(code="5678", username="newuser")
+        )
+
+        # Assert
+        self.assertEqual(result.position, 249)
+        mock_create_driver.assert_called_once()
+        mock_driver.get.assert_called_once_with("http://192.168.1.100/device/edit/1")
+        mock_element.submit.assert_called_once()
+        mock_driver.quit.assert_called_once()
+
+    @patch('hubitat_lock_manager.smart_lock.time.sleep')
+    @patch('hubitat_lock_manager.smart_lock.WebdriverConfig.create_driver')
+    def test_webdriver_code_setter_confirms_write(self, mock_create_driver, mock_sleep):
+        # Arrange
+        mock_driver = Mock()
+        mock_element = Mock()
+        mock_driver.execute_script.side_effect = [
+            {"lockCodes": '{}'},
+            {"lockCodes": '{"5": {"code": "5678", "name": "newuser"}}'},
+        ]
+        mock_driver.find_element.return_value = mock_element
+        mock_create_driver.return_value = mock_driver
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100",
+            command_executor="",
+            write_confirmation=smart_lock.WriteConfirmationConfig(),
+        )
+        setter = smart_lock.create_webdriver_based_code_setter(device_id=1, config=config)
+
+        # Act
+        result = setter.set_code(
+            smart_lock.SetCodeParams(code="5678", name="newuser", position=5)
+        )
+
+        # Assert
+        self.assertTrue(result.verified)
+        mock_driver.refresh.assert_called_once()
+        mock_sleep.assert_called_once_with(0.25)
+
+    @patch('hubitat_lock_manager.smart_lock.time.sleep')
+    @patch('hubitat_lock_manager.smart_lock.WebdriverConfig.create_driver')
+    def test_webdriver_code_deleter_reports_unverified_on_timeout(
+        self, mock_create_driver, mock_sleep
+    ):
+        # Arrange
+        mock_driver = Mock()
+        mock_element = Mock()
+        mock_driver.execute_script.return_value = {"lockCodes": '{"1": {"code": "1234", "name": "user1"}}'}
+        mock_driver.find_element.return_value = mock_element
+        mock_create_driver.return_value = mock_driver
+        config = smart_lock.WebdriverConfig(
+            hub_ip="192.168.1.100",
+            command_executor="",
+            write_confirmation=smart_lock.WriteConfirmationConfig(timeout_seconds=0),
+        )
+        deleter = smart_lock.create_webdriver_based_code_deleter(device_id=1, config=config)
+
+        # Act
+        result = deleter.delete_position(smart_lock.DeletePositionParams(position=1))
+
+        # Assert
+        self.assertFalse(result.verified)
+        mock_sleep.assert_not_called()
+
+    @patch('hubitat_lock_manager.smart_lock.WebdriverConfig.create_driver')
+    def test_list_devices_reads_table_in_one_call(self, mock_create_driver):
+        # Arrange
+        mock_driver = Mock()
+        mock_driver.execute_script.return_value = {
+            "devices": [
+                {"id": "12", "cells": ["", "Front Door Lock\n"]},
+                {"id": "13", "cells": ["", "Back Door Lock"]},
+            ],
+            "lockCodes": None,
+        }
+        mock_create_driver.return_value = mock_driver
+        config = smart_lock.WebdriverConfig(hub_ip="192.168.1.100", command_executor="")
+
+        # Act
+        result = smart_lock.list_devices_via_webdriver(config)
+
+        # Assert
+        self.assertEqual(
+            result.devices,
+            [smart_lock.Device(12, "Front Door Lock"), smart_lock.Device(13, "Back Door Lock")],
+        )
+        mock_driver.get.assert_called_once_with("http://192.168.1.100/device/list")
+        mock_driver.execute_script.assert_called_once_with(smart_lock.PAGE_DATA_SCRIPT)
+        mock_driver.find_element.assert_not_called()
+        mock_driver.find_elements.assert_not_called()
+
+    def test_read_lock_codes_requires_element(self):
+        # Arrange
+        mock_driver = Mock()
+        mock_driver.execute_script.return_value = {"devices": None, "lockCodes": None}
+
+        # Act / Assert
+        with self.assertRaises(NoSuchElementException):
+            smart_lock.read_lock_codes(mock_driver)
+
+    def test_wait_for_lock_codes_backs_off(self):
+        # Arrange
+        mock_driver = Mock()
+        mock_driver.execute_script.return_value = {"lockCodes": '{}'}
+        config = smart_lock.WriteConfirmationConfig(
+            timeout_seconds=100, initial_delay_seconds=1, max_delay_seconds=3
+        )
+        delays = []
+
+        def fake_sleep(seconds):
+            delays.append(seconds)
+            if len(delays) == 4:
+                raise StopIteration
+
+        # Act
+        with patch('hubitat_lock_manager.smart_lock.time.sleep', fake_sleep):
+            with self.assertRaises(StopIteration):
+                smart_lock.wait_for_lock_codes(mock_driver, lambda result: False, config)
+
+        # Assert
+        self.assertEqual(delays, [1, 2, 3, 3])
+
 class TestHelperFunctions(TestCase):
     def test_get_next_position_based_on_list_key_codes_result(self):
         # Arrange
@@ -261,5 +789,16 @@ class TestHelperFunctions(TestCase):
         # Assert
         self.assertEqual(next_position, 250)
 
+    def test_poll_until_without_config_leaves_write_unconfirmed(self):
+        # Arrange
+        check = Mock(return_value=True)
+
+        # Act
+        confirmed = smart_lock.poll_until(check, None)
+
+        # Assert
+        self.assertFalse(confirmed)
+        check.assert_not_called()
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from unittest import TestCase
+
+from hubitat_lock_manager import startup
+
+
+class TestStartup(TestCase):
+    def test_entry_points_defer_backend_imports(self):
+        for module in startup.ENTRY_POINTS + ("hubitat_lock_manager.smart_lock",):
+            with self.subTest(module=module):
+                # Act
+                stats = startup.measure_startup(module, runs=1)
+
+                # Assert
+                self.assertEqual(stats.deferred_loaded, [])
+                self.assertEqual(len(stats.import_seconds), 1)
+
+    def test_format_report(self):
+        # Arrange
+        stats = startup.StartupStats("hubitat_lock_manager.cli", [0.1], [0.2], ["selenium"])
+
+        # Act
+        report = startup.format_report([stats])
+
+        # Assert
+        self.assertIn("hubitat_lock_manager.cli", report)
+        self.assertIn("100.0", report)
+        self.assertIn("selenium", report)
+
+
+if __name__ == "__main__":
+    unittest.main()